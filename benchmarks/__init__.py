@@ -0,0 +1 @@
+"""Бенчмарки цепочки опрос -> разбор -> уведомление."""
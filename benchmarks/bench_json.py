@@ -0,0 +1,108 @@
+"""Микро-бенчмарк разбора и проверки ответа api.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_json --homeworks 10,1000,10000
+
+Сравнивает прежний путь (json.loads, check_response, поиск изменений
+по словарям работ и parse_status) с быстрым (fastjson.loads и проход
+HomeworkSchema) на первом опросе, когда изменились все работы, и на
+повторном, когда не изменилась ни одна.
+"""
+import argparse
+import json
+import logging
+
+import homework
+from benchmarks.bench_pipeline import measure, patched
+from benchmarks.mock_servers import make_homeworks
+from homework_bot import fastjson
+from homework_bot.status_index import StatusIndex
+
+
+def legacy_changed(homeworks, statuses):
+    """Прежний поиск изменений по словарям работ."""
+    return [
+        item for item in homeworks
+        if statuses.get(str(item.get('id') or item.get('homework_name')))
+        != item.get('status')
+    ]
+
+
+def legacy_pass(body, statuses):
+    """Прежний разбор: stdlib json и проверка работ по одной."""
+    homeworks = homework.check_response(json.loads(body))
+    return [
+        homework.parse_status(item)
+        for item in legacy_changed(homeworks, statuses)
+    ]
+
+
+def fast_pass(body, statuses):
+    """Быстрый разбор: fastjson и один проход схемы."""
+    schema = homework.HOMEWORK_SCHEMA
+    records = schema.parse(homework.check_response(fastjson.loads(body)))
+    return [
+        homework.RENDERER.status_message(record.name, record.status)
+        for record in statuses.changed_records(records)
+    ]
+
+
+def run(homework_sizes=(10, 1000, 10000), iterations=50):
+    """Замеры обоих путей для каждого размера ответа."""
+    results = []
+    with patched(homework, logger=logging.getLogger('bench_json')):
+        homework.logger.setLevel(logging.WARNING)
+        for size in homework_sizes:
+            homeworks = make_homeworks(size)
+            body = json.dumps({
+                'homeworks': homeworks, 'current_date': 1,
+            }).encode('utf-8')
+            known = StatusIndex({
+                str(item['id']): item['status'] for item in homeworks
+            })
+            for scenario, statuses in (('new', StatusIndex()),
+                                       ('same', known)):
+                for name, func in (('legacy', legacy_pass),
+                                   (f'fast/{fastjson.BACKEND}', fast_pass)):
+                    results.append(measure(
+                        f'{name} {scenario} [{size} hw]',
+                        lambda: func(body, statuses), iterations,
+                    ))
+    return results
+
+
+def report(results):
+    """Таблица p50 и ускорения быстрого пути относительно прежнего."""
+    lines = [f'{"сценарий":<36} {"p50, мс":>9} {"ускорение":>10}']
+    for legacy, fast in zip(results[::2], results[1::2]):
+        lines.append(f'{legacy.name:<36} {legacy.percentile(0.5):>9.3f}')
+        speedup = legacy.percentile(0.5) / (fast.percentile(0.5) or 1e-9)
+        lines.append(
+            f'{fast.name:<36} {fast.percentile(0.5):>9.3f} {speedup:>9.2f}x'
+        )
+    return '\n'.join(lines)
+
+
+def cli(argv=None):
+    """Разбор аргументов и запуск бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--homeworks', default='10,1000,10000',
+        help='размеры ответа api через запятую',
+    )
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--output', help='файл для сохранения отчета')
+    args = parser.parse_args(argv)
+    text = report(run(
+        homework_sizes=[int(size) for size in args.homeworks.split(',')],
+        iterations=args.iterations,
+    ))
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+
+
+if __name__ == '__main__':
+    cli()
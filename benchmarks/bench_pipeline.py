@@ -0,0 +1,261 @@
+"""Бенчмарк цепочки опрос -> разбор -> уведомление.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_pipeline --homeworks 1,100,10000
+
+Все запросы идут в локальные заглушки api практикума и Telegram
+с настраиваемой задержкой и долей ошибок.
+"""
+import argparse
+import contextlib
+import logging
+import os
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from functools import partial
+from types import SimpleNamespace
+
+import telegram
+
+import homework
+from benchmarks.mock_servers import MockPracticumServer, MockTelegramServer
+from homework_bot.accounts import Account
+from homework_bot.client import PracticumClient
+from homework_bot.engine import AccountState
+from homework_bot.state import StateStore
+
+
+class StopBenchmark(Exception):
+    """Прерывание бесконечного цикла main()."""
+
+
+@dataclass
+class Result:
+    """Замеры одного сценария."""
+
+    name: str
+    durations: list = field(default_factory=list)
+    total: float = 0.0
+    memory_per_account: float = None
+
+    def percentile(self, q):
+        """Перцентиль длительности в миллисекундах."""
+        if not self.durations:
+            return 0.0
+        ordered = sorted(self.durations)
+        return ordered[round(q * (len(ordered) - 1))] * 1000
+
+    @property
+    def rps(self):
+        """Операций в секунду."""
+        return len(self.durations) / self.total if self.total else 0.0
+
+    def row(self):
+        """Строка отчета."""
+        memory = (
+            f'{self.memory_per_account / 1024:10.1f}'
+            if self.memory_per_account is not None else f'{"-":>10}'
+        )
+        return (
+            f'{self.name:<40} {len(self.durations):>7} {self.rps:>10.1f} '
+            f'{self.percentile(0.5):>9.3f} {self.percentile(0.99):>9.3f} '
+            f'{memory}'
+        )
+
+
+HEADER = (
+    f'{"сценарий":<40} {"вызовов":>7} {"в сек":>10} '
+    f'{"p50, мс":>9} {"p99, мс":>9} {"КиБ/акк":>10}'
+)
+
+
+def measure(name, func, iterations):
+    """Замер iterations вызовов func."""
+    result = Result(name)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            pass
+        result.durations.append(time.perf_counter() - call_started)
+    result.total = time.perf_counter() - started
+    return result
+
+
+@contextlib.contextmanager
+def patched(target, **attrs):
+    """Временная подмена атрибутов модуля."""
+    saved = {name: getattr(target, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+def bench_stages(practicum, telegram_server, homeworks, iterations):
+    """Замер отдельных функций homework.py."""
+    results = []
+    suffix = f'[{homeworks} hw]'
+    with patched(homework, ENDPOINT=practicum.url):
+        results.append(measure(
+            f'get_api_answer requests.get {suffix}',
+            partial(homework.get_api_answer, 0), iterations,
+        ))
+        client = PracticumClient()
+        results.append(measure(
+            f'fetch_api_answer pooled {suffix}',
+            partial(homework.fetch_api_answer, 0, homework.HEADERS, client),
+            iterations,
+        ))
+        client.close()
+        answer = homework.get_api_answer(0)
+    results.append(measure(
+        f'check_response {suffix}',
+        partial(homework.check_response, answer), iterations,
+    ))
+    homework_list = answer['homeworks']
+    results.append(measure(
+        f'parse_status x{len(homework_list)} {suffix}',
+        lambda: [homework.parse_status(item) for item in homework_list],
+        iterations,
+    ))
+    bot = telegram.Bot(token='1234:abcdefg', base_url=telegram_server.base_url)
+    with patched(homework, TELEGRAM_CHAT_ID='1'):
+        results.append(measure(
+            'send_message',
+            partial(homework.send_message, bot, 'Статус не изменился'),
+            iterations,
+        ))
+    return results
+
+
+def bench_main(practicum, telegram_server, homeworks, iterations):
+    """Замер итераций бесконечного цикла main()."""
+    result = Result(f'main() loop [{homeworks} hw]')
+    marks = [time.perf_counter()]
+
+    def sleep(delay):
+        marks.append(time.perf_counter())
+        if len(marks) > iterations:
+            raise StopBenchmark
+
+    fake_time = SimpleNamespace(
+        time=time.time, sleep=sleep, perf_counter=time.perf_counter
+    )
+    fake_telegram = SimpleNamespace(
+        Bot=partial(telegram.Bot, base_url=telegram_server.base_url)
+    )
+    with patched(
+        homework, ENDPOINT=practicum.url, time=fake_time,
+        telegram=fake_telegram, PRACTICUM_TOKEN='token',
+        TELEGRAM_TOKEN='1234:abcdefg', TELEGRAM_CHAT_ID='1',
+        STATE_FILE=None,
+    ):
+        try:
+            homework.main()
+        except StopBenchmark:
+            pass
+    result.durations = [
+        after - before for before, after in zip(marks, marks[1:])
+    ]
+    result.total = marks[-1] - marks[0]
+    return result
+
+
+def bench_accounts(practicum, homeworks, accounts):
+    """Опрос многих аккаунтов через пул и память на аккаунт."""
+    result = Result(f'poll_account x{accounts} [{homeworks} hw]')
+    client = PracticumClient()
+    store = StateStore()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = [
+        AccountState(Account(f'student{index}', 'token', '1:x', '1'))
+        for index in range(accounts)
+    ]
+    with patched(homework, ENDPOINT=practicum.url):
+        started = time.perf_counter()
+        for state in states:
+            call_started = time.perf_counter()
+            homework.poll_account(state, lambda text: True, client, store)
+            result.durations.append(time.perf_counter() - call_started)
+        result.total = time.perf_counter() - started
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    client.close()
+    result.memory_per_account = (after - before) / accounts
+    return result
+
+
+def run(homework_sizes=(1, 100, 10000), iterations=50, accounts=100,
+        latency=0.0, error_rate=0.0):
+    """Прогон всех сценариев, возвращает список Result.
+
+    Логи homework.py форматируются как обычно, но пишутся в devnull,
+    чтобы вывод в терминал не искажал замеры и отчет.
+    """
+    results = []
+    devnull = open(os.devnull, 'w')
+    root = logging.getLogger()
+    previous_handlers = root.handlers
+    root.handlers = []
+    homework.configure_logging(devnull)
+    with MockTelegramServer(latency=latency, error_rate=error_rate) as tg:
+        for size in homework_sizes:
+            with MockPracticumServer(
+                homeworks=size, latency=latency, error_rate=error_rate
+            ) as practicum:
+                results.extend(bench_stages(practicum, tg, size, iterations))
+                results.append(bench_main(practicum, tg, size, iterations))
+                results.append(bench_accounts(practicum, size, accounts))
+    root.handlers = previous_handlers
+    devnull.close()
+    return results
+
+
+def report(results):
+    """Текстовая таблица результатов."""
+    return '\n'.join([HEADER] + [result.row() for result in results])
+
+
+def cli(argv=None):
+    """Разбор аргументов и запуск бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--homeworks', default='1,100,10000',
+        help='размеры ответа api через запятую',
+    )
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument(
+        '--latency', type=float, default=0.0,
+        help='задержка ответа заглушек, сек',
+    )
+    parser.add_argument(
+        '--error-rate', type=float, default=0.0,
+        help='доля ответов заглушек с ошибкой 500',
+    )
+    parser.add_argument('--output', help='файл для сохранения отчета')
+    args = parser.parse_args(argv)
+    text = report(run(
+        homework_sizes=[int(size) for size in args.homeworks.split(',')],
+        iterations=args.iterations,
+        accounts=args.accounts,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    ))
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,94 @@
+"""Память на отслеживаемую работу.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_records --homeworks 1000,50000
+
+Замеряется память, которая остается занятой после разбора ответа:
+список словарей работ из json, прежний индекс статусов со строками
+из ответа, список HomeworkRecord и StatusIndex со статусами-членами
+HomeworkStatus.
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+import homework
+from benchmarks.mock_servers import make_homeworks
+from homework_bot import fastjson
+from homework_bot.status_index import StatusIndex
+
+
+def retained(build):
+    """Байты, оставшиеся занятыми объектом, который вернул build."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def build_index(body):
+    """StatusIndex, заполненный записями из ответа."""
+    index = StatusIndex()
+    schema = homework.HOMEWORK_SCHEMA
+    for record in schema.parse(fastjson.loads(body)['homeworks']):
+        index.set(record.key, record.status)
+    return index
+
+
+def run(homework_sizes=(1000, 50000)):
+    """Байты на работу для каждого способа хранения и размера."""
+    results = []
+    for size in homework_sizes:
+        body = json.dumps({
+            'homeworks': make_homeworks(size), 'current_date': 1,
+        }).encode('utf-8')
+        scenarios = {
+            'dict из json': lambda: json.loads(body)['homeworks'],
+            'индекс строк из json': lambda: {
+                str(item['id']): item['status']
+                for item in json.loads(body)['homeworks']
+            },
+            'HomeworkRecord': lambda: homework.HOMEWORK_SCHEMA.parse(
+                fastjson.loads(body)['homeworks']
+            ),
+            'StatusIndex': lambda: build_index(body),
+        }
+        for name, build in scenarios.items():
+            results.append((f'{name} [{size} hw]', retained(build) / size))
+    return results
+
+
+def report(results):
+    """Текстовая таблица байт на работу."""
+    lines = [f'{"хранение":<36} {"байт/работа":>12}']
+    lines.extend(f'{name:<36} {size:>12.1f}' for name, size in results)
+    return '\n'.join(lines)
+
+
+def cli(argv=None):
+    """Разбор аргументов и запуск бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--homeworks', default='1000,50000',
+        help='размеры ответа api через запятую',
+    )
+    parser.add_argument('--output', help='файл для сохранения отчета')
+    args = parser.parse_args(argv)
+    text = report(run(
+        [int(size) for size in args.homeworks.split(',')]
+    ))
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,157 @@
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def make_homeworks(count, seed=0):
+    """Список из count домашек в формате api практикума."""
+    rnd = random.Random(seed)
+    return [
+        {
+            'id': index,
+            'homework_name': f'student__hw{index:05}.zip',
+            'status': rnd.choice(STATUSES),
+            'reviewer_comment': 'Комментарий ревьюера ' * 3,
+            'date_updated': '2020-02-13T14:40:57Z',
+            'lesson_name': f'Урок {index}',
+        }
+        for index in range(count)
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело уходят одним сегментом, иначе keep-alive клиент
+    # ждет delayed ACK около 40 мс на каждый ответ
+    wbufsize = 64 * 1024
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self):
+        """Задержка и случайная ошибка, True - нужно ответить ошибкой."""
+        config = self.server.config
+        if config.latency:
+            time.sleep(config.latency)
+        with config.lock:
+            config.requests += 1
+            return config.random.random() < config.error_rate
+
+
+class _Config:
+    def __init__(self, latency, error_rate, seed):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+
+class _PracticumHandler(_Handler):
+    def do_GET(self):
+        if self._simulate():
+            self._reply(500, b'{"error": "internal"}')
+            return
+        self._reply(200, self.server.payload())
+
+
+class _TelegramHandler(_Handler):
+    message_ids = itertools.count(1)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        if self._simulate():
+            self._reply(500, b'{"ok": false, "error_code": 500, '
+                             b'"description": "Internal Server Error"}')
+            return
+        self._reply(200, json.dumps({
+            'ok': True,
+            'result': {
+                'message_id': next(self.message_ids),
+                'date': int(time.time()),
+                'chat': {'id': 1, 'type': 'private'},
+                'text': '',
+            },
+        }).encode())
+
+
+class MockServer:
+    """Локальный http сервер в отдельном потоке."""
+
+    handler = _Handler
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        """Сервер с задержкой ответа latency и долей ошибок error_rate."""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler)
+        self.server.daemon_threads = True
+        self.server.config = _Config(latency, error_rate, seed)
+        self.server.payload = self.payload
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        """Адрес сервера."""
+        return f'http://127.0.0.1:{self.server.server_port}/'
+
+    @property
+    def requests(self):
+        """Число обработанных запросов."""
+        return self.server.config.requests
+
+    def payload(self):
+        """Тело успешного ответа."""
+        return b'{}'
+
+    def __enter__(self):
+        """Запуск сервера."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        """Остановка сервера."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MockPracticumServer(MockServer):
+    """Заглушка ENDPOINT, отдающая homeworks заданного размера."""
+
+    handler = _PracticumHandler
+
+    def __init__(self, homeworks=1, **kwargs):
+        """Сервер, отдающий homeworks домашек в каждом ответе."""
+        super().__init__(**kwargs)
+        self._homeworks = json.dumps(make_homeworks(homeworks))
+
+    def payload(self):
+        """Ответ api с текущим current_date."""
+        return (
+            f'{{"homeworks": {self._homeworks}, '
+            f'"current_date": {int(time.time())}}}'
+        ).encode()
+
+
+class MockTelegramServer(MockServer):
+    """Заглушка Bot API: url подставляется в telegram.Bot(base_url=...)."""
+
+    handler = _TelegramHandler
+
+    @property
+    def base_url(self):
+        """base_url для telegram.Bot."""
+        return f'{self.url}bot'
@@ -1,21 +1,55 @@
+import argparse
+import asyncio
 import logging
 import os
 import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from http import HTTPStatus
 
-import requests
-import telegram
 from dotenv import load_dotenv
 
+from homework_bot.accounts import Account, ConfigSource
+from homework_bot.breaker import (CLOSED, STATE_VALUES, CircuitBreaker,
+                                  CircuitOpenError, DependencyError)
+from homework_bot.state import message_hash, open_state_store
+from homework_bot.engine import AccountState, PollingEngine
+from homework_bot.lazy import LazyModule
+from homework_bot.lease import LeaseKeeper, LeaseManager
+from homework_bot.lifecycle import Shutdown, StopOnSignals
+from homework_bot.logs import (QueueLogging, RateLimitFilter,
+                               install_level_signals)
+from homework_bot.metrics import (HTTP_RESPONSES, POLL_SECONDS,
+                                  PROCESS_SECONDS, REGISTRY,
+                                  TELEGRAM_SEND_SECONDS, TELEGRAM_SENDS,
+                                  Gauge, MetricsServer, SnapshotWriter)
+from homework_bot.ratelimit import Rate, RateLimiter, SQLiteBuckets
+from homework_bot.render import ENGLISH, MessageRenderer, MessageTemplates
+from homework_bot.scheduler import PollScheduler
+from homework_bot.schema import HomeworkSchema
+from homework_bot.sharding import WorkerPool, parse_shard, select_accounts
+from homework_bot.singleflight import SingleFlight
+
+# Telegram и requests импортируются при первом обращении: проверке
+# без уведомлений стек Telegram не нужен
+requests = LazyModule('requests')
+telegram = LazyModule('telegram')
+
 load_dotenv()
 
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# База SQLite для сохранения состояния между перезапусками (необязательно)
+STATE_FILE = os.getenv('STATE_FILE')
 
 RETRY_PERIOD = 600
+# Таймауты (соединение, чтение) запроса к api в секундах
+API_TIMEOUT = (5, 30)
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
@@ -25,15 +59,40 @@ HOMEWORK_VERDICTS = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+NO_CHANGES_MESSAGE = 'Статус не изменился'
+HOMEWORK_SCHEMA = HomeworkSchema(HOMEWORK_VERDICTS)
+# Шаблоны уведомлений по языкам чатов, язык аккаунта - Account.language
+RENDERER = MessageRenderer({
+    'ru': MessageTemplates(
+        changed='Изменился статус проверки работы "{name}". {verdict}',
+        verdicts=HOMEWORK_VERDICTS,
+        no_changes=NO_CHANGES_MESSAGE,
+        failure='Сбой в работе программы: {error}',
+        no_data='Изменений статусов работ пока не было',
+        error_summary='{error} x{count} за последние {minutes} мин',
+    ),
+    'en': ENGLISH,
+})
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
-handler = logging.StreamHandler(stream=sys.stdout)
-logger.addHandler(handler)
-formatter = logging.Formatter(
-    '%(asctime)s, [%(levelname)s] %(message)s',
-)
-handler.setFormatter(formatter)
+# Логгеры бота: уровень --log-level и сигналы меняют только их, а
+# сторонние библиотеки пишут не подробнее WARNING корневого логгера
+BOT_LOGGERS = (logger, logging.getLogger('homework_bot'))
+
+
+def configure_logging(stream=None, level=logging.DEBUG):
+    """Вывод логов бота и модулей homework_bot в stream (stdout).
+
+    Обработчик ставится на корневой логгер, если тот еще не настроен,
+    поэтому записи всех модулей пакета проходят через один обработчик.
+    """
+    logging.basicConfig(
+        stream=stream or sys.stdout,
+        format='%(asctime)s, [%(levelname)s] %(message)s',
+    )
+    for bot_logger in BOT_LOGGERS:
+        bot_logger.setLevel(level)
 
 
 def check_tokens():
@@ -51,53 +110,129 @@ def check_tokens():
 
 def send_message(bot, message):
     """Отправка сообщения пользователю."""
+    return send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_chat_message(bot, chat_id, message):
+    """Отправка сообщения в указанный чат."""
     try:
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
-        logger.debug(f'Сообщение отправлено from {send_message.__name__}')
+        with TELEGRAM_SEND_SECONDS.time():
+            bot.send_message(chat_id=chat_id, text=message)
+        TELEGRAM_SENDS.inc('sent')
+        logger.debug('Сообщение отправлено from %s', send_message.__name__)
         return True
     except Exception as error:
-        logger.error(f'Сообщение не отправлено причина: {error}')
+        TELEGRAM_SENDS.inc('failed')
+        logger.error('Сообщение не отправлено причина: %s', error)
         return False
 
 
 def get_api_answer(timestamp):
     """Получение ответа от api яндекса."""
+    return fetch_api_answer(timestamp, HEADERS)
+
+
+def fetch_api_answer(timestamp, headers, client=None):
+    """Получение ответа от api яндекса с заголовками аккаунта.
+
+    Если передан client (PracticumClient), запрос идет через его пул
+    соединений, иначе через requests.get.
+    """
     payload = {'from_date': timestamp}
+    get = client.get if client else requests.get
+    timeout = client.timeout if client else API_TIMEOUT
     try:
         logger.info('Попытка получения ответа от api')
-        response = requests.get(
+        response = get(
             ENDPOINT,
-            headers=HEADERS,
+            headers=headers,
             params=payload,
+            timeout=timeout,
         )
     except Exception as error:
+        HTTP_RESPONSES.inc('error')
         logger.critical('Не удалось получить ответ от api')
         raise ConnectionError(f'Не удалось получить ответ от api: {error}')
+    HTTP_RESPONSES.inc(str(response.status_code))
     if response.status_code != HTTPStatus.OK:
         raise ConnectionError('ENDPOINT не доступен')
     return response.json()
 
 
+def fetch_account_answer(state, client=None):
+    """Ответ api для аккаунта или None, если он не изменился.
+
+    Через client запрос условный, а тело сравнивается с отпечатком
+    последнего обработанного ответа. Новые признаки ответа лежат в
+    state.pending_validators до успешной обработки. Если у client
+    есть flights, одновременные опросы с тем же токеном, from_date и
+    признаками делят один запрос и разобранный ответ.
+    """
+    if client is None:
+        return fetch_api_answer(state.timestamp, state.account.headers)
+    request = partial(
+        request_account_answer, client, state.account.headers,
+        state.timestamp, state.validators,
+    )
+    if client.flights is None:
+        validators, answer = request()
+    else:
+        validators, answer = client.flights.do((
+            state.account.practicum_token, state.timestamp, state.validators
+        ), request)
+    state.pending_validators = validators
+    return answer
+
+
+def request_account_answer(client, headers, timestamp, validators):
+    """Условный запрос к api: новые признаки и тело либо None."""
+    try:
+        logger.info('Попытка получения ответа от api')
+        response, validators, changed = client.get_if_changed(
+            ENDPOINT,
+            validators,
+            headers=headers,
+            params={'from_date': timestamp},
+        )
+    except CircuitOpenError:
+        raise
+    except Exception as error:
+        HTTP_RESPONSES.inc('error')
+        logger.critical('Не удалось получить ответ от api')
+        raise DependencyError(f'Не удалось получить ответ от api: {error}')
+    HTTP_RESPONSES.inc(str(response.status_code))
+    if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        raise DependencyError('ENDPOINT не доступен')
+    if response.status_code not in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+        raise ConnectionError('ENDPOINT не доступен')
+    if not changed:
+        return validators, None
+    return validators, client.decode(response)
+
+
 def check_response(response):
     """Проверка данных api на наличие ключевых составляющих."""
-    logger.info(f'Проверка данных {check_response.__name__} началась')
+    logger.info('Проверка данных %s началась', check_response.__name__)
     if not isinstance(response, dict):
         raise TypeError('Ответ от api приходит не в типе данных dict')
+    if 'homeworks' not in response:
+        raise KeyError('В ответе от api нет ключа homeworks')
     homeworks = response.get('homeworks')
     current_date = response.get('current_date')
     if not isinstance(homeworks, list):
         raise TypeError('homeworks приходит не в типе данных list')
-    if not homeworks:
-        raise KeyError('В ответе от api нет ключа homeworks')
     if not current_date:
         raise KeyError('В ответе от api нет ключа current_date')
-    logger.info(f'Проверка данных {check_response.__name__} выполнена ')
-    return homeworks[0]
+    logger.info('Проверка данных %s выполнена', check_response.__name__)
+    # Пустой список означает, что с from_date ничего не изменилось
+    return homeworks
 
 
 def parse_status(homework):
     """Получения статуса работы."""
-    logger.info(f'Проверка статуса {parse_status.__name__} работы началась')
+    logger.info(
+        'Проверка статуса %s работы началась', parse_status.__name__
+    )
     homework_name = homework.get('homework_name')
     status = homework.get('status')
     if not homework_name:
@@ -106,61 +241,773 @@ def parse_status(homework):
         raise KeyError('В полученных данных нет ключа status')
     if status not in HOMEWORK_VERDICTS:
         raise ValueError(f'Неопределенный статус {status}')
-    verdict = HOMEWORK_VERDICTS.get(status)
-    logger.info(f'Проверка статуса {parse_status.__name__} работы выполнена')
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    logger.info(
+        'Проверка статуса %s работы выполнена', parse_status.__name__
+    )
+    return RENDERER.status_message(homework_name, status)
+
+
+def notify_once(state, notify, message, store):
+    """Отправка сообщения, если оно не совпадает с предыдущим."""
+    digest = message_hash(message)
+    if state.last_message_hash == digest:
+        logger.debug('Сообщение не изменилось, повторно не отправляется')
+        return
+    # Если notify возвращает True => Сообщение отправлено
+    # => перезаписываем последнее сообщение
+    if notify(message):
+        state.last_message_hash = digest
+        store.remember_message(state.account.name, digest)
+        logger.debug('Сообщение отправлено, ошибка перезаписана')
+    else:
+        logger.debug('Сообщение не отправлено')
+
+
+def track_transition(state, record, store):
+    """Учет перехода статуса для планировщика опросов и /history."""
+    state.last_change = time.time()
+    if record.status == 'reviewing':
+        state.reviewing_since = state.last_change
+    else:
+        state.reviewing_since = None
+    store.set_activity(
+        state.account.name, state.last_change, state.reviewing_since
+    )
+    state.history.append(
+        (record.key, record.name, record.status, state.last_change)
+    )
+    store.add_history(
+        state.account.name, record.key, record.name, record.status.value,
+        state.last_change,
+    )
+
+
+def process_homeworks(state, notify, homeworks, store):
+    """Отправка уведомлений по работам с новым статусом.
+
+    Все работы проверяются одним проходом схемы до первой отправки.
+    Возвращает True, если все уведомления приняты к отправке.
+    """
+    name = state.account.name
+    language = state.account.language
+    records = HOMEWORK_SCHEMA.parse(homeworks)
+    # Рендерим сообщения только для работ с новым статусом
+    changed = state.statuses.changed_records(records)
+    delivered = True
+    for record in changed:
+        message = RENDERER.status_message(
+            record.name, record.status, language
+        )
+        # Статус запоминается только после успешной отправки,
+        # иначе работа будет отправлена повторно при следующем опросе
+        if not notify(message):
+            delivered = False
+            continue
+        state.statuses.set(record.key, record.status, record.name)
+        store.set_status(
+            name, record.key, record.status.value, record.name
+        )
+        track_transition(state, record, store)
+    # Проверка на дубли изменения статуса
+    if not changed:
+        notify_once(state, notify, RENDERER.no_changes(language), store)
+    return delivered
+
+
+def report_failure(state, notify, error, store, breaker=None):
+    """Уведомление пользователя о сбое опроса.
+
+    О первой ошибке каждого вида (тип, функция, шаблон текста)
+    сообщается сразу, повторы за окно error_tracker только считаются
+    и приходят сводкой. С breaker сбой api, пока автомат замкнут,
+    считается случайным, а после размыкания о нем сообщается один раз
+    за сбой, а не каждый опрос.
+    """
+    if breaker is not None and isinstance(error, DependencyError):
+        if breaker.state == CLOSED or state.notified_outage == breaker.outage:
+            return
+        state.notified_outage = breaker.outage
+    if not state.error_tracker.record(error):
+        logger.debug('Повтор ошибки подавлен: %s', error)
+        return
+    message = RENDERER.failure(error, state.account.language)
+    notify_once(state, notify, message, store)
+
+
+def report_error_summary(state, notify, store):
+    """Сводка подавленных повторов ошибок, когда их окно закончилось."""
+    tracker = state.error_tracker
+    summary = tracker.summary()
+    if summary:
+        notify_once(state, notify, RENDERER.error_summary(
+            summary, tracker.window, state.account.language
+        ), store)
+
+
+def commit_answer(state, response, store):
+    """Фиксация полностью обработанного ответа api."""
+    if store.persistent:
+        state.timestamp = int(response['current_date'])
+        store.set_cursor(state.account.name, state.timestamp)
+    if state.pending_validators is not None:
+        state.validators = state.pending_validators
+
+
+def poll_account(state, notify, client=None, store=None):
+    """Один цикл опроса api и отправки уведомлений для аккаунта.
+
+    Статусы и отправленные сообщения сохраняются в store. Если store
+    постоянный (есть файл состояния), включается инкрементальный
+    режим: from_date следующего запроса сдвигается на current_date
+    из ответа и тоже сохраняется. Неизменившийся ответ не проверяется
+    и не разбирается.
+    Возвращает True, если ответ api получен и разобран без ошибок.
+    """
+    store = store or open_state_store()
+    started = time.perf_counter()
+    try:
+        # Получаем ответ от api через функцию fetch_account_answer
+        response = fetch_account_answer(state, client)
+        if response is not None:
+            with PROCESS_SECONDS.time():
+                # Получаем корректные данные после проверки check_response
+                homeworks = check_response(response)
+                # Курсор и отпечаток сдвигаются только после отправки
+                # всех работ ответа, иначе ответ будет обработан повторно
+                delivered = process_homeworks(
+                    state, notify, homeworks, store
+                )
+            if delivered:
+                commit_answer(state, response, store)
+        state.failures = 0
+        return True
+    except Exception as error:
+        if isinstance(error, ConnectionError):
+            state.failures += 1
+        else:
+            state.failures = 0
+        breaker = client.breaker if client is not None else None
+        report_failure(state, notify, error, store, breaker)
+        return False
+    finally:
+        report_error_summary(state, notify, store)
+        POLL_SECONDS.observe(time.perf_counter() - started)
+
+
+def env_account():
+    """Аккаунт из переменных окружения."""
+    return Account(
+        name='default',
+        practicum_token=PRACTICUM_TOKEN,
+        telegram_token=TELEGRAM_TOKEN,
+        telegram_chat_id=TELEGRAM_CHAT_ID,
+        period=RETRY_PERIOD,
+    )
 
 
 def main():
     """Основная логика работы бота."""
+    configure_logging()
     # Проверяем наличие всех токенов
     check_tokens()
     # Экземпляр класса Bot
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    account = env_account()
+    store = open_state_store(STATE_FILE)
     # Временная метка в unix формате
-    timestamp = int(time.time())
-    hwork_status = None
-    message = None
-    old_message = None
-
-    while True:
-        try:
-            # Получаем ответ от api через функцию get_api_answer
-            response = get_api_answer(timestamp)
-            # Получаем корректные данные после проверки функцией check_response
-            homework = check_response(response)
-            parsed_homework = parse_status(homework)
-            if homework:
-                hwork_status_old = hwork_status
-                hwork_status = parsed_homework
-                if hwork_status_old != hwork_status:
-                    send_message(bot, hwork_status)
-                else:
-                    # Проверка на дубли изменения статуса
-                    old_message = message
-                    message = 'Статус не изменился'
-                    if old_message != message:
-                        send_message(bot, message)
-            else:
-                hwork_status_old = None
-                hwork_status = None
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            # Проверка на дубли ошибок при отправке сообщений
-            if old_message != message:
-                # Попытка отправить сообщение через send_message
-                # Если фун-я send_message возвращает True=>Сообщение отправлено
-                # => перезаписываем ошибку
-                if send_message(bot, message):
-                    old_message = message
-                    logger.debug('Сообщение отправлено, ошибка перезаписана')
-                else:
-                    logger.debug('Сообщение не отправлено')
-            else:
-                logger.debug('Статус ошибки не изменился')
-        finally:
-            time.sleep(RETRY_PERIOD)
+    state = AccountState(account, timestamp=int(time.time()))
+    # Теплый старт: курсор, статусы и последнее сообщение до первого опроса
+    snapshot = store.load_all().get(account.name)
+    if snapshot is not None:
+        state.restore(snapshot)
+    notify = partial(send_message, bot)
+    scheduler = PollScheduler()
+    # SIGTERM прерывает паузу сразу, а опрос и отправку - не обрывает
+    shutdown = Shutdown()
+    shutdown.install()
+
+    try:
+        while True:
+            # Без ошибок и изменений пауза равна RETRY_PERIOD
+            delay = RETRY_PERIOD
+            try:
+                poll_account(state, notify, store=store)
+                # Ошибка сохранения логируется и не останавливает бота
+                store.try_flush()
+                delay = scheduler.next_delay(state)
+            except Exception as error:
+                logger.error('Сбой цикла опроса: %s', error)
+            with shutdown.interruptible():
+                time.sleep(delay)
+    finally:
+        # Несохраненный хвост состояния записывается перед выходом
+        store.close()
+
+
+def register_runtime_metrics(engine, client, delivery):
+    """Метрики, вычисляемые по состоянию движка, пула и очереди."""
+    started = time.time()
+
+    def last_success_age():
+        now = time.time()
+        return {
+            (name,): now - (state.last_success or started)
+            for name, state in list(engine.states.items())
+        }
+
+    REGISTRY.register(Gauge(
+        'homework_last_success_age_seconds',
+        'Время с последнего успешного опроса аккаунта',
+        last_success_age, labels=('account',),
+    ))
+    REGISTRY.register(Gauge(
+        'homework_delivery_queue',
+        'Очередь доставки: глубина, отправки, повторы, задержки',
+        lambda: {(key,): value for key, value in delivery.metrics().items()},
+        labels=('stat',),
+    ))
+    breakers = [
+        breaker for breaker in (client.breaker, delivery.breaker)
+        if breaker is not None
+    ]
+    REGISTRY.register(Gauge(
+        'homework_breaker_state',
+        'Автоматы защиты: 0 - замкнут, 1 - разомкнут, 2 - полуоткрыт',
+        lambda: {
+            (breaker.name,): STATE_VALUES[breaker.state]
+            for breaker in breakers
+        },
+        labels=('dependency',),
+    ))
+    REGISTRY.register(Gauge(
+        'homework_http_pool',
+        'Пул соединений к api: запросы, соединения, пропуски',
+        lambda: {(key,): value for key, value in client.stats().items()},
+        labels=('stat',),
+    ))
+
+
+def queue_message(delivery, store, bot, account, message):
+    """Постановка уведомления аккаунта в очередь доставки.
+
+    Сообщение записывается в store до постановки и удаляется, когда
+    очередь доставит или окончательно отбросит его. Статус, записанный
+    после постановки, поэтому не теряется, если процесс остановится
+    или упадет раньше отправки: сообщение дошлет следующий запуск.
+    """
+    key = store.add_outgoing(account.name, account.telegram_chat_id, message)
+    return delivery.put(
+        bot, account.telegram_chat_id, message,
+        partial(store.remove_outgoing, key),
+    )
+
+
+def requeue_outgoing(delivery, store, states, bot_for, names):
+    """Постановка в очередь сообщений аккаунтов names из store.
+
+    Это сообщения, не доставленные прошлым запуском или прежним
+    владельцем аккаунта. states - состояния аккаунтов по именам,
+    bot_for возвращает бота аккаунта.
+    """
+    outgoing = store.load_outgoing(names)
+    for key, name, chat_id, message in outgoing:
+        state = states.get(name)
+        if state is None:
+            continue
+        delivery.put(
+            bot_for(state.account), chat_id, message,
+            partial(store.remove_outgoing, key),
+        )
+    if outgoing:
+        logger.info('Недоставленных сообщений в очереди: %d', len(outgoing))
+
+
+async def run_accounts(accounts, concurrency, client, store=None,
+                       delivery=None, reload=None, reload_interval=30.0,
+                       lease=None, lease_interval=5.0,
+                       shutdown_timeout=20.0, command_freshness=None):
+    """Опрос нескольких аккаунтов в одном процессе.
+
+    Сообщения уходят через очередь доставки, поэтому медленный
+    Telegram не задерживает следующий опрос api. reload передается
+    движку для перечитывания аккаунтов на ходу. С lease опрашиваются
+    только арендованные этим воркером аккаунты, аренды продлеваются
+    раз в lease_interval секунд и остаются за воркером, пока очередь
+    доставки не отправит все, иначе новый владелец пропустил бы или
+    повторил уведомления. Сообщения очереди хранятся в store до
+    доставки, недоставленные отправляются после перезапуска или
+    новым владельцем аккаунта. SIGTERM и SIGINT прерывают паузы, после
+    чего идущие опросы и очередь доставки дорабатывают не дольше
+    shutdown_timeout секунд в сумме. Если задан command_freshness,
+    боты аккаунтов отвечают на /status, /history и /now из кеша,
+    который моложе command_freshness секунд.
+    """
+    from homework_bot.delivery import DeliveryQueue
+
+    delivery = delivery or DeliveryQueue()
+    store = store if store is not None else open_state_store()
+    bots = {}
+    # poll выполняется в потоках пула, кеш ботов защищен блокировкой
+    bots_lock = threading.Lock()
+
+    def bot_for(account):
+        with bots_lock:
+            if account.telegram_token not in bots:
+                bots[account.telegram_token] = telegram.Bot(
+                    token=account.telegram_token
+                )
+            return bots[account.telegram_token]
+
+    def poll(state):
+        account = state.account
+        notify = partial(
+            queue_message, delivery, store, bot_for(account), account
+        )
+        return poll_account(state, notify, client, store)
+
+    engine = PollingEngine(
+        accounts, poll, concurrency=concurrency, store=store,
+        guard=lease.holds if lease is not None else None,
+        skip_delay=lease_interval,
+    )
+
+    def resend(names):
+        requeue_outgoing(delivery, store, engine.states, bot_for, names)
+
+    def gain(names):
+        engine.refresh(names)
+        resend(names)
+
+    register_runtime_metrics(engine, client, delivery)
+    keeper = None
+    if lease is not None:
+        # Перешедшие от другого воркера аккаунты дозакладывают в очередь
+        # сообщения, которые прежний владелец не успел доставить
+        keeper = LeaseKeeper(
+            lease, lambda: list(engine.states), gain, lease_interval,
+            flush=store.try_flush,
+        )
+        keeper.start()
+    else:
+        resend(list(engine.states))
+    delivery.start()
+    loop = asyncio.get_running_loop()
+    commands = None
+    if command_freshness is not None:
+        from homework_bot.commands import CommandBot, CommandService
+
+        commands = CommandBot(
+            CommandService(engine, RENDERER, loop, command_freshness),
+            [account.telegram_token for account in accounts],
+        )
+        commands.start()
+    signals = StopOnSignals(loop, engine.stop)
+    try:
+        with signals:
+            await engine.run(reload, reload_interval, shutdown_timeout)
+    finally:
+        if commands is not None:
+            commands.stop()
+        delivery.stop(signals.remaining(shutdown_timeout))
+        if keeper is not None:
+            keeper.stop()
+        logger.info('Статистика пула соединений: %s', client.stats())
+        logger.info('Статистика очереди доставки: %s', delivery.metrics())
+        client.close()
+
+
+def check_once(accounts, client, store, lease=None, concurrency=16):
+    """Один опрос аккаунтов без движка, очереди доставки и команд.
+
+    Режим коротких проверок по расписанию: стек Telegram импортируется
+    и боты создаются, только когда есть что отправить, сообщения
+    уходят сразу. С lease опрашиваются только аккаунты, аренду
+    которых удалось взять. Возвращает True, если все опросы успешны.
+    """
+    if lease is not None:
+        held = lease.renew(account.name for account in accounts)
+        accounts = [account for account in accounts if account.name in held]
+    snapshots = store.load_all()
+    bots = {}
+    bots_lock = threading.Lock()
+
+    def notify(account, message):
+        with bots_lock:
+            if account.telegram_token not in bots:
+                bots[account.telegram_token] = telegram.Bot(
+                    token=account.telegram_token
+                )
+            bot = bots[account.telegram_token]
+        return send_chat_message(bot, account.telegram_chat_id, message)
+
+    def poll(account):
+        state = AccountState(account)
+        if account.name in snapshots:
+            state.restore(snapshots[account.name])
+        return poll_account(state, partial(notify, account), client, store)
+
+    workers = max(min(concurrency, len(accounts)), 1)
+    try:
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(poll, accounts))
+        store.try_flush()
+    finally:
+        logger.info('Статистика пула соединений: %s', client.stats())
+        client.close()
+    logger.info(
+        'Опрошено аккаунтов: %d, с ошибками %d',
+        len(results), results.count(False),
+    )
+    return all(results)
+
+
+def report_config_errors(errors):
+    """Логирование ошибок конфигурации без остановки бота."""
+    for error in errors:
+        logger.error('Ошибка конфигурации аккаунтов: %s', error)
+
+
+def reload_config(source, shard, worker=None):
+    """Новые аккаунты шарда при изменении конфигурации, иначе None."""
+    result = source.reload()
+    if result is None:
+        return None
+    accounts, errors = result
+    report_config_errors(errors)
+    return select_accounts(accounts, shard, worker)
+
+
+def worker_argv(argv, args, worker, workers):
+    """Аргументы воркера пула: доля шарда машины, порт и файл метрик."""
+    argv = [*argv, '--workers', '1', '--worker-shard', f'{worker}/{workers}']
+    if args.metrics_port is not None:
+        argv += ['--metrics-port', str(args.metrics_port + worker)]
+    if args.metrics_file:
+        argv += ['--metrics-file', f'{args.metrics_file}.{worker}']
+    return argv
+
+
+def launch_workers(argv, args):
+    """Запуск процессов, делящих между собой шард этой машины."""
+    workers = args.workers or os.cpu_count() or 1
+    if not args.rate_limit_file:
+        # Воркеры машины делят одни корзины ограничителя
+        argv = [*argv, '--rate-limit-file', os.path.join(
+            tempfile.gettempdir(), 'homework_bot_ratelimit.db'
+        )]
+    WorkerPool(cli, [
+        (worker_argv(argv, args, worker, workers),)
+        for worker in range(workers)
+    ]).run()
+
+
+def cli(argv=None):
+    """Разбор аргументов командной строки и запуск бота.
+
+    Без --accounts опрашивается аккаунт из переменных окружения, но
+    тоже через движок и общий пул соединений с keep-alive.
+    """
+    parser = argparse.ArgumentParser(description='Бот статусов домашек')
+    parser.add_argument(
+        '--accounts',
+        help='файл json, toml или yaml либо каталог таких файлов '
+             'со списком аккаунтов для опроса в одном процессе',
+    )
+    parser.add_argument(
+        '--reload-interval', type=float, default=30.0,
+        help='период проверки изменений --accounts, сек, 0 - выкл',
+    )
+    parser.add_argument(
+        '--concurrency', type=int, default=16,
+        help='максимальное число одновременных запросов к api',
+    )
+    parser.add_argument(
+        '--connect-timeout', type=float, default=API_TIMEOUT[0],
+        help='таймаут установки соединения с api, сек',
+    )
+    parser.add_argument(
+        '--read-timeout', type=float, default=API_TIMEOUT[1],
+        help='таймаут чтения ответа api, сек',
+    )
+    parser.add_argument(
+        '--delivery-workers', type=int, default=4,
+        help='число потоков отправки сообщений в Telegram',
+    )
+    parser.add_argument(
+        '--digest-window', type=float, default=0.0,
+        help='сколько секунд копить уведомления чата в одно сообщение, '
+             '0 - без дайджестов',
+    )
+    parser.add_argument(
+        '--digest-size', type=int, default=10,
+        help='число уведомлений, после которого дайджест уходит сразу',
+    )
+    parser.add_argument(
+        '--urgent-statuses', default='approved,rejected',
+        help='статусы через запятую, уведомления о которых отправляют '
+             'дайджест сразу',
+    )
+    parser.add_argument(
+        '--breaker-threshold', type=int, default=5,
+        help='сбоев подряд до размыкания автомата защиты api и Telegram, '
+             '0 - без автоматов',
+    )
+    parser.add_argument(
+        '--breaker-timeout', type=float, default=30.0,
+        help='пауза разомкнутого автомата до пробных запросов, сек',
+    )
+    parser.add_argument(
+        '--breaker-probes', type=int, default=1,
+        help='успешных пробных запросов для замыкания автомата',
+    )
+    parser.add_argument(
+        '--api-rate', type=float, default=10.0,
+        help='запросов к api в секунду со всех воркеров машины, 0 - выкл',
+    )
+    parser.add_argument(
+        '--telegram-rate', type=float, default=30.0,
+        help='сообщений в секунду от одного бота, 0 - выкл',
+    )
+    parser.add_argument(
+        '--chat-rate', type=float, default=1.0,
+        help='сообщений в секунду в один чат, 0 - выкл',
+    )
+    parser.add_argument(
+        '--rate-limit-file', default=os.getenv('RATE_LIMIT_FILE'),
+        help='база SQLite с корзинами ограничителя, общая для процессов '
+             'машины; без нее корзины в памяти процесса',
+    )
+    parser.add_argument(
+        '--coalesce-ttl', type=float, default=5.0,
+        help='сколько секунд одинаковые опросы аккаунта берут ответ api '
+             'из кеша, 0 - только объединение одновременных',
+    )
+    parser.add_argument(
+        '--commands', action='store_true',
+        help='отвечать на /status, /history и /now; команды бота '
+             'принимает один процесс, поэтому без --workers и --shard',
+    )
+    parser.add_argument(
+        '--command-freshness', type=float, default=60.0,
+        help='возраст кеша, после которого /now опрашивает api, сек',
+    )
+    parser.add_argument(
+        '--once', action='store_true',
+        help='опросить аккаунты один раз и выйти с кодом 1 при ошибках; '
+             'Telegram загружается, только если есть что отправить',
+    )
+    parser.add_argument(
+        '--metrics-port', type=int,
+        help='порт локального http сервера с метриками /metrics',
+    )
+    parser.add_argument(
+        '--metrics-file',
+        help='файл для периодической записи метрик',
+    )
+    parser.add_argument(
+        '--metrics-interval', type=float, default=15.0,
+        help='период записи --metrics-file, сек',
+    )
+    parser.add_argument(
+        '--shard', type=parse_shard,
+        default=os.getenv('HOMEWORK_SHARD', '0/1'),
+        help='номер/число шардов, например 3/16: процесс опрашивает '
+             'только свою стабильную часть аккаунтов',
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='число процессов-воркеров на машине, 0 - по числу ядер',
+    )
+    parser.add_argument(
+        '--worker-shard', type=parse_shard,
+        help='номер/число воркера внутри шарда машины, задает пул '
+             'воркеров --workers',
+    )
+    parser.add_argument(
+        '--lease-file', default=os.getenv('LEASE_FILE'),
+        help='база SQLite с арендами аккаунтов, по умолчанию --state-file',
+    )
+    parser.add_argument(
+        '--lease-ttl', type=float, default=30.0,
+        help='срок аренды аккаунта без продления, сек, 0 - без аренд',
+    )
+    parser.add_argument(
+        '--lease-interval', type=float, default=5.0,
+        help='период продления аренд, сек',
+    )
+    parser.add_argument(
+        '--shutdown-timeout', type=float, default=20.0,
+        help='срок доработки опросов и отправок после SIGTERM, сек',
+    )
+    parser.add_argument(
+        '--log-level', default='DEBUG',
+        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'),
+        help='начальный уровень логов, SIGUSR1/SIGUSR2 меняют его на ходу',
+    )
+    parser.add_argument(
+        '--log-interval', type=float, default=60.0,
+        help='окно прореживания повторяющихся сообщений, сек, 0 - выкл',
+    )
+    parser.add_argument(
+        '--log-burst', type=int, default=1,
+        help='сообщений одного шаблона за окно --log-interval',
+    )
+    parser.add_argument(
+        '--state-file', default=STATE_FILE,
+        help='база SQLite с курсорами, статусами и отправленными сообщениями',
+    )
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = parser.parse_args(argv)
+    if args.commands and (
+        args.workers != 1 or args.worker_shard or args.shard[1] > 1
+    ):
+        # Telegram отдает обновления бота одному получателю, остальные
+        # процессы с тем же токеном получали бы 409 Conflict
+        parser.error(
+            '--commands нельзя совмещать с --workers, --shard и '
+            '--worker-shard: команды бота принимает один процесс'
+        )
+    if args.workers != 1 and not args.once:
+        launch_workers(argv, args)
+        return
+    configure_logging(level=args.log_level)
+    install_level_signals(*BOT_LOGGERS)
+    filters = []
+    if args.log_interval > 0:
+        filters.append(RateLimitFilter(args.log_interval, args.log_burst))
+    log_queue = QueueLogging(logging.getLogger(), filters)
+    log_queue.start()
+    try:
+        run_cli(args)
+    finally:
+        log_queue.stop()
+
+
+def make_breaker(name, args):
+    """Автомат защиты зависимости name или None, если они выключены."""
+    if args.breaker_threshold <= 0:
+        return None
+    return CircuitBreaker(
+        name, args.breaker_threshold, args.breaker_timeout,
+        args.breaker_probes,
+    )
+
+
+def make_limiter(args):
+    """Ограничитель запросов к api и отправок в Telegram."""
+    limits = {
+        'endpoint': args.api_rate and Rate(
+            args.api_rate, max(int(args.api_rate), 1)
+        ),
+        'bot': args.telegram_rate and Rate(
+            args.telegram_rate, max(int(args.telegram_rate), 1)
+        ),
+        'chat': args.chat_rate and Rate(args.chat_rate),
+    }
+    backend = None
+    if args.rate_limit_file:
+        backend = SQLiteBuckets(args.rate_limit_file)
+    return RateLimiter(limits, backend)
+
+
+def make_delivery(args, limiter):
+    """Очередь доставки сообщений в Telegram."""
+    from homework_bot.delivery import DeliveryQueue
+
+    urgent = set(filter(None, args.urgent_statuses.split(',')))
+    return DeliveryQueue(
+        workers=args.delivery_workers,
+        breaker=make_breaker('telegram', args),
+        limiter=limiter,
+        digest_window=args.digest_window,
+        digest_size=args.digest_size,
+        urgent=lambda message: RENDERER.status_of(message) in urgent,
+    )
+
+
+def load_accounts(args):
+    """Аккаунты шарда и функция перечитывания конфигурации либо None."""
+    if not args.accounts:
+        check_tokens()
+        return select_accounts(
+            [env_account()], args.shard, args.worker_shard
+        ), None
+    source = ConfigSource(args.accounts)
+    accounts, errors = source.load()
+    report_config_errors(errors)
+    reload = None
+    if args.reload_interval > 0 and not args.once:
+        reload = partial(
+            reload_config, source, args.shard, args.worker_shard
+        )
+    elif not accounts:
+        logger.critical('Нет ни одного корректного аккаунта')
+        sys.exit('Завершение работы бота')
+    return select_accounts(accounts, args.shard, args.worker_shard), reload
+
+
+def run_cli(args):
+    """Запуск движка по разобранным аргументам командной строки.
+
+    Клиент api и очередь доставки импортируются здесь, а не при
+    импорте модуля, чтобы короткий запуск не платил за requests и
+    стек Telegram раньше, чем они понадобятся.
+    """
+    from homework_bot.client import PracticumClient
+
+    accounts, reload = load_accounts(args)
+    store = open_state_store(args.state_file)
+    lease = None
+    lease_file = args.lease_file or args.state_file
+    if lease_file and args.lease_ttl > 0:
+        lease = LeaseManager(lease_file, ttl=args.lease_ttl)
+    logger.info(
+        'Загружено аккаунтов: %d, шард %d/%d, воркер %s', len(accounts),
+        *args.shard, '/'.join(map(str, args.worker_shard or (0, 1))),
+    )
+    limiter = make_limiter(args)
+    client = PracticumClient(
+        pool_size=args.concurrency,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        breaker=make_breaker('api', args),
+        limiter=limiter,
+        flights=SingleFlight(args.coalesce_ttl),
+    )
+    exporters = []
+    if args.metrics_port is not None:
+        exporters.append(MetricsServer(args.metrics_port))
+    if args.metrics_file:
+        exporters.append(
+            SnapshotWriter(args.metrics_file, args.metrics_interval)
+        )
+    for exporter in exporters:
+        exporter.start()
+    succeeded = True
+    try:
+        if args.once:
+            succeeded = check_once(
+                accounts, client, store, lease, args.concurrency
+            )
+        else:
+            asyncio.run(run_accounts(
+                accounts, args.concurrency, client, store,
+                make_delivery(args, limiter), reload, args.reload_interval,
+                lease, args.lease_interval, args.shutdown_timeout,
+                args.command_freshness if args.commands else None,
+            ))
+    finally:
+        for exporter in exporters:
+            exporter.stop()
+        # Аренды отпускаются последними: к этому моменту очередь
+        # доставки пуста, а состояние записано в базу
+        store.close()
+        limiter.close()
+        if lease is not None:
+            lease.close()
+    if not succeeded:
+        sys.exit('Не все аккаунты опрошены успешно')
 
 
 if __name__ == '__main__':
-    main()
+    cli()
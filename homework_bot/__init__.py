@@ -0,0 +1 @@
+"""Инфраструктура для одновременного обслуживания многих аккаунтов."""
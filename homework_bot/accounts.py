@@ -0,0 +1,169 @@
+import json
+import os
+from dataclasses import dataclass, field
+
+# Поддерживаемые форматы файлов конфигурации
+CONFIG_SUFFIXES = ('.json', '.toml', '.yaml', '.yml')
+
+
+@dataclass(frozen=True)
+class Account:
+    """Учетные данные одного студента."""
+
+    name: str
+    practicum_token: str = field(repr=False)
+    telegram_token: str = field(repr=False)
+    telegram_chat_id: str
+    period: int = 600
+    language: str = 'ru'
+
+    @property
+    def headers(self):
+        """Заголовки запроса к api для аккаунта."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+
+REQUIRED_FIELDS = (
+    'name', 'practicum_token', 'telegram_token', 'telegram_chat_id'
+)
+
+
+def validate_account(item):
+    """Список ошибок в описании одного аккаунта."""
+    if not isinstance(item, dict):
+        return ['описание аккаунта должно быть объектом']
+    errors = [
+        f'не заполнено поле {key}' for key in REQUIRED_FIELDS
+        if not item.get(key) or not isinstance(item[key], str)
+    ]
+    unknown = set(item) - set(REQUIRED_FIELDS) - {'period', 'language'}
+    if unknown:
+        errors.append(f'неизвестные поля {sorted(unknown)}')
+    period = item.get('period', 600)
+    if not isinstance(period, int) or isinstance(period, bool) or period <= 0:
+        errors.append('period должен быть положительным целым числом')
+    if not isinstance(item.get('language', 'ru'), str):
+        errors.append('language должен быть строкой, например ru или en')
+    return errors
+
+
+def read_config_file(path):
+    """Содержимое json, toml или yaml файла.
+
+    Пакеты для toml и yaml импортируются только при чтении таких файлов.
+    """
+    suffix = os.path.splitext(str(path))[1].lower()
+    if suffix == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError('для toml нужен python 3.11+ или tomli')
+        with open(path, 'rb') as file:
+            data = tomllib.load(file)
+    elif suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError('для yaml нужен пакет PyYAML')
+        with open(path, encoding='utf-8') as file:
+            data = yaml.safe_load(file)
+    else:
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+    return data
+
+
+def parse_config_file(path):
+    """Список описаний аккаунтов из файла конфигурации.
+
+    Файл содержит список аккаунтов, объект с ключом accounts (в toml -
+    таблицы [[accounts]]) или один аккаунт.
+    """
+    data = read_config_file(path)
+    if isinstance(data, dict) and 'accounts' in data:
+        data = data['accounts']
+    elif isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise ValueError('ожидается список аккаунтов')
+    return data
+
+
+def config_files(path):
+    """Файлы конфигурации: сам path или файлы каталога path."""
+    if not os.path.isdir(path):
+        return [str(path)]
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.lower().endswith(CONFIG_SUFFIXES)
+    )
+
+
+def load_config(path, previous=None):
+    """Загрузка аккаунтов из файла или каталога без остановки на ошибках.
+
+    Возвращает корректные аккаунты и список ошибок по остальным.
+    Аккаунт с ошибкой или из нечитаемого файла заменяется прежней
+    версией из previous, если она была, чтобы опечатка в конфигурации
+    не останавливала опрос студента.
+    """
+    previous = {account.name: account for account in previous or ()}
+    accounts = {}
+    errors = []
+    for file_path in config_files(path):
+        try:
+            data = parse_config_file(file_path)
+        except (OSError, ValueError) as error:
+            errors.append(f'{file_path}: {error}')
+            continue
+        for index, item in enumerate(data):
+            problems = validate_account(item)
+            name = item.get('name') if isinstance(item, dict) else None
+            if name in accounts:
+                problems.append(f'повторяется имя {name}')
+            if problems:
+                errors.extend(
+                    f'{file_path}: аккаунт #{index}: {problem}'
+                    for problem in problems
+                )
+                if name in previous and name not in accounts:
+                    accounts[name] = previous[name]
+                continue
+            accounts[name] = Account(**item)
+    return list(accounts.values()), errors
+
+
+class ConfigSource:
+    """Файл или каталог с аккаунтами, перечитываемый при изменении."""
+
+    def __init__(self, path):
+        """Источник конфигурации path."""
+        self.path = path
+        self.accounts = []
+        self._signature = None
+
+    def _stat(self):
+        """Имена, размеры и время изменения файлов конфигурации."""
+        signature = []
+        for file_path in config_files(self.path):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def load(self):
+        """Загрузка аккаунтов, ошибки возвращаются списком."""
+        self._signature = self._stat()
+        self.accounts, errors = load_config(self.path, self.accounts)
+        return self.accounts, errors
+
+    def reload(self):
+        """Перечитывание при изменении файлов, иначе None."""
+        if self._stat() == self._signature:
+            return None
+        return self.load()
@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+
+from homework_bot.metrics import BREAKER_REJECTED, BREAKER_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+# Значения состояний в метрике homework_breaker_state
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class DependencyError(ConnectionError):
+    """Сбой внешней зависимости, а не ошибка отдельного аккаунта."""
+
+
+class CircuitOpenError(DependencyError):
+    """Запрос не отправлен: автомат защиты зависимости разомкнут."""
+
+
+class CircuitBreaker:
+    """Автомат защиты одной внешней зависимости.
+
+    В замкнутом состоянии запросы идут как обычно, failure_threshold
+    сбоев подряд размыкают автомат. Разомкнутый автомат сразу
+    отклоняет запросы, а через recovery_timeout секунд пропускает не
+    больше probes пробных (полуоткрытое состояние). Успех всех проб
+    замыкает автомат, сбой любой из них снова размыкает. Каждое
+    размыкание из замкнутого состояния начинает новый сбой с номером
+    outage, по нему пользователи узнают о сбое один раз.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0,
+                 probes=1, clock=time.monotonic):
+        """Замкнутый автомат зависимости name."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probes = probes
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.outage = 0
+        self.opened_at = None
+        self._probes_left = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def _switch(self, state):
+        """Переход в состояние state с учетом в метриках."""
+        self.state = state
+        BREAKER_TRANSITIONS.inc(self.name, state)
+        logger.warning('Автомат защиты %s: %s', self.name, state)
+
+    def _open(self):
+        """Размыкание, новый сбой начинается только из замкнутого."""
+        if self.state == CLOSED:
+            self.outage += 1
+        self.opened_at = self.clock()
+        self._switch(OPEN)
+
+    def allow(self):
+        """Можно ли отправить запрос, в полуоткрытом - как пробу."""
+        with self._lock:
+            if self.state == OPEN and self._retry_in() == 0:
+                self._probes_left = self.probes
+                self._probe_successes = 0
+                self._switch(HALF_OPEN)
+            if self.state == HALF_OPEN and self._probes_left:
+                self._probes_left -= 1
+                return True
+            if self.state == CLOSED:
+                return True
+        BREAKER_REJECTED.inc(self.name)
+        return False
+
+    def record_success(self):
+        """Учет успешного запроса."""
+        with self._lock:
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    self._switch(CLOSED)
+
+    def record_failure(self):
+        """Учет сбоя запроса."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED
+                and self.failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def _retry_in(self):
+        """retry_in под уже взятой блокировкой."""
+        if self.state != OPEN:
+            return 0.0
+        elapsed = self.clock() - self.opened_at
+        return max(self.recovery_timeout - elapsed, 0.0)
+
+    def retry_in(self):
+        """Секунды до первой пробы, 0 - если автомат не разомкнут."""
+        with self._lock:
+            return self._retry_in()
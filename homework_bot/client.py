@@ -0,0 +1,205 @@
+import threading
+import time
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.poolmanager import pool_classes_by_scheme
+
+from homework_bot import fastjson
+from homework_bot.breaker import CircuitOpenError
+from homework_bot.validators import Validators, fingerprint
+
+
+class PoolStats:
+    """Счетчики использования пула соединений."""
+
+    def __init__(self):
+        """Обнуленные счетчики."""
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.reuses = 0
+        self.new_connections = 0
+        self.failed_connections = 0
+        self.handshake_time = 0.0
+        self.unchanged = 0
+
+    def record_unchanged(self):
+        """Учет опроса, ответ которого не изменился."""
+        with self._lock:
+            self.unchanged += 1
+
+    def record_request(self, reused):
+        """Учет запроса, отправленного по новому или живому соединению."""
+        with self._lock:
+            self.requests += 1
+            if reused:
+                self.reuses += 1
+
+    def record_connect(self, duration, failed=False):
+        """Учет попытки установить соединение и ее длительности."""
+        with self._lock:
+            if failed:
+                self.failed_connections += 1
+            else:
+                self.new_connections += 1
+                self.handshake_time += duration
+
+    def snapshot(self):
+        """Текущие значения счетчиков."""
+        with self._lock:
+            connections = self.new_connections
+            return {
+                'requests': self.requests,
+                'new_connections': connections,
+                'failed_connections': self.failed_connections,
+                'reuses': self.reuses,
+                'skipped_unchanged': self.unchanged,
+                'handshake_time': self.handshake_time,
+                'handshake_avg': (
+                    self.handshake_time / connections if connections else 0.0
+                ),
+            }
+
+
+def _timed_pool_class(pool_class, stats):
+    """Класс пула, который считает переиспользования и время соединений."""
+    base_connection = pool_class.ConnectionCls
+
+    class TimedConnection(base_connection):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                super().connect()
+            except Exception:
+                stats.record_connect(time.perf_counter() - started, True)
+                raise
+            stats.record_connect(time.perf_counter() - started)
+
+    class TimedPool(pool_class):
+        ConnectionCls = TimedConnection
+
+        def _make_request(self, conn, *args, **kwargs):
+            # Живой сокет у соединения из пула означает keep-alive
+            stats.record_request(getattr(conn, 'sock', None) is not None)
+            return super()._make_request(conn, *args, **kwargs)
+
+    TimedPool.__name__ = pool_class.__name__
+    return TimedPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter, собирающий статистику пула соединений."""
+
+    def __init__(self, stats, **kwargs):
+        """Адаптер, пишущий статистику в stats."""
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Подмена классов пулов на замеряющие установку соединения."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: _timed_pool_class(pool_class, self.stats)
+            for scheme, pool_class in pool_classes_by_scheme.items()
+        }
+
+
+class PracticumClient:
+    """Общий http клиент к api практикума.
+
+    Держит keep-alive соединения в пуле, поэтому повторные запросы
+    не платят за установку TCP и TLS соединения. Таймауты на установку
+    соединения и чтение ответа не дают зависшему сокету остановить
+    опрос. Тело ответа разбирается функцией loads, по умолчанию
+    orjson, если он установлен. Если передан breaker (CircuitBreaker),
+    сбои соединения и ответы 5xx размыкают его, и пока api лежит,
+    запросы отклоняются без обращения к сети. С limiter (RateLimiter)
+    запрос ждет места в корзине endpoint своего хоста. flights
+    (SingleFlight) объединяет одинаковые одновременные опросы.
+    """
+
+    def __init__(self, pool_size=16, connect_timeout=5, read_timeout=30,
+                 loads=fastjson.loads, breaker=None, limiter=None,
+                 flights=None):
+        """Сессия с пулом на pool_size соединений и таймаутами."""
+        self.timeout = (connect_timeout, read_timeout)
+        self.loads = loads
+        self.breaker = breaker
+        self.limiter = limiter
+        self.flights = flights
+        self.pool_stats = PoolStats()
+        self.session = requests.Session()
+        adapter = PooledAdapter(
+            self.pool_stats,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, **kwargs):
+        """GET запрос через общий пул соединений."""
+        kwargs.setdefault('timeout', self.timeout)
+        if self.limiter is not None:
+            # Место в корзине берется до автомата, чтобы ожидание или
+            # сбой ограничителя не тратили пробу полуоткрытого автомата
+            self.limiter.acquire(('endpoint', urlsplit(url).netloc))
+        if self.breaker is None:
+            return self.session.get(url, **kwargs)
+        if not self.breaker.allow():
+            raise CircuitOpenError(
+                f'Автомат защиты {self.breaker.name} разомкнут'
+            )
+        try:
+            response = self.session.get(url, **kwargs)
+        except BaseException:
+            # Любой выход после allow должен вернуть пробу автомату
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get_if_changed(self, url, validators, **kwargs):
+        """Условный GET: (response, новые validators, изменился ли ответ).
+
+        Сервер получает If-None-Match и If-Modified-Since из validators,
+        а если он их не поддерживает, тело ответа сравнивается по
+        отпечатку. Ответ 304 или совпавший отпечаток - без изменений.
+        """
+        headers = dict(kwargs.pop('headers', None) or {})
+        if validators.etag:
+            headers['If-None-Match'] = validators.etag
+        if validators.last_modified:
+            headers['If-Modified-Since'] = validators.last_modified
+        response = self.get(url, headers=headers, **kwargs)
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            self.pool_stats.record_unchanged()
+            return response, validators, False
+        if response.status_code != HTTPStatus.OK:
+            return response, validators, True
+        new_validators = Validators(
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            fingerprint=fingerprint(response.content),
+        )
+        if new_validators.fingerprint == validators.fingerprint:
+            self.pool_stats.record_unchanged()
+            return response, new_validators, False
+        return response, new_validators, True
+
+    def decode(self, response):
+        """Разбор json тела ответа без декодирования в str."""
+        return self.loads(response.content)
+
+    def stats(self):
+        """Статистика пула: запросы, соединения, неизменные ответы."""
+        return self.pool_stats.snapshot()
+
+    def close(self):
+        """Закрытие всех соединений пула."""
+        self.session.close()
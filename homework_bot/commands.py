@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from functools import partial
+
+from telegram.ext import CommandHandler, Updater
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = ('status', 'history', 'now')
+
+
+class CommandService:
+    """Ответы на команды пользователей по кешу статусов движка.
+
+    /status и /history отвечают из истории изменений в памяти, которая
+    при старте восстанавливается из хранилища состояния. /now
+    обращается к api, только если последний успешный опрос аккаунта
+    старше freshness секунд, а одновременные /now одного аккаунта
+    ждут один внеочередной опрос движка. Методы вызываются из потоков
+    фронтенда, опрос запускается в event loop движка loop.
+    """
+
+    def __init__(self, engine, renderer, loop, freshness=60.0,
+                 timeout=30.0):
+        """Сервис команд для аккаунтов engine."""
+        self.engine = engine
+        self.renderer = renderer
+        self.loop = loop
+        self.freshness = freshness
+        self.timeout = timeout
+
+    def find(self, bot_token, chat_id):
+        """Состояние аккаунта, бот которого пишет в чат chat_id."""
+        chat_id = str(chat_id)
+        for state in list(self.engine.states.values()):
+            account = state.account
+            if (account.telegram_chat_id == chat_id
+                    and account.telegram_token == bot_token):
+                return state
+        return None
+
+    def is_fresh(self, state):
+        """Моложе ли последний успешный опрос аккаунта freshness."""
+        return (
+            state.last_success is not None
+            and time.time() - state.last_success < self.freshness
+        )
+
+    def refresh(self, state):
+        """Внеочередной опрос аккаунта, если его кеш устарел."""
+        if self.is_fresh(state):
+            return
+        future = asyncio.run_coroutine_threadsafe(
+            self.engine.poll_now(state.account.name), self.loop
+        )
+        try:
+            future.result(self.timeout)
+        except Exception as error:
+            future.cancel()
+            logger.warning(
+                'Внеочередной опрос %s не выполнен: %r',
+                state.account.name, error,
+            )
+
+    def answer(self, command, bot_token, chat_id):
+        """Текст ответа на команду, None - чат не принадлежит аккаунту."""
+        state = self.find(bot_token, chat_id)
+        if state is None:
+            return None
+        if command == 'now':
+            self.refresh(state)
+        language = state.account.language
+        if command == 'history':
+            return self.renderer.history_report(
+                list(state.history), language
+            )
+        return self.renderer.status_report(state.statuses.entries(), language)
+
+
+class CommandBot:
+    """Прием команд из Telegram через long polling.
+
+    На каждый токен бота запускается свой Updater. Telegram отдает
+    обновления бота только одному получателю, поэтому команды
+    принимает один процесс на бота.
+    """
+
+    def __init__(self, service, tokens):
+        """Updater с обработчиками COMMANDS для каждого из tokens."""
+        self.service = service
+        self.updaters = []
+        for token in sorted(set(tokens)):
+            updater = Updater(token=token, use_context=True)
+            for command in COMMANDS:
+                updater.dispatcher.add_handler(CommandHandler(
+                    command, partial(self._handle, command, token)
+                ))
+            self.updaters.append(updater)
+
+    def _handle(self, command, token, update, context):
+        """Ответ на команду в тот же чат."""
+        text = self.service.answer(command, token, update.effective_chat.id)
+        if text is not None:
+            update.effective_message.reply_text(text)
+
+    def start(self):
+        """Запуск приема команд без старых накопившихся обновлений."""
+        for updater in self.updaters:
+            updater.start_polling(drop_pending_updates=True)
+
+    def stop(self):
+        """Остановка приема команд."""
+        for updater in self.updaters:
+            updater.stop()
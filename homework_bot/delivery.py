@@ -0,0 +1,358 @@
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+
+from telegram.error import (BadRequest, ChatMigrated, InvalidToken,
+                            RetryAfter, Unauthorized)
+
+from homework_bot.metrics import TELEGRAM_SEND_SECONDS, TELEGRAM_SENDS
+from homework_bot.ratelimit import telegram_keys
+
+logger = logging.getLogger(__name__)
+
+# Ошибки, при которых повторная отправка бессмысленна
+PERMANENT_ERRORS = (BadRequest, ChatMigrated, InvalidToken, Unauthorized)
+# Максимальная длина сообщения в Telegram
+MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = '\n\n'
+
+
+class DeliveryStats:
+    """Метрики очереди доставки."""
+
+    def __init__(self):
+        """Обнуленные счетчики."""
+        self.enqueued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.dropped = 0
+        self.send_time = 0.0
+        self.max_send_time = 0.0
+        self.wait_time = 0.0
+
+    def snapshot(self, depth, in_flight):
+        """Текущие значения метрик и глубина очереди."""
+        return {
+            'depth': depth,
+            'in_flight': in_flight,
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'retries': self.retries,
+            'dropped': self.dropped,
+            'send_latency_avg': self.send_time / self.sent if self.sent else 0,
+            'send_latency_max': self.max_send_time,
+            'queue_wait_avg': self.wait_time / self.sent if self.sent else 0,
+        }
+
+
+class _Chat:
+    """Очередь сообщений одного чата."""
+
+    def __init__(self, bot, chat_id):
+        """Пустая очередь чата."""
+        self.bot = bot
+        self.chat_id = chat_id
+        self.messages = deque()
+        self.ready_at = 0.0
+        self.attempts = 0
+        self.scheduled = False
+        # Время отправки в очереди готовых и конец окна дайджеста
+        self.due = 0.0
+        self.digest_until = 0.0
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений Telegram, отвязанная от опроса api.
+
+    Сообщения отправляют фоновые потоки. Для каждого чата соблюдается
+    пауза chat_interval между отправками, для всех чатов вместе - не
+    больше global_rate сообщений в секунду. Несколько ожидающих
+    сообщений одного чата склеиваются в одно. Временные ошибки
+    Telegram (сеть, RetryAfter) повторяются с растущей паузой, пока
+    сообщение не будет доставлено; постоянные (бот заблокирован,
+    неверный чат) - логируются и сообщение отбрасывается. Если
+    передан breaker (CircuitBreaker), сетевые сбои Telegram размыкают
+    его, и пока Telegram лежит, сообщения ждут в очереди без попыток
+    отправки. Потоки отправки отделены от пула опроса api, поэтому
+    сбои Telegram не задерживают опрос, а сбои api - отправку.
+    Если передан limiter (RateLimiter), отправка занимает место в
+    корзинах чата и бота, общих для всех процессов машины, а чат без
+    места ждет в очереди, не занимая поток. С digest_window сообщения
+    чата копятся до digest_window секунд или digest_size штук и уходят
+    одним; сообщение, для которого urgent(message) истинно, отправляет
+    накопленное сразу. Колбэк done сообщения вызывается, когда оно
+    доставлено или отброшено окончательно; сообщения, не доставленные
+    к остановке, его не получают.
+    """
+
+    def __init__(self, workers=4, chat_interval=1.0, global_rate=30,
+                 backoff_start=1.0, backoff_max=300.0, breaker=None,
+                 limiter=None, digest_window=0.0, digest_size=10,
+                 urgent=None):
+        """Настройка ограничений; потоки запускает start()."""
+        self.workers = workers
+        self.digest_window = digest_window
+        self.digest_size = digest_size
+        self.urgent = urgent
+        self.breaker = breaker
+        self.limiter = limiter
+        self.chat_interval = chat_interval
+        self.global_interval = 1 / global_rate
+        self.backoff_start = backoff_start
+        self.backoff_max = backoff_max
+        self.stats = DeliveryStats()
+        self._chats = {}
+        self._ready = []
+        self._depth = 0
+        self._in_flight = 0
+        self._next_global = 0.0
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def put(self, bot, chat_id, message, done=None):
+        """Постановка сообщения в очередь, True - сообщение принято."""
+        with self._condition:
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _Chat(bot, chat_id)
+            now = time.monotonic()
+            if not chat.messages and self.digest_window > 0:
+                chat.digest_until = now + self.digest_window
+            chat.messages.append((message, now, done))
+            if (len(chat.messages) >= self.digest_size
+                    or self.urgent is not None and self.urgent(message)):
+                chat.digest_until = 0.0
+            self._depth += 1
+            self.stats.enqueued += 1
+            self._schedule(chat)
+            self._condition.notify()
+        return True
+
+    def _schedule(self, chat):
+        """Постановка чата в очередь готовых к отправке.
+
+        Если чат уже стоит в очереди позже нового срока (дайджест
+        отправляется досрочно), он ставится еще раз, а прежняя запись
+        пропускается в _take.
+        """
+        if not chat.messages:
+            return
+        due = max(chat.ready_at, chat.digest_until)
+        if chat.scheduled and chat.due <= due:
+            return
+        chat.scheduled = True
+        chat.due = due
+        heapq.heappush(self._ready, (due, id(chat), chat))
+
+    def _take(self):
+        """Ожидание чата, которому можно отправить сообщение."""
+        with self._condition:
+            while not self._stopped:
+                now = time.monotonic()
+                self._drop_stale()
+                if self._ready:
+                    ready_at = max(self._ready[0][0], self._next_global)
+                    if ready_at <= now:
+                        chat = heapq.heappop(self._ready)[2]
+                        chat.scheduled = False
+                        chat.digest_until = 0.0
+                        self._next_global = now + self.global_interval
+                        self._in_flight += 1
+                        return chat, self._coalesce(chat)
+                    self._condition.wait(ready_at - now)
+                else:
+                    self._condition.wait()
+            return None, None
+
+    def _drop_stale(self):
+        """Удаление записей чатов, переставленных на более ранний срок."""
+        while self._ready:
+            due, _, chat = self._ready[0]
+            if chat.scheduled and chat.due == due:
+                return
+            heapq.heappop(self._ready)
+
+    def flush(self):
+        """Отправка накопленных дайджестов, не дожидаясь конца окна."""
+        with self._condition:
+            for chat in self._chats.values():
+                chat.digest_until = 0.0
+                self._schedule(chat)
+            self._condition.notify_all()
+
+    def _coalesce(self, chat):
+        """Склейка ожидающих сообщений чата в одно сообщение."""
+        batch = [chat.messages.popleft()]
+        length = len(batch[0][0])
+        while chat.messages:
+            message = chat.messages[0][0]
+            length += len(MESSAGE_SEPARATOR) + len(message)
+            if length > MAX_MESSAGE_LENGTH:
+                break
+            batch.append(chat.messages.popleft())
+        return batch
+
+    def _admit(self, chat, batch):
+        """Проверка корзин и автомата, False - отправка отложена."""
+        if self.limiter is not None:
+            # Место в корзинах проверяется до автомата, чтобы отложенная
+            # отправка не тратила пробу полуоткрытого автомата
+            wait = self.limiter.try_acquire(
+                *telegram_keys(chat.bot, chat.chat_id)
+            )
+            if wait > 0:
+                self._defer(chat, batch, wait)
+                return False
+        breaker = self.breaker
+        if breaker is not None and not breaker.allow():
+            self._defer(
+                chat, batch, max(breaker.retry_in(), self.chat_interval)
+            )
+            return False
+        return True
+
+    def _send(self, chat, batch):
+        """Отправка склеенного сообщения чата."""
+        if not self._admit(chat, batch):
+            return
+        breaker = self.breaker
+        text = MESSAGE_SEPARATOR.join(message for message, _, _ in batch)
+        started = time.monotonic()
+        try:
+            chat.bot.send_message(chat_id=chat.chat_id, text=text)
+        except PERMANENT_ERRORS as error:
+            # Telegram ответил: ошибка касается чата, а не сервиса
+            if breaker is not None:
+                breaker.record_success()
+            TELEGRAM_SENDS.inc('dropped')
+            logger.error(
+                'Сообщение в чат %s отброшено: %s', chat.chat_id, error
+            )
+            self._finish(chat, batch, dropped=True)
+        except Exception as error:
+            if breaker is not None:
+                if isinstance(error, RetryAfter):
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+            TELEGRAM_SENDS.inc('failed')
+            self._retry(chat, batch, error)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            duration = time.monotonic() - started
+            TELEGRAM_SEND_SECONDS.observe(duration)
+            TELEGRAM_SENDS.inc('sent')
+            logger.debug('Сообщение отправлено в чат %s', chat.chat_id)
+            with self._condition:
+                self.stats.send_time += duration
+                self.stats.max_send_time = max(
+                    self.stats.max_send_time, duration
+                )
+                self.stats.wait_time += started - batch[0][1]
+            self._finish(chat, batch)
+
+    def _finish(self, chat, batch, dropped=False):
+        """Учет обработанных сообщений и планирование следующей отправки."""
+        # Колбэки раньше уменьшения глубины: join не вернется до них
+        for _, _, done in batch:
+            if done is not None:
+                done()
+        with self._condition:
+            self._depth -= len(batch)
+            self._in_flight -= 1
+            if dropped:
+                self.stats.dropped += len(batch)
+            else:
+                self.stats.sent += 1
+                self.stats.coalesced += len(batch) - 1
+            chat.attempts = 0
+            chat.ready_at = time.monotonic() + self.chat_interval
+            self._schedule(chat)
+            self._condition.notify_all()
+
+    def _retry(self, chat, batch, error):
+        """Возврат сообщений в начало очереди чата с паузой."""
+        with self._condition:
+            chat.attempts += 1
+            if isinstance(error, RetryAfter):
+                delay = error.retry_after
+            else:
+                delay = min(
+                    self.backoff_max,
+                    self.backoff_start * 2 ** (chat.attempts - 1),
+                )
+            logger.error(
+                'Сообщение в чат %s не отправлено: %s, повтор через %s сек',
+                chat.chat_id, error, delay,
+            )
+            chat.messages.extendleft(reversed(batch))
+            chat.ready_at = time.monotonic() + delay
+            self.stats.retries += 1
+            self._in_flight -= 1
+            self._schedule(chat)
+            self._condition.notify_all()
+
+    def _defer(self, chat, batch, delay):
+        """Возврат сообщений в очередь чата без попытки отправки."""
+        with self._condition:
+            chat.messages.extendleft(reversed(batch))
+            chat.ready_at = time.monotonic() + delay
+            self._in_flight -= 1
+            self._schedule(chat)
+            self._condition.notify_all()
+
+    def _worker(self):
+        """Цикл фонового потока отправки."""
+        while True:
+            chat, batch = self._take()
+            if chat is None:
+                return
+            self._send(chat, batch)
+
+    def start(self):
+        """Запуск потоков отправки."""
+        self._stopped = False
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker, name=f'delivery-{index}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self, timeout=None):
+        """Ожидание отправки всех сообщений, True - очередь пуста."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._depth:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                self._condition.wait(remaining)
+            return True
+
+    def stop(self, timeout=10.0):
+        """Отправка оставшихся сообщений за timeout и остановка потоков."""
+        self.flush()
+        if not self.join(timeout):
+            logger.error(
+                'Не доставлено при остановке сообщений: %d', self._depth
+            )
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def metrics(self):
+        """Глубина очереди и задержки отправки."""
+        with self._condition:
+            return self.stats.snapshot(self._depth, self._in_flight)
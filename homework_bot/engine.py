@@ -0,0 +1,328 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from homework_bot.errors import ErrorTracker
+from homework_bot.records import intern_status
+from homework_bot.scheduler import PollScheduler
+from homework_bot.state import RECENT_CHANGES
+from homework_bot.status_index import StatusIndex
+from homework_bot.validators import Validators
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AccountState:
+    """Состояние опроса одного аккаунта."""
+
+    account: object
+    timestamp: int = field(default_factory=lambda: int(time.time()))
+    statuses: StatusIndex = field(default_factory=StatusIndex)
+    last_message_hash: str = None
+    last_success: float = None
+    polls: int = 0
+    errors: int = 0
+    # Ошибки соединения подряд, время последнего изменения статуса
+    # (до первого изменения - время запуска) и время перехода работы
+    # в reviewing для планировщика
+    failures: int = 0
+    last_change: float = field(default_factory=time.time)
+    reviewing_since: float = None
+    # Признаки последнего полностью обработанного ответа api и
+    # признаки текущего ответа до окончания его обработки
+    validators: Validators = field(default_factory=Validators)
+    pending_validators: Validators = None
+    # Запланированное время следующего опроса
+    next_poll_at: float = None
+    # Номер сбоя api, о котором пользователь уже уведомлен
+    notified_outage: int = None
+    # Последние изменения статусов: (ключ, название, статус, время)
+    history: deque = field(
+        default_factory=lambda: deque(maxlen=RECENT_CHANGES)
+    )
+    # Ожидающие внеочередного опроса делят один future
+    poll_waiter: object = None
+    # Недавние ошибки опроса по отпечаткам для подавления повторов
+    error_tracker: ErrorTracker = field(default_factory=ErrorTracker)
+
+    def restore(self, snapshot):
+        """Теплый старт из сохраненного состояния аккаунта."""
+        if snapshot.cursor is not None:
+            self.timestamp = snapshot.cursor
+        self.statuses = StatusIndex(snapshot.statuses, snapshot.names)
+        if snapshot.sent_hashes:
+            self.last_message_hash = snapshot.sent_hashes[-1]
+        if snapshot.last_change is not None:
+            self.last_change = snapshot.last_change
+        self.reviewing_since = snapshot.reviewing_since
+        if snapshot.next_poll_at is not None:
+            self.next_poll_at = snapshot.next_poll_at
+        self.history = deque((
+            (key, name, intern_status(status), changed_at)
+            for key, name, status, changed_at in snapshot.history
+        ), maxlen=RECENT_CHANGES)
+
+
+class PollingEngine:
+    """Опрос многих аккаунтов в одном event loop.
+
+    Каждый аккаунт опрашивается по своему расписанию, а число
+    одновременных запросов ограничено параметром concurrency.
+    Сам цикл опроса (poll) остается синхронным и выполняется в пуле
+    потоков, поэтому переиспользует функции из homework.py. Poll
+    возвращает True при успешном опросе. Если передано хранилище
+    состояния, аккаунты восстанавливаются из него до первого опроса.
+    Паузы между опросами считает scheduler. Набор аккаунтов меняется
+    на ходу через update_accounts без остановки остальных циклов.
+    Если передан guard, аккаунт опрашивается только пока guard(name)
+    истинно, иначе проверка повторяется через skip_delay секунд.
+    poll_now запрашивает внеочередной опрос аккаунта.
+    """
+
+    def __init__(self, accounts, poll, concurrency=16, store=None,
+                 scheduler=None, guard=None, skip_delay=5.0):
+        """Создание состояний аккаунтов и теплый старт из store."""
+        self.states = {}
+        for account in accounts:
+            if account.name in self.states:
+                raise ValueError(f'Повторяется имя аккаунта {account.name}')
+            self.states[account.name] = AccountState(account)
+        self.store = store
+        self.scheduler = scheduler or PollScheduler()
+        if store is not None:
+            for name, snapshot in store.load_all().items():
+                if name in self.states:
+                    self.states[name].restore(snapshot)
+        self.guard = guard
+        self.skip_delay = skip_delay
+        self._poll = poll
+        self._concurrency = concurrency
+        self._semaphore = None
+        self._executor = None
+        self._stopped = None
+        self._tasks = {}
+        self._wakes = {}
+
+    def _start(self, state):
+        """Запуск цикла опроса аккаунта, если движок работает."""
+        if self._stopped is not None and not self._stopped.is_set():
+            self._wakes[state.account.name] = asyncio.Event()
+            self._tasks[state.account.name] = asyncio.ensure_future(
+                self._account_loop(state)
+            )
+
+    def update_accounts(self, accounts):
+        """Приведение набора аккаунтов к accounts.
+
+        Новые аккаунты запускаются, удаленные останавливаются, у
+        измененных подменяются учетные данные без сброса состояния.
+        Вызывается из event loop движка. Возвращает имена добавленных,
+        удаленных и измененных аккаунтов.
+        """
+        accounts = {account.name: account for account in accounts}
+        added, changed = [], []
+        snapshots = None
+        removed = [name for name in self.states if name not in accounts]
+        for name in removed:
+            state = self.states.pop(name)
+            if state.poll_waiter is not None:
+                state.poll_waiter.cancel()
+            self._wakes.pop(name, None)
+            task = self._tasks.pop(name, None)
+            if task is not None:
+                task.cancel()
+        for name, account in accounts.items():
+            state = self.states.get(name)
+            if state is None:
+                if snapshots is None:
+                    snapshots = (
+                        self.store.load_all() if self.store is not None
+                        else {}
+                    )
+                state = self.states[name] = AccountState(account)
+                if name in snapshots:
+                    state.restore(snapshots[name])
+                self._start(state)
+                added.append(name)
+            elif state.account != account:
+                state.account = account
+                changed.append(name)
+        return added, removed, changed
+
+    def refresh(self, names):
+        """Перечитывание состояния аккаунтов names из store.
+
+        Нужно, когда аккаунт переходит от другого воркера: курсор,
+        статусы и отправленные сообщения берутся из базы, а признаки
+        ответа api сбрасываются, чтобы первый опрос прочитал ответ
+        целиком.
+        """
+        if self.store is None:
+            return
+        snapshots = self.store.load_all()
+        for name in names:
+            state = self.states.get(name)
+            if state is not None and name in snapshots:
+                state.restore(snapshots[name])
+                state.validators = Validators()
+
+    async def _watch(self, reload, interval):
+        """Периодическая проверка конфигурации.
+
+        reload выполняется в пуле потоков и возвращает новый список
+        аккаунтов либо None, если конфигурация не изменилась.
+        """
+        loop = asyncio.get_running_loop()
+        while not self._stopped.is_set():
+            await self._sleep(interval)
+            if self._stopped.is_set():
+                break
+            try:
+                accounts = await loop.run_in_executor(self._executor, reload)
+            except Exception as error:
+                logger.error('Сбой перечитывания аккаунтов: %s', error)
+                continue
+            if accounts is not None:
+                added, removed, changed = self.update_accounts(accounts)
+                logger.warning(
+                    'Аккаунты перечитаны: добавлено %s, удалено %s, '
+                    'изменено %s', added, removed, changed,
+                )
+
+    def _plan(self, state):
+        """Расчет и сохранение времени следующего опроса аккаунта."""
+        delay = self.scheduler.next_delay(state)
+        state.next_poll_at = time.time() + delay
+        if self.store is not None:
+            self.store.set_schedule(state.account.name, state.next_poll_at)
+        return delay
+
+    def _poll_and_plan(self, state):
+        """Опрос и планирование следующего в потоке пула."""
+        try:
+            return self._poll(state)
+        finally:
+            self._plan(state)
+
+    async def poll_once(self, state):
+        """Один опрос аккаунта с учетом ограничения параллельности."""
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            state.polls += 1
+            try:
+                success = await loop.run_in_executor(
+                    self._executor, self._poll_and_plan, state
+                )
+            except Exception as error:
+                success = False
+                logger.error(
+                    'Сбой опроса аккаунта %s: %s', state.account.name, error
+                )
+            if success:
+                state.last_success = time.time()
+            else:
+                state.errors += 1
+        return success
+
+    async def poll_now(self, name):
+        """Внеочередной опрос аккаунта, True - опрос успешен.
+
+        Вызовы, пришедшие до начала опроса, ждут один и тот же опрос,
+        поэтому всплеск запросов дает не больше одного обращения к api
+        на аккаунт. Вызывается из event loop движка.
+        """
+        state = self.states[name]
+        if state.poll_waiter is None:
+            state.poll_waiter = asyncio.get_running_loop().create_future()
+            self._wakes[name].set()
+        return await asyncio.shield(state.poll_waiter)
+
+    async def _sleep(self, delay, wake=None):
+        """Пауза, прерываемая вызовом stop() или событием wake."""
+        waits = [asyncio.ensure_future(self._stopped.wait())]
+        if wake is not None:
+            waits.append(asyncio.ensure_future(wake.wait()))
+        try:
+            await asyncio.wait(
+                waits, timeout=max(delay, 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            for waiter in waits:
+                waiter.cancel()
+
+    async def _account_loop(self, state):
+        """Бесконечный опрос одного аккаунта."""
+        wake = self._wakes[state.account.name]
+        await self._sleep(self.scheduler.initial_delay(
+            state, alone=len(self.states) == 1
+        ), wake)
+        while not self._stopped.is_set():
+            if self.guard is not None and not self.guard(state.account.name):
+                await self._sleep(self.skip_delay)
+                continue
+            wake.clear()
+            waiter, state.poll_waiter = state.poll_waiter, None
+            try:
+                success = await self.poll_once(state)
+            except asyncio.CancelledError:
+                if waiter is not None:
+                    waiter.cancel()
+                raise
+            if waiter is not None and not waiter.done():
+                waiter.set_result(success)
+            await self._sleep(state.next_poll_at - time.time(), wake)
+
+    async def run(self, reload=None, reload_interval=30.0,
+                  drain_timeout=None):
+        """Запуск опроса всех аккаунтов до вызова stop().
+
+        Если передан reload, набор аккаунтов перечитывается каждые
+        reload_interval секунд. После stop() идущие опросы
+        дожидаются не дольше drain_timeout секунд, новые не
+        начинаются.
+        """
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._stopped = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self._concurrency)
+        for state in self.states.values():
+            self._start(state)
+        watcher = None
+        if reload is not None:
+            watcher = asyncio.ensure_future(
+                self._watch(reload, reload_interval)
+            )
+        drained = True
+        try:
+            await self._stopped.wait()
+            tasks = [*self._tasks.values(), watcher]
+            tasks = [task for task in tasks if task is not None]
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=drain_timeout)
+                drained = not pending
+                if pending:
+                    logger.error(
+                        'Не завершено опросов к сроку остановки: %d',
+                        len(pending),
+                    )
+        finally:
+            for task in [*self._tasks.values(), watcher]:
+                if task is not None:
+                    task.cancel()
+            for state in self.states.values():
+                if state.poll_waiter is not None:
+                    state.poll_waiter.cancel()
+            # Зависшие опросы не задерживают остановку: их потоки
+            # завершатся по таймауту запроса
+            self._executor.shutdown(wait=drained, cancel_futures=True)
+            if self.store is not None:
+                self.store.try_flush()
+
+    def stop(self):
+        """Остановка всех циклов опроса."""
+        if self._stopped is not None:
+            self._stopped.set()
@@ -0,0 +1,105 @@
+import re
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+# Изменчивые части текста ошибки, которые не различают ошибки
+VARIABLE_PARTS = (
+    (re.compile(r'\w+://\S+'), '<url>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{8,}\b'), '<hex>'),
+    (re.compile(r'\d+(?:\.\d+)?'), '<n>'),
+    (re.compile(r'\'[^\']*\'|"[^"]*"'), '<str>'),
+)
+# Максимальная длина шаблона текста ошибки
+MAX_TEMPLATE = 200
+
+
+class Fingerprint(NamedTuple):
+    """Отпечаток ошибки: тип, функция, где она возникла, и шаблон текста."""
+
+    kind: str
+    origin: str
+    template: str
+
+    @property
+    def label(self):
+        """Краткое описание для пользователя."""
+        return f'{self.kind}: {self.template}'
+
+
+def message_template(message):
+    """Текст ошибки без чисел, адресов, идентификаторов и строк в кавычках."""
+    for pattern, replacement in VARIABLE_PARTS:
+        message = pattern.sub(replacement, message)
+    return message[:MAX_TEMPLATE]
+
+
+def fingerprint(error):
+    """Отпечаток исключения error."""
+    origin = '?'
+    traceback = error.__traceback__
+    if traceback is not None:
+        while traceback.tb_next is not None:
+            traceback = traceback.tb_next
+        origin = traceback.tb_frame.f_code.co_name
+    return Fingerprint(
+        type(error).__name__, origin, message_template(str(error))
+    )
+
+
+class _Seen:
+    """Учет одного отпечатка в текущем окне."""
+
+    __slots__ = ('window_start', 'count', 'suppressed')
+
+    def __init__(self, now):
+        """Окно, открытое первым сообщением об ошибке."""
+        self.window_start = now
+        self.count = 1
+        self.suppressed = 0
+
+
+class ErrorTracker:
+    """Подавление повторяющихся ошибок по отпечаткам.
+
+    О первой ошибке с отпечатком сообщается сразу, повторы в течение
+    window секунд только считаются. summary возвращает сводки по
+    отпечаткам, чьи окна закончились с подавленными повторами, и
+    открывает для них новое окно, так что постоянная ошибка дает одну
+    сводку за окно. Хранится не больше maxsize последних отпечатков.
+    """
+
+    def __init__(self, window=3600.0, maxsize=32, clock=time.monotonic):
+        """Пустой учет с окном подавления window секунд."""
+        self.window = window
+        self.maxsize = maxsize
+        self.clock = clock
+        self._seen = OrderedDict()
+
+    def record(self, error):
+        """Учет ошибки, True - о ней нужно сообщить сейчас."""
+        key = fingerprint(error)
+        now = self.clock()
+        seen = self._seen.get(key)
+        if seen is not None:
+            self._seen.move_to_end(key)
+            if seen.suppressed or now - seen.window_start < self.window:
+                seen.count += 1
+                seen.suppressed += 1
+                return False
+        self._seen[key] = _Seen(now)
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+        return True
+
+    def summary(self):
+        """Сводки (отпечаток, число ошибок за окно) по закончившимся окнам."""
+        now = self.clock()
+        result = []
+        for key, seen in self._seen.items():
+            if seen.suppressed and now - seen.window_start >= self.window:
+                result.append((key, seen.count))
+                seen.window_start = now
+                seen.count = 0
+                seen.suppressed = 0
+        return result
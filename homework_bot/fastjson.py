@@ -0,0 +1,15 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Разбор json из bytes или str: orjson, если установлен, иначе
+# стандартная библиотека. Ошибки обоих - подклассы ValueError
+if orjson is not None:
+    BACKEND = 'orjson'
+    loads = orjson.loads
+else:
+    BACKEND = 'json'
+    loads = json.loads
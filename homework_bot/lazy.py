@@ -0,0 +1,32 @@
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Модуль, импортируемый при первом обращении к его атрибуту.
+
+    Атрибуты каждый раз читаются из настоящего модуля в sys.modules,
+    поэтому подмена атрибута модуля (monkeypatch) видна и через
+    заместителя. Пока к атрибутам не обращались, импорт не выполняется.
+    """
+
+    def __init__(self, name):
+        """Заместитель модуля name."""
+        super().__init__(name)
+        self._module = sys.modules.get(name)
+
+    def _load(self):
+        """Настоящий модуль, импортированный при необходимости."""
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self.__name__)
+        return module
+
+    def __getattr__(self, attribute):
+        """Атрибут настоящего модуля."""
+        return getattr(self._load(), attribute)
+
+    def __dir__(self):
+        """Атрибуты настоящего модуля."""
+        return dir(self._load())
@@ -0,0 +1,161 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def default_owner():
+    """Имя воркера: хост, pid и случайный суффикс на случай повтора pid."""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+class LeaseManager:
+    """Аренда аккаунтов в общей базе SQLite.
+
+    Аккаунт опрашивает только воркер, держащий его аренду. Аренда
+    продлевается heartbeat вызовом renew и истекает через ttl секунд
+    без продления, после чего ее забирает любой живой воркер. Сам
+    воркер считает аренду действующей на margin секунд меньше, чтобы
+    завис или потерял базу - перестать опрашивать раньше, чем аренду
+    заберет другой.
+    """
+
+    def __init__(self, path, owner=None, ttl=30.0, margin=None):
+        """Аренды в базе path от имени owner."""
+        self.owner = owner or default_owner()
+        self.ttl = ttl
+        self.margin = ttl / 3 if margin is None else margin
+        self.held = frozenset()
+        self._valid_until = 0.0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=ttl / 6, check_same_thread=False,
+            isolation_level=None,
+        )
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS leases (
+                account TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+
+    def holds(self, name):
+        """Держит ли воркер действующую аренду аккаунта."""
+        return name in self.held and time.time() < self._valid_until
+
+    def renew(self, names, on_gain=None):
+        """Продление своих аренд и захват свободных или истекших.
+
+        Аренды аккаунтов вне names отпускаются. Для новых аренд до их
+        публикации вызывается on_gain, чтобы воркер успел перечитать
+        состояние, сохраненное прежним владельцем.
+        """
+        names = set(names)
+        started = time.time()
+        expires_at = started + self.ttl
+        with self._lock:
+            cursor = self._connection
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                cursor.executemany(
+                    'INSERT INTO leases (account, owner, expires_at) '
+                    'VALUES (?, ?, ?) ON CONFLICT (account) DO UPDATE SET '
+                    'owner = excluded.owner, '
+                    'expires_at = excluded.expires_at '
+                    'WHERE leases.owner = excluded.owner '
+                    'OR leases.expires_at < ?',
+                    ((name, self.owner, expires_at, started)
+                     for name in names),
+                )
+                owned = {
+                    row[0] for row in cursor.execute(
+                        'SELECT account FROM leases WHERE owner = ?',
+                        (self.owner,),
+                    )
+                }
+                cursor.executemany(
+                    'DELETE FROM leases WHERE account = ? AND owner = ?',
+                    ((name, self.owner) for name in owned - names),
+                )
+                cursor.execute('COMMIT')
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+        held = frozenset(owned & names)
+        gained = held - self.held
+        if gained and on_gain is not None:
+            on_gain(gained)
+        if gained or len(held) != len(self.held):
+            logger.info(
+                'Аренды воркера %s: %d, новых %d',
+                self.owner, len(held), len(gained),
+            )
+        self.held = held
+        self._valid_until = expires_at - self.margin
+        return held
+
+    def release(self):
+        """Освобождение всех аренд воркера для быстрой передачи."""
+        with self._lock:
+            self.held = frozenset()
+            self._connection.execute(
+                'DELETE FROM leases WHERE owner = ?', (self.owner,)
+            )
+
+    def close(self):
+        """Освобождение аренд и закрытие базы."""
+        self.release()
+        self._connection.close()
+
+
+class LeaseKeeper:
+    """Фоновый heartbeat аренд.
+
+    Раз в interval секунд продлевает аренды аккаунтов, которые
+    возвращает names. Перед продлением вызывается flush, чтобы
+    состояние, записанное под арендой, было в базе к моменту, когда
+    аренду заберет другой воркер. Ошибка продления только логируется:
+    аренды истекут сами, и опрос их аккаунтов остановится.
+    """
+
+    def __init__(self, lease, names, on_gain=None, interval=5.0,
+                 flush=None):
+        """Heartbeat lease по списку аккаунтов names()."""
+        self.lease = lease
+        self.names = names
+        self.on_gain = on_gain
+        self.interval = interval
+        self.flush = flush
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='lease-heartbeat', daemon=True
+        )
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.beat()
+
+    def beat(self):
+        """Одно продление аренд с логированием ошибки."""
+        if self.flush is not None:
+            self.flush()
+        try:
+            self.lease.renew(self.names(), self.on_gain)
+        except Exception as error:
+            logger.error('Не удалось продлить аренды: %s', error)
+
+    def start(self):
+        """Первое продление и запуск heartbeat."""
+        self.beat()
+        self._thread.start()
+
+    def stop(self):
+        """Остановка heartbeat без освобождения аренд."""
+        self._stopped.set()
+        self._thread.join()
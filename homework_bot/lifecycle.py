@@ -0,0 +1,90 @@
+import contextlib
+import signal
+import sys
+import threading
+import time
+
+# Сигналы штатной остановки
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+def terminate(*args):
+    """Обработчик сигнала: завершение через SystemExit с блоками finally."""
+    sys.exit(0)
+
+
+class Shutdown:
+    """Остановка синхронного цикла по SIGTERM.
+
+    Сигнал во время паузы прерывает ее сразу, а во время опроса или
+    отправки только отмечается: цикл завершится перед следующей
+    паузой, не оборвав запрос на середине.
+    """
+
+    def __init__(self):
+        """Остановка еще не запрошена."""
+        self.requested = False
+        self._sleeping = False
+
+    def install(self):
+        """Установка обработчика SIGTERM, если это главный поток."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self._handle)
+
+    def _handle(self, *args):
+        """Отметка остановки и прерывание идущей паузы."""
+        self.requested = True
+        if self._sleeping:
+            terminate()
+
+    @contextlib.contextmanager
+    def interruptible(self):
+        """Блок паузы, который SIGTERM прерывает немедленно."""
+        if self.requested:
+            terminate()
+        self._sleeping = True
+        try:
+            yield
+        finally:
+            self._sleeping = False
+
+
+class StopOnSignals:
+    """SIGTERM и SIGINT вызывают stop в event loop.
+
+    Время первого сигнала запоминается, чтобы все этапы остановки
+    уложились в общий срок.
+    """
+
+    def __init__(self, loop, stop):
+        """Обработчики сигналов loop, вызывающие stop."""
+        self.loop = loop
+        self.stop = stop
+        self.requested_at = None
+
+    def _handle(self):
+        """Запоминание времени и вызов stop."""
+        if self.requested_at is None:
+            self.requested_at = time.monotonic()
+        self.stop()
+
+    def __enter__(self):
+        """Установка обработчиков, если loop их поддерживает."""
+        for signum in STOP_SIGNALS:
+            with contextlib.suppress(NotImplementedError, RuntimeError,
+                                     ValueError):
+                self.loop.add_signal_handler(signum, self._handle)
+        return self
+
+    def __exit__(self, *args):
+        """Снятие обработчиков."""
+        for signum in STOP_SIGNALS:
+            with contextlib.suppress(NotImplementedError, RuntimeError,
+                                     ValueError):
+                self.loop.remove_signal_handler(signum)
+
+    def remaining(self, timeout):
+        """Остаток срока остановки timeout с момента сигнала."""
+        if self.requested_at is None:
+            return timeout
+        return max(timeout - (time.monotonic() - self.requested_at), 0.0)
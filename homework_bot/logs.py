@@ -0,0 +1,125 @@
+import logging
+import queue
+import signal
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Уровни по возрастанию, по ним шагают сигналы смены уровня
+LEVELS = (
+    logging.DEBUG, logging.INFO, logging.WARNING,
+    logging.ERROR, logging.CRITICAL,
+)
+
+
+class RateLimitFilter(logging.Filter):
+    """Прореживание повторяющихся сообщений одного шаблона.
+
+    За interval секунд пропускается не больше burst записей с одним
+    шаблоном msg, число отброшенных дописывается к первой записи
+    следующего окна. Записи выше max_level не прореживаются. Ключ -
+    шаблон до подстановки аргументов, поэтому число ключей ограничено
+    числом вызовов логгера в коде, а не числом аккаунтов.
+    """
+
+    def __init__(self, interval=60.0, burst=1, max_level=logging.INFO):
+        """Не больше burst записей шаблона за interval секунд."""
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.max_level = max_level
+        self.suppressed = 0
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """Пропуск записи, если лимит ее шаблона не исчерпан."""
+        if record.levelno > self.max_level:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                skipped = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                skipped = 0
+            else:
+                window[2] += 1
+                self.suppressed += 1
+                return False
+        if skipped:
+            record.msg = f'{record.msg} (похожих пропущено: {skipped})'
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler без форматирования в вызывающем потоке.
+
+    Стандартный prepare форматирует запись до постановки в очередь,
+    чтобы ее можно было передать в другой процесс. Очередь здесь
+    внутри процесса, поэтому подстановка аргументов и форматирование
+    переносятся в фоновый поток.
+    """
+
+    def prepare(self, record):
+        """Запись кладется в очередь как есть."""
+        return record
+
+
+class QueueLogging:
+    """Перевод обработчиков логгера на фоновый поток.
+
+    Вызывающий поток только проверяет фильтры и кладет запись в
+    очередь, форматирование и запись в поток вывода выполняет
+    QueueListener. stop дописывает очередь и возвращает обработчики.
+    """
+
+    def __init__(self, logger, filters=()):
+        """Очередь перед обработчиками logger с фильтрами filters."""
+        self.logger = logger
+        self.handlers = list(logger.handlers)
+        self.queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+        for log_filter in filters:
+            self.queue_handler.addFilter(log_filter)
+        self.listener = QueueListener(
+            self.queue_handler.queue, *self.handlers,
+            respect_handler_level=True,
+        )
+
+    def start(self):
+        """Подмена обработчиков очередью и запуск фонового потока."""
+        for handler in self.handlers:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self.queue_handler)
+        self.listener.start()
+
+    def stop(self):
+        """Запись оставшихся сообщений и возврат обработчиков."""
+        self.logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        for handler in self.handlers:
+            self.logger.addHandler(handler)
+
+
+def shift_level(loggers, step):
+    """Смена уровня логгеров на step ступеней LEVELS."""
+    current = loggers[0].getEffectiveLevel()
+    index = max(
+        (i for i, level in enumerate(LEVELS) if level <= current), default=0
+    )
+    level = LEVELS[min(max(index + step, 0), len(LEVELS) - 1)]
+    for logger in loggers:
+        logger.setLevel(level)
+    loggers[0].warning('Уровень логирования: %s', logging.getLevelName(level))
+    return level
+
+
+def install_level_signals(*loggers):
+    """SIGUSR1 делает логи подробнее, SIGUSR2 - короче, без перезапуска."""
+    if not hasattr(signal, 'SIGUSR1'):
+        return
+    signal.signal(signal.SIGUSR1, lambda *args: shift_level(loggers, -1))
+    signal.signal(signal.SIGUSR2, lambda *args: shift_level(loggers, 1))
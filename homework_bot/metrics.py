@@ -0,0 +1,315 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержек в секундах
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+
+
+def _format_labels(names, values):
+    """Метки в формате prometheus: {name="value",...}."""
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{value}"' for name, value in zip(names, values)
+    )
+    return f'{{{pairs}}}'
+
+
+class Counter:
+    """Монотонный счетчик с необязательными метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        """Счетчик name с именами меток labels."""
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        """Увеличение счетчика для значений меток labels."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        """Текущее значение счетчика."""
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        """Строки значений в текстовом формате prometheus."""
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f'{self.name}{_format_labels(self.label_names, labels)} {value}'
+            for labels, value in items
+        ]
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами без меток."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        """Гистограмма name с верхними границами корзин buckets."""
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Учет одного замера."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self):
+        """Контекстный менеджер, замеряющий длительность блока."""
+        return _Timer(self)
+
+    @property
+    def count(self):
+        """Число замеров."""
+        return sum(self._counts)
+
+    def samples(self):
+        """Кумулятивные корзины, сумма и число замеров."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f'{self.name}_sum {total}')
+        lines.append(f'{self.name}_count {cumulative}')
+        return lines
+
+
+class _Timer:
+    """Замер длительности блока в гистограмму."""
+
+    def __init__(self, histogram):
+        """Таймер для histogram."""
+        self.histogram = histogram
+
+    def __enter__(self):
+        """Начало замера."""
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        """Запись длительности блока."""
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Gauge:
+    """Значение, вычисляемое при каждом чтении метрик.
+
+    callback возвращает число либо словарь {значения меток: число}.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback, labels=()):
+        """Вычисляемая метрика name."""
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.label_names = tuple(labels)
+
+    def samples(self):
+        """Текущие значения метрики."""
+        try:
+            value = self.callback()
+        except Exception as error:
+            logger.error(
+                'Не удалось вычислить метрику %s: %s', self.name, error
+            )
+            return []
+        if not isinstance(value, dict):
+            return [f'{self.name} {value}']
+        return [
+            f'{self.name}{_format_labels(self.label_names, labels)} {number}'
+            for labels, number in value.items()
+        ]
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        """Пустой набор."""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Добавление метрики, одноименная метрика заменяется."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name):
+        """Удаление метрики по имени."""
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self):
+        """Все метрики в текстовом формате prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def write_snapshot(self, path):
+        """Атомарная запись метрик в файл."""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+POLL_SECONDS = REGISTRY.register(Histogram(
+    'homework_poll_seconds', 'Длительность опроса аккаунта'
+))
+HTTP_RESPONSES = REGISTRY.register(Counter(
+    'homework_api_responses_total', 'Ответы api практикума по кодам',
+    labels=('status',),
+))
+PROCESS_SECONDS = REGISTRY.register(Histogram(
+    'homework_process_seconds',
+    'Проверка ответа, разбор статусов и поиск изменений',
+))
+TELEGRAM_SEND_SECONDS = REGISTRY.register(Histogram(
+    'homework_telegram_send_seconds', 'Длительность отправки в Telegram'
+))
+TELEGRAM_SENDS = REGISTRY.register(Counter(
+    'homework_telegram_sends_total', 'Отправки в Telegram по результату',
+    labels=('result',),
+))
+BREAKER_TRANSITIONS = REGISTRY.register(Counter(
+    'homework_breaker_transitions_total',
+    'Переходы автоматов защиты зависимостей по состояниям',
+    labels=('dependency', 'state'),
+))
+BREAKER_REJECTED = REGISTRY.register(Counter(
+    'homework_breaker_rejected_total',
+    'Запросы, отклоненные разомкнутым автоматом защиты',
+    labels=('dependency',),
+))
+COALESCED_CALLS = REGISTRY.register(Counter(
+    'homework_coalesced_calls_total',
+    'Запросы к api по исходу: leader - выполнен, shared - ждал чужой, '
+    'cached - взят из кеша',
+    labels=('result',),
+))
+RATE_LIMIT_WAITS = REGISTRY.register(Counter(
+    'homework_ratelimit_waits_total',
+    'Запросы, которым пришлось ждать места в корзине',
+    labels=('bucket',),
+))
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.register(Counter(
+    'homework_ratelimit_wait_seconds_total',
+    'Суммарное ожидание места в корзинах',
+    labels=('bucket',),
+))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MetricsServer:
+    """Локальный http сервер с метриками по адресу /metrics."""
+
+    def __init__(self, port, host='127.0.0.1', registry=REGISTRY):
+        """Сервер на host:port, port=0 - любой свободный порт."""
+        self.server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.registry = registry
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name='metrics', daemon=True
+        )
+
+    @property
+    def port(self):
+        """Порт, на котором слушает сервер."""
+        return self.server.server_port
+
+    def start(self):
+        """Запуск сервера в фоновом потоке."""
+        self._thread.start()
+
+    def stop(self):
+        """Остановка сервера."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SnapshotWriter:
+    """Периодическая запись метрик в файл."""
+
+    def __init__(self, path, interval=15.0, registry=REGISTRY):
+        """Запись registry в path раз в interval секунд."""
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='metrics-snapshot', daemon=True
+        )
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.write()
+
+    def write(self):
+        """Запись снимка метрик с логированием ошибки."""
+        try:
+            self.registry.write_snapshot(self.path)
+        except OSError as error:
+            logger.error('Не удалось записать метрики: %s', error)
+
+    def start(self):
+        """Запуск периодической записи."""
+        self._thread.start()
+
+    def stop(self):
+        """Остановка и запись последнего снимка."""
+        self._stopped.set()
+        self._thread.join()
+        self.write()
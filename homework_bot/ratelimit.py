@@ -0,0 +1,177 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from homework_bot.metrics import RATE_LIMIT_WAIT_SECONDS, RATE_LIMIT_WAITS
+
+
+@dataclass(frozen=True)
+class Rate:
+    """Ограничение корзины: per_second запросов в секунду и всплеск burst."""
+
+    per_second: float
+    burst: int = 1
+
+    @property
+    def interval(self):
+        """Интервал между запросами при полной загрузке."""
+        return 1 / self.per_second
+
+    @property
+    def tolerance(self):
+        """Насколько запрос может опередить расписание за счет всплеска."""
+        return (self.burst - 1) / self.per_second
+
+
+def schedule(tats, rules, now, reserve):
+    """Ожидание и новые теоретические времена прихода корзин (GCRA).
+
+    tats - сохраненные времена корзин по ключам, rules - пары ключ и
+    Rate. Возвращает (ожидание, ключ ограничившей корзины, новые
+    времена). Без reserve запрос, которому надо ждать, не занимает
+    место в корзинах и новые времена пусты.
+    """
+    wait, limited_by = 0.0, None
+    for key, rate in rules:
+        tat = max(tats.get(key) or now, now)
+        key_wait = tat - rate.tolerance - now
+        if key_wait > wait:
+            wait, limited_by = key_wait, key
+    if wait > 0 and not reserve:
+        return wait, limited_by, {}
+    start = now + wait
+    return wait, limited_by, {
+        key: max(tats.get(key) or start, start) + rate.interval
+        for key, rate in rules
+    }
+
+
+class MemoryBuckets:
+    """Корзины в памяти процесса."""
+
+    def __init__(self):
+        """Пустые корзины."""
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def take(self, rules, now, reserve):
+        """Запрос места во всех корзинах rules, см. schedule."""
+        with self._lock:
+            wait, limited_by, tats = schedule(self._tats, rules, now, reserve)
+            self._tats.update(tats)
+        return wait, limited_by
+
+    def close(self):
+        """Корзинам в памяти закрывать нечего."""
+
+
+class SQLiteBuckets:
+    """Корзины в файле SQLite, общие для всех процессов машины.
+
+    Каждый запрос места - одна короткая транзакция BEGIN IMMEDIATE,
+    поэтому воркеры пула делят одни и те же ограничения Telegram и
+    api. Время берется по общим часам time.time.
+    """
+
+    def __init__(self, path):
+        """Корзины в базе path."""
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=5.0, check_same_thread=False, isolation_level=None,
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tat REAL NOT NULL
+            )
+        ''')
+
+    def take(self, rules, now, reserve):
+        """Запрос места во всех корзинах rules, см. schedule."""
+        keys = [key for key, _ in rules]
+        with self._lock:
+            cursor = self._connection
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                stored = dict(cursor.execute(
+                    'SELECT key, tat FROM buckets WHERE key IN '
+                    f'({",".join("?" * len(keys))})', keys,
+                ))
+                wait, limited_by, tats = schedule(
+                    stored, rules, now, reserve
+                )
+                cursor.executemany(
+                    'INSERT INTO buckets (key, tat) VALUES (?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET tat = excluded.tat',
+                    tats.items(),
+                )
+                cursor.execute('COMMIT')
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+        return wait, limited_by
+
+    def close(self):
+        """Закрытие базы."""
+        self._connection.close()
+
+
+class RateLimiter:
+    """Ограничитель исходящих запросов на корзинах токенов.
+
+    limits задает Rate для вида корзины: chat, bot, endpoint и т.п.
+    Запрос указывает корзины парами (вид, имя) и проходит, только
+    когда место есть во всех сразу. Корзины вида без Rate не
+    ограничивают. Время ожидания учитывается в метриках по виду
+    корзины, которая его вызвала.
+    """
+
+    def __init__(self, limits, backend=None, clock=time.time,
+                 sleep=time.sleep):
+        """Ограничитель с корзинами в backend, по умолчанию в памяти."""
+        self.limits = limits
+        self.backend = backend or MemoryBuckets()
+        self.clock = clock
+        self.sleep = sleep
+
+    def _take(self, keys, reserve):
+        """Ожидание для корзин keys с учетом в метриках."""
+        rules = [
+            (f'{kind}:{name}', self.limits[kind])
+            for kind, name in keys if self.limits.get(kind)
+        ]
+        if not rules:
+            return 0.0
+        wait, limited_by = self.backend.take(rules, self.clock(), reserve)
+        if wait > 0:
+            kind = limited_by.split(':', 1)[0]
+            RATE_LIMIT_WAITS.inc(kind)
+            RATE_LIMIT_WAIT_SECONDS.inc(kind, amount=wait)
+        return wait
+
+    def try_acquire(self, *keys):
+        """0, если место занято, иначе секунды до освобождения места."""
+        return self._take(keys, reserve=False)
+
+    def acquire(self, *keys):
+        """Занятие места с ожиданием своей очереди, возвращает ожидание."""
+        wait = self._take(keys, reserve=True)
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def close(self):
+        """Закрытие хранилища корзин."""
+        self.backend.close()
+
+
+def telegram_keys(bot, chat_id):
+    """Корзины отправки в чат: чат бота и сам бот.
+
+    Бот определяется по открытой части токена до двоеточия, чтобы
+    токен не попадал в файл корзин.
+    """
+    bot_id = str(getattr(bot, 'token', '') or id(bot)).split(':', 1)[0]
+    return ('chat', f'{bot_id}:{chat_id}'), ('bot', bot_id)
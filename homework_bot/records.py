@@ -0,0 +1,42 @@
+import sys
+from enum import Enum
+from typing import NamedTuple
+
+
+class HomeworkStatus(str, Enum):
+    """Статус проверки работы, ключ HOMEWORK_VERDICTS.
+
+    Члены перечисления - единственные экземпляры своих строк, поэтому
+    статусы десятков тысяч работ хранятся ссылками на три объекта, а
+    не копиями строк из каждого ответа api. Члены равны строкам api и
+    форматируются как они.
+    """
+
+    APPROVED = 'approved'
+    REVIEWING = 'reviewing'
+    REJECTED = 'rejected'
+
+    __str__ = str.__str__
+    __format__ = str.__format__
+
+
+STATUSES = {status.value: status for status in HomeworkStatus}
+
+
+def intern_status(status):
+    """Член HomeworkStatus для строки статуса либо интернированная строка."""
+    if status is None:
+        return None
+    return STATUSES.get(status) or sys.intern(str(status))
+
+
+class HomeworkRecord(NamedTuple):
+    """Работа из ответа api: только поля, нужные для уведомления.
+
+    Полный словарь работы со всеми полями api после разбора не
+    хранится. Списки записей строит HomeworkSchema.parse.
+    """
+
+    key: str
+    name: str
+    status: HomeworkStatus
@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+# Метка места названия работы при предварительной сборке шаблонов
+_NAME = '\x00'
+
+
+@dataclass(frozen=True)
+class MessageTemplates:
+    """Тексты уведомлений на одном языке.
+
+    changed содержит {name} и {verdict}, failure - {error}. Строки
+    ответов на /status и /history - status_line и history_line (еще
+    и {changed_at}), no_data - ответ, пока изменений не было.
+    error_summary - строка сводки повторов ошибки: {error}, {count}
+    и {minutes}.
+    """
+
+    changed: str
+    verdicts: dict
+    no_changes: str
+    failure: str
+    status_line: str = '"{name}": {verdict}'
+    history_line: str = '{changed_at:%d.%m %H:%M} "{name}": {verdict}'
+    no_data: str = None
+    error_summary: str = '{error} x{count} in last {minutes} min'
+
+
+ENGLISH = MessageTemplates(
+    changed='Review status of "{name}" has changed. {verdict}',
+    verdicts={
+        'approved': 'Reviewed: the reviewer liked everything. Hooray!',
+        'reviewing': 'The reviewer has started reviewing the work.',
+        'rejected': 'Reviewed: the reviewer has some remarks.',
+    },
+    no_changes='Status has not changed',
+    failure='Bot failure: {error}',
+    no_data='No homework status changes yet',
+)
+
+
+class MessageRenderer:
+    """Тексты уведомлений по шаблонам языков чатов.
+
+    Шаблон каждой пары язык-статус собирается один раз при создании:
+    остается только вставить название работы. Готовые сообщения
+    кешируются в LRU на maxsize пар (язык, название, статус). Язык
+    без шаблонов заменяется default_language.
+    """
+
+    def __init__(self, templates, default_language='ru', maxsize=4096):
+        """Рендерер по словарю язык -> MessageTemplates."""
+        self.templates = templates
+        self.default_language = default_language
+        self._parts = {
+            (language, status): template.changed.format(
+                name=_NAME, verdict=verdict
+            ).split(_NAME)
+            for language, template in templates.items()
+            for status, verdict in template.verdicts.items()
+        }
+        self._cached = lru_cache(maxsize=maxsize)(self._render)
+
+    def _language(self, language):
+        """Язык с шаблонами: language или язык по умолчанию."""
+        if language in self.templates:
+            return language
+        return self.default_language
+
+    def _render(self, language, name, status):
+        """Сборка сообщения о статусе без кеша."""
+        return str(name).join(self._parts[(language, status)])
+
+    def status_message(self, name, status, language=None):
+        """Сообщение об изменении статуса работы name."""
+        return self._cached(self._language(language), name, status)
+
+    def status_of(self, message):
+        """Статус, о котором сообщение status_message, иначе None."""
+        for (_, status), parts in self._parts.items():
+            if (len(parts) == 2
+                    and len(message) >= len(parts[0]) + len(parts[1])
+                    and message.startswith(parts[0])
+                    and message.endswith(parts[1])):
+                return status
+        return None
+
+    def no_changes(self, language=None):
+        """Сообщение об отсутствии изменений."""
+        return self.templates[self._language(language)].no_changes
+
+    def failure(self, error, language=None):
+        """Сообщение о сбое в работе бота."""
+        template = self.templates[self._language(language)].failure
+        return template.format(error=error)
+
+    def _report(self, template, lines):
+        """Ответ на команду из строк lines или текст об их отсутствии."""
+        return '\n'.join(lines) or template.no_data or template.no_changes
+
+    def error_summary(self, summary, window, language=None):
+        """Сводка повторов ошибок: пары (отпечаток, число) за window сек."""
+        template = self.templates[self._language(language)].error_summary
+        return '\n'.join(
+            template.format(
+                error=key.label, count=count, minutes=round(window / 60),
+            )
+            for key, count in summary
+        )
+
+    def status_report(self, statuses, language=None):
+        """Ответ на /status: пары (название, статус) всех работ."""
+        template = self.templates[self._language(language)]
+        return self._report(template, [
+            template.status_line.format(
+                name=name, verdict=template.verdicts.get(status, status),
+            )
+            for name, status in statuses
+        ])
+
+    def history_report(self, history, language=None):
+        """Ответ на /history: изменения (ключ, название, статус, время)."""
+        template = self.templates[self._language(language)]
+        return self._report(template, [
+            template.history_line.format(
+                name=name,
+                verdict=template.verdicts.get(status, status),
+                changed_at=datetime.fromtimestamp(changed_at),
+            )
+            for _, name, status, changed_at in history
+        ])
+
+    def cache_info(self):
+        """Попадания и промахи кеша сообщений."""
+        return self._cached.cache_info()
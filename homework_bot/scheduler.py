@@ -0,0 +1,75 @@
+import random
+import time
+import zlib
+
+
+class PollScheduler:
+    """Расчет паузы до следующего опроса аккаунта.
+
+    Базовая пауза равна периоду аккаунта. После перехода работы
+    в reviewing аккаунт опрашивается чаще, пока ревьюер не вынесет
+    вердикт. При ошибках соединения пауза растет экспоненциально от
+    периода со случайным разбросом, а аккаунты без изменений дольше
+    idle_after опрашиваются реже.
+    """
+
+    def __init__(self, fast_period=120, fast_window=6 * 3600,
+                 backoff_max=4 * 3600, jitter=0.2,
+                 idle_after=3 * 24 * 3600, idle_factor=3, spread=None):
+        """Настройка планировщика.
+
+        spread ограничивает сдвиг первого опроса, None означает весь
+        период аккаунта, 0 - опрос сразу после запуска.
+        """
+        self.fast_period = fast_period
+        self.fast_window = fast_window
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.idle_after = idle_after
+        self.idle_factor = idle_factor
+        self.spread = spread
+
+    def initial_delay(self, state, now=None, alone=False):
+        """Пауза до первого опроса аккаунта после запуска.
+
+        Если сохранено время следующего опроса и оно еще не прошло,
+        аккаунт продолжает прежнее расписание. Иначе берется стабильный
+        сдвиг внутри периода, зависящий только от имени аккаунта,
+        поэтому аккаунты равномерно распределены по периоду и не
+        стреляют одновременно. Единственному аккаунту процесса (alone)
+        разносить опросы не с кем, он опрашивается сразу.
+        """
+        now = time.time() if now is None else now
+        if state.next_poll_at is not None and state.next_poll_at >= now:
+            return state.next_poll_at - now
+        if alone:
+            return 0
+        window = state.account.period
+        if self.spread is not None:
+            window = min(window, self.spread)
+        if window <= 0:
+            return 0
+        return zlib.crc32(state.account.name.encode('utf-8')) % window
+
+    def next_delay(self, state, now=None):
+        """Пауза в секундах до следующего опроса аккаунта."""
+        now = time.time() if now is None else now
+        period = state.account.period
+        if state.failures:
+            # Во время сбоя api опрашивается не чаще, чем обычно
+            backoff = min(
+                max(self.backoff_max, period),
+                period * 2 ** (state.failures - 1),
+            )
+            return max(
+                period,
+                backoff * random.uniform(1 - self.jitter, 1 + self.jitter),
+            )
+        if (
+            state.reviewing_since is not None
+            and now - state.reviewing_since < self.fast_window
+        ):
+            return min(period, self.fast_period)
+        if now - state.last_change > self.idle_after:
+            return period * self.idle_factor
+        return period
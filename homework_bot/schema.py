@@ -0,0 +1,45 @@
+from homework_bot.records import HomeworkRecord, HomeworkStatus
+
+
+class HomeworkSchema:
+    """Проверка списка работ из ответа api за один проход.
+
+    Допустимые статусы вычисляются один раз при создании схемы. Проход
+    по списку достает из каждой работы название, статус и id по одному
+    разу и возвращает компактные HomeworkRecord, по которым затем
+    ищутся изменения и рендерятся сообщения без повторных обращений к
+    словарям работ. Ошибки те же, что у parse_status.
+    """
+
+    def __init__(self, verdicts):
+        """Схема для статусов verdicts.
+
+        Каждый статус verdicts должен быть членом HomeworkStatus.
+        """
+        self.statuses = {
+            status: HomeworkStatus(status) for status in verdicts
+        }
+
+    def parse(self, homeworks):
+        """Записи HomeworkRecord всех работ списка."""
+        statuses = self.statuses
+        records = []
+        append = records.append
+        for homework in homeworks:
+            try:
+                name = homework['homework_name']
+                status = homework['status']
+            except KeyError as error:
+                raise KeyError(f'В полученных данных нет ключа {error}')
+            except TypeError:
+                raise TypeError('Работа приходит не в типе данных dict')
+            if not name:
+                raise KeyError('В полученных данных нет ключа homework_name')
+            member = statuses.get(status)
+            if member is None:
+                if not status:
+                    raise KeyError('В полученных данных нет ключа status')
+                raise ValueError(f'Неопределенный статус {status}')
+            key = homework.get('id') or name
+            append(HomeworkRecord(str(key), name, member))
+        return records
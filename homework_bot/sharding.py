@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+
+from homework_bot.lifecycle import terminate
+
+logger = logging.getLogger(__name__)
+
+
+def parse_shard(value):
+    """Номер и число шардов из строки вида 3/16, нумерация с нуля."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f'шард {value!r} должен иметь вид номер/число')
+    if count <= 0 or not 0 <= index < count:
+        raise ValueError(f'шард {value!r}: нужно 0 <= номер < число')
+    return index, count
+
+
+# Соль весов для деления шарда машины между ее воркерами
+WORKER_SALT = 'worker/'
+
+
+def shard_weight(name, shard, salt=''):
+    """Стабильный между процессами вес пары аккаунт-шард."""
+    digest = hashlib.blake2b(
+        f'{salt}{shard}:{name}'.encode('utf-8'), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def shard_of(name, count, salt=''):
+    """Шард, владеющий аккаунтом name.
+
+    Rendezvous hashing: аккаунт достается шарду с наибольшим весом,
+    поэтому при изменении числа шардов с N на N + 1 переезжает
+    только около 1 / (N + 1) аккаунтов, и все на новый шард.
+    """
+    return max(
+        range(count), key=lambda shard: shard_weight(name, shard, salt)
+    )
+
+
+def shard_accounts(accounts, index, count, salt=''):
+    """Аккаунты, принадлежащие шарду index из count."""
+    if count == 1:
+        return list(accounts)
+    return [
+        account for account in accounts
+        if shard_of(account.name, count, salt) == index
+    ]
+
+
+def select_accounts(accounts, shard, worker=None):
+    """Аккаунты шарда машины shard, а с worker - доля воркера в нем.
+
+    Воркеры делят уже отобранные аккаунты машины весами с другой
+    солью, поэтому их доли в сумме дают ровно шард машины при любом
+    числе воркеров на каждой машине, а веса с той же солью не
+    сваливали бы аккаунты шарда на немногих воркеров.
+    """
+    accounts = shard_accounts(accounts, *shard)
+    if worker is not None:
+        accounts = shard_accounts(accounts, *worker, WORKER_SALT)
+    return accounts
+
+
+def _worker_main(target, args):
+    """Точка входа воркера: свой обработчик SIGTERM и target(*args).
+
+    После fork воркер наследует обработчик пула, поэтому SIGTERM
+    переопределяется так, чтобы выполнились блоки finally воркера.
+    """
+    signal.signal(signal.SIGTERM, terminate)
+    target(*args)
+
+
+class WorkerPool:
+    """Процессы-воркеры с перезапуском упавших.
+
+    Каждый процесс выполняет target(*args) со своими args. SIGTERM
+    останавливает пул и передается воркерам.
+    """
+
+    def __init__(self, target, worker_args, restart_delay=5.0):
+        """Пул из len(worker_args) процессов."""
+        self.target = target
+        self.worker_args = list(worker_args)
+        self.restart_delay = restart_delay
+        self.processes = [None] * len(self.worker_args)
+        self._stopping = False
+
+    def _spawn(self, index):
+        """Запуск воркера index."""
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(self.target, self.worker_args[index]),
+            name=f'homework-worker-{index}',
+        )
+        process.start()
+        self.processes[index] = process
+
+    def _restart(self, index):
+        """Перезапуск упавшего воркера, завершившийся штатно не нужен."""
+        process = self.processes[index]
+        process.join()
+        if process.exitcode == 0:
+            logger.warning('Воркер %d завершил работу', index)
+            self.processes[index] = None
+            return
+        logger.error(
+            'Воркер %d завершился с кодом %s, перезапуск через %s сек',
+            index, process.exitcode, self.restart_delay,
+        )
+        time.sleep(self.restart_delay)
+        self._spawn(index)
+
+    def run(self):
+        """Запуск воркеров и перезапуск упавших до остановки пула."""
+        previous = signal.signal(signal.SIGTERM, lambda *args: self.stop())
+        try:
+            for index in range(len(self.worker_args)):
+                self._spawn(index)
+            while not self._stopping and any(self.processes):
+                sentinels = {
+                    process.sentinel: index
+                    for index, process in enumerate(self.processes)
+                    if process is not None
+                }
+                for sentinel in wait(list(sentinels), timeout=1.0):
+                    if self._stopping:
+                        break
+                    self._restart(sentinels[sentinel])
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            self.stop()
+            for process in self.processes:
+                if process is not None:
+                    process.join()
+
+    def stop(self):
+        """Остановка пула и передача SIGTERM воркерам."""
+        self._stopping = True
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
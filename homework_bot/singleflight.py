@@ -0,0 +1,89 @@
+import threading
+import time
+
+from homework_bot.metrics import COALESCED_CALLS
+
+
+class _Call:
+    """Выполняющийся вызов и его результат."""
+
+    def __init__(self):
+        """Вызов без результата."""
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Один вызов на ключ для всех, кто ждет его одновременно.
+
+    Первый вызов do с ключом выполняет func, остальные до его
+    окончания ждут и получают тот же результат или то же исключение.
+    Успешный результат еще ttl секунд отдается из кеша без вызова.
+    В кеше не больше maxsize ключей. Вызовы учитываются в метрике по
+    исходу: leader, shared или cached.
+    """
+
+    def __init__(self, ttl=5.0, maxsize=10000, clock=time.monotonic):
+        """Пустые кеш и таблица вызовов."""
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._calls = {}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key, now):
+        """Неустаревшая запись кеша (срок, результат) либо None."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._cache[key]
+            return None
+        return entry
+
+    def _remember(self, key, value, now):
+        """Кеширование результата с вытеснением устаревших."""
+        if self.ttl <= 0:
+            return
+        if len(self._cache) >= self.maxsize:
+            self._cache = {
+                cached_key: entry
+                for cached_key, entry in self._cache.items()
+                if entry[0] > now
+            }
+            if len(self._cache) >= self.maxsize:
+                self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (now + self.ttl, value)
+
+    def do(self, key, func):
+        """Результат func для ключа key, общий для одновременных вызовов."""
+        with self._lock:
+            entry = self._cached(key, self.clock())
+            call = self._calls.get(key)
+            leader = entry is None and call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if entry is not None:
+            COALESCED_CALLS.inc('cached')
+            return entry[1]
+        if not leader:
+            COALESCED_CALLS.inc('shared')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        COALESCED_CALLS.inc('leader')
+        try:
+            call.value = func()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None:
+                    self._remember(key, call.value, self.clock())
+            call.done.set()
+        return call.value
@@ -0,0 +1,430 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Сколько хешей последних отправленных сообщений хранить на аккаунт
+RECENT_MESSAGES = 32
+# Сколько последних изменений статусов хранить для /history
+RECENT_CHANGES = 20
+
+
+def message_hash(message):
+    """Короткий хеш текста сообщения для дедупликации."""
+    return hashlib.sha1(message.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class AccountSnapshot:
+    """Сохраненное состояние аккаунта для теплого старта."""
+
+    cursor: int = None
+    statuses: dict = field(default_factory=dict)
+    sent_hashes: list = field(default_factory=list)
+    last_change: float = None
+    reviewing_since: float = None
+    next_poll_at: float = None
+    # Последние изменения статусов: (ключ, название, статус, время)
+    history: list = field(default_factory=list)
+    # Названия домашек по ключу для ответа на /status
+    names: dict = field(default_factory=dict)
+
+
+class StateStore:
+    """Хранилище состояния в памяти процесса.
+
+    Задает интерфейс бэкендов состояния: курсоры аккаунтов, статусы
+    домашек, хеши отправленных сообщений и исходящие сообщения, еще
+    не доставленные в Telegram. Само по себе ничего не сохраняет между
+    перезапусками.
+    """
+
+    # Переживает ли состояние перезапуск процесса
+    persistent = False
+
+    def __init__(self):
+        """Пустое состояние."""
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._outgoing = OrderedDict()
+
+    def _snapshot(self, account):
+        return self._snapshots.setdefault(account, AccountSnapshot())
+
+    def load_all(self):
+        """Состояние всех аккаунтов: имя -> AccountSnapshot."""
+        with self._lock:
+            return {
+                name: AccountSnapshot(
+                    snapshot.cursor,
+                    dict(snapshot.statuses),
+                    list(snapshot.sent_hashes),
+                    snapshot.last_change,
+                    snapshot.reviewing_since,
+                    snapshot.next_poll_at,
+                    list(snapshot.history),
+                    dict(snapshot.names),
+                )
+                for name, snapshot in self._snapshots.items()
+            }
+
+    def set_cursor(self, account, timestamp):
+        """Запись from_date аккаунта."""
+        with self._lock:
+            self._snapshot(account).cursor = timestamp
+
+    def set_status(self, account, homework, status, name=None):
+        """Запись последнего статуса и названия домашки."""
+        with self._lock:
+            snapshot = self._snapshot(account)
+            snapshot.statuses[homework] = status
+            if name is not None:
+                snapshot.names[homework] = name
+
+    def set_activity(self, account, last_change, reviewing_since):
+        """Запись времени последнего изменения статуса для планировщика."""
+        with self._lock:
+            snapshot = self._snapshot(account)
+            snapshot.last_change = last_change
+            snapshot.reviewing_since = reviewing_since
+
+    def set_schedule(self, account, next_poll_at):
+        """Запись времени следующего опроса для старта без всплеска."""
+        with self._lock:
+            self._snapshot(account).next_poll_at = next_poll_at
+
+    def add_history(self, account, homework, name, status, changed_at):
+        """Запись изменения статуса домашки в историю аккаунта."""
+        with self._lock:
+            history = self._snapshot(account).history
+            history.append((homework, name, status, changed_at))
+            del history[:-RECENT_CHANGES]
+
+    def remember_message(self, account, digest):
+        """Запись хеша отправленного сообщения."""
+        with self._lock:
+            hashes = self._snapshot(account).sent_hashes
+            hashes.append(digest)
+            del hashes[:-RECENT_MESSAGES]
+
+    def add_outgoing(self, account, chat_id, message):
+        """Запись исходящего сообщения до доставки, возвращает его ключ."""
+        key = uuid.uuid4().hex
+        with self._lock:
+            self._outgoing[key] = (account, str(chat_id), message)
+        return key
+
+    def remove_outgoing(self, key):
+        """Удаление доставленного или отброшенного сообщения."""
+        with self._lock:
+            self._outgoing.pop(key, None)
+
+    def load_outgoing(self, accounts):
+        """Недоставленные сообщения аккаунтов в порядке постановки.
+
+        Возвращает список (ключ, аккаунт, чат, текст).
+        """
+        accounts = set(accounts)
+        with self._lock:
+            return [
+                (key, account, chat_id, message)
+                for key, (account, chat_id, message)
+                in self._outgoing.items()
+                if account in accounts
+            ]
+
+    def flush(self):
+        """Сброс накопленных записей в постоянное хранилище.
+
+        При ошибке записи выбрасывает исключение, а записи остаются
+        в очереди до следующего сброса.
+        """
+
+    def try_flush(self):
+        """Сброс записей с логированием ошибки вместо исключения."""
+        try:
+            self.flush()
+        except Exception as error:
+            logger.error('Не удалось сохранить состояние: %s', error)
+            return False
+        return True
+
+    def close(self):
+        """Сброс записей и освобождение ресурсов."""
+        self.flush()
+
+
+class SQLiteStateStore(StateStore):
+    """Хранилище состояния в SQLite в режиме WAL.
+
+    Записи копятся в памяти и сбрасываются одной транзакцией, когда
+    их набирается batch_size или с прошлого сброса прошло больше
+    flush_interval секунд. Транзакция атомарна, поэтому падение
+    процесса теряет только несброшенный хвост, но не портит базу.
+    """
+
+    persistent = True
+
+    def __init__(self, path, batch_size=100, flush_interval=5.0):
+        """Открытие базы по пути path и создание таблиц."""
+        super().__init__()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = deque()
+        self._last_flush = time.monotonic()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript('''
+            CREATE TABLE IF NOT EXISTS cursors (
+                account TEXT PRIMARY KEY,
+                from_date INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS statuses (
+                account TEXT NOT NULL,
+                homework TEXT NOT NULL,
+                status TEXT,
+                name TEXT,
+                PRIMARY KEY (account, homework)
+            );
+            CREATE TABLE IF NOT EXISTS sent_messages (
+                account TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                sent_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sent_messages_account
+                ON sent_messages (account, sent_at);
+            CREATE TABLE IF NOT EXISTS activity (
+                account TEXT PRIMARY KEY,
+                last_change REAL,
+                reviewing_since REAL
+            );
+            CREATE TABLE IF NOT EXISTS schedule (
+                account TEXT PRIMARY KEY,
+                next_poll_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS history (
+                account TEXT NOT NULL,
+                homework TEXT NOT NULL,
+                name TEXT,
+                status TEXT,
+                changed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS history_account
+                ON history (account, changed_at);
+            CREATE TABLE IF NOT EXISTS outgoing (
+                key TEXT PRIMARY KEY,
+                account TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                message TEXT NOT NULL,
+                queued_at REAL NOT NULL
+            );
+        ''')
+        columns = [
+            row[1] for row in
+            self._connection.execute('PRAGMA table_info(statuses)')
+        ]
+        if 'name' not in columns:
+            # База прошлой версии: статусы хранились без названий
+            self._connection.execute(
+                'ALTER TABLE statuses ADD COLUMN name TEXT'
+            )
+
+    def load_all(self):
+        """Чтение состояния всех аккаунтов по запросу на таблицу."""
+        self.flush()
+        snapshots = {}
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT account, from_date FROM cursors'
+            )
+            for account, from_date in rows:
+                snapshots.setdefault(
+                    account, AccountSnapshot()
+                ).cursor = from_date
+            rows = self._connection.execute(
+                'SELECT account, homework, status, name FROM statuses'
+            )
+            for account, homework, status, name in rows:
+                snapshot = snapshots.setdefault(account, AccountSnapshot())
+                snapshot.statuses[homework] = status
+                if name is not None:
+                    snapshot.names[homework] = name
+            rows = self._connection.execute(
+                'SELECT account, hash FROM sent_messages ORDER BY sent_at'
+            )
+            for account, digest in rows:
+                snapshots.setdefault(
+                    account, AccountSnapshot()
+                ).sent_hashes.append(digest)
+            rows = self._connection.execute(
+                'SELECT account, last_change, reviewing_since FROM activity'
+            )
+            for account, last_change, reviewing_since in rows:
+                snapshot = snapshots.setdefault(account, AccountSnapshot())
+                snapshot.last_change = last_change
+                snapshot.reviewing_since = reviewing_since
+            rows = self._connection.execute(
+                'SELECT account, next_poll_at FROM schedule'
+            )
+            for account, next_poll_at in rows:
+                snapshots.setdefault(
+                    account, AccountSnapshot()
+                ).next_poll_at = next_poll_at
+            rows = self._connection.execute(
+                'SELECT account, homework, name, status, changed_at '
+                'FROM history ORDER BY changed_at'
+            )
+            for account, *change in rows:
+                snapshots.setdefault(
+                    account, AccountSnapshot()
+                ).history.append(tuple(change))
+        for snapshot in snapshots.values():
+            del snapshot.sent_hashes[:-RECENT_MESSAGES]
+            del snapshot.history[:-RECENT_CHANGES]
+        return snapshots
+
+    def _write(self, sql, params):
+        """Постановка записи в пачку и сброс при заполнении.
+
+        Ошибка автоматического сброса только логируется: она не должна
+        прерывать опрос аккаунта, записавшего последнее значение.
+        """
+        with self._lock:
+            self._pending.append((sql, params))
+            due = (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.try_flush()
+
+    def set_cursor(self, account, timestamp):
+        """Запись from_date аккаунта."""
+        self._write(
+            'INSERT INTO cursors (account, from_date) VALUES (?, ?) '
+            'ON CONFLICT (account) '
+            'DO UPDATE SET from_date = excluded.from_date',
+            (account, timestamp),
+        )
+
+    def set_status(self, account, homework, status, name=None):
+        """Запись последнего статуса и названия домашки."""
+        self._write(
+            'INSERT INTO statuses (account, homework, status, name) '
+            'VALUES (?, ?, ?, ?) ON CONFLICT (account, homework) '
+            'DO UPDATE SET status = excluded.status, '
+            'name = COALESCE(excluded.name, statuses.name)',
+            (account, homework, status, name),
+        )
+
+    def set_activity(self, account, last_change, reviewing_since):
+        """Запись времени последнего изменения статуса для планировщика."""
+        self._write(
+            'INSERT INTO activity (account, last_change, reviewing_since) '
+            'VALUES (?, ?, ?) ON CONFLICT (account) DO UPDATE SET '
+            'last_change = excluded.last_change, '
+            'reviewing_since = excluded.reviewing_since',
+            (account, last_change, reviewing_since),
+        )
+
+    def set_schedule(self, account, next_poll_at):
+        """Запись времени следующего опроса для старта без всплеска."""
+        self._write(
+            'INSERT INTO schedule (account, next_poll_at) VALUES (?, ?) '
+            'ON CONFLICT (account) '
+            'DO UPDATE SET next_poll_at = excluded.next_poll_at',
+            (account, next_poll_at),
+        )
+
+    def add_history(self, account, homework, name, status, changed_at):
+        """Запись изменения статуса домашки в историю аккаунта."""
+        self._write(
+            'INSERT INTO history (account, homework, name, status, '
+            'changed_at) VALUES (?, ?, ?, ?, ?)',
+            (account, homework, name, status, changed_at),
+        )
+        self._write(
+            'DELETE FROM history WHERE account = ? AND rowid NOT IN '
+            '(SELECT rowid FROM history WHERE account = ? '
+            'ORDER BY changed_at DESC LIMIT ?)',
+            (account, account, RECENT_CHANGES),
+        )
+
+    def remember_message(self, account, digest):
+        """Запись хеша отправленного сообщения."""
+        self._write(
+            'INSERT INTO sent_messages (account, hash, sent_at) '
+            'VALUES (?, ?, ?)',
+            (account, digest, time.time()),
+        )
+        self._write(
+            'DELETE FROM sent_messages WHERE account = ? AND rowid NOT IN '
+            '(SELECT rowid FROM sent_messages WHERE account = ? '
+            'ORDER BY sent_at DESC LIMIT ?)',
+            (account, account, RECENT_MESSAGES),
+        )
+
+    def add_outgoing(self, account, chat_id, message):
+        """Запись исходящего сообщения до доставки, возвращает его ключ.
+
+        Запись идет в той же пачке, что и статусы, и не может оказаться
+        в базе позже статуса, о котором сообщение.
+        """
+        key = uuid.uuid4().hex
+        self._write(
+            'INSERT INTO outgoing (key, account, chat_id, message, '
+            'queued_at) VALUES (?, ?, ?, ?, ?)',
+            (key, account, str(chat_id), message, time.time()),
+        )
+        return key
+
+    def remove_outgoing(self, key):
+        """Удаление доставленного или отброшенного сообщения."""
+        self._write('DELETE FROM outgoing WHERE key = ?', (key,))
+
+    def load_outgoing(self, accounts):
+        """Недоставленные сообщения аккаунтов в порядке постановки."""
+        accounts = set(accounts)
+        self.flush()
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT key, account, chat_id, message FROM outgoing '
+                'ORDER BY queued_at, rowid'
+            ).fetchall()
+        return [row for row in rows if row[1] in accounts]
+
+    def flush(self):
+        """Сброс накопленных записей одной транзакцией.
+
+        Пачка удаляется из очереди только после успешного commit, при
+        ошибке транзакция откатывается, а записи ждут следующего сброса.
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            batch = list(self._pending)
+            with self._connection:
+                for sql, params in batch:
+                    self._connection.execute(sql, params)
+            self._pending.clear()
+        logger.debug('Состояние сохранено, записей: %d', len(batch))
+
+    def close(self):
+        """Сброс записей и закрытие базы."""
+        self.flush()
+        self._connection.close()
+
+
+def open_state_store(path=None):
+    """Хранилище состояния: SQLite по пути либо в памяти."""
+    if path:
+        return SQLiteStateStore(path)
+    return StateStore()
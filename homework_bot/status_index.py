@@ -0,0 +1,49 @@
+from homework_bot.records import intern_status
+
+
+class StatusIndex:
+    """Последние известные статусы домашек аккаунта по их id.
+
+    Позволяет выбрать из ответа api только работы, статус которых
+    действительно изменился, и рендерить сообщения лишь для них.
+    Статусы хранятся членами HomeworkStatus, а не строками ответов;
+    рядом хранятся названия работ для ответа на /status.
+    """
+
+    def __init__(self, statuses=None, names=None):
+        """Индекс по сохраненным статусам и названиям: ключ -> значение."""
+        self._statuses = {
+            key: intern_status(status)
+            for key, status in (statuses or {}).items()
+        }
+        self._names = dict(names or {})
+
+    def changed_records(self, records):
+        """Записи HomeworkRecord с новым статусом."""
+        statuses = self._statuses
+        return [
+            record for record in records
+            if statuses.get(record.key) is not record.status
+        ]
+
+    def set(self, key, status, name=None):
+        """Запоминание статуса и названия домашки по ключу."""
+        self._statuses[key] = intern_status(status)
+        if name is not None:
+            self._names[key] = name
+
+    def get(self, key):
+        """Последний известный статус домашки."""
+        return self._statuses.get(key)
+
+    def entries(self):
+        """Пары (название, статус) всех домашек; без названия - ключ."""
+        names = self._names
+        return [
+            (names.get(key, key), status)
+            for key, status in self._statuses.items()
+        ]
+
+    def __len__(self):
+        """Число отслеживаемых домашек."""
+        return len(self._statuses)
@@ -0,0 +1,20 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+# current_date меняется в каждом ответе и не входит в отпечаток
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*\d+')
+
+
+@dataclass(frozen=True)
+class Validators:
+    """Признаки последнего обработанного ответа api."""
+
+    etag: str = None
+    last_modified: str = None
+    fingerprint: str = None
+
+
+def fingerprint(content):
+    """Отпечаток тела ответа без изменчивого current_date."""
+    return hashlib.sha1(CURRENT_DATE.sub(b'', content)).hexdigest()
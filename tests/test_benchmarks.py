@@ -0,0 +1,35 @@
+from benchmarks import bench_json, bench_pipeline, bench_records
+
+
+class TestBenchmarks:
+
+    def test_pipeline_benchmark_runs(self):
+        results = bench_pipeline.run(
+            homework_sizes=(3,), iterations=3, accounts=2,
+            latency=0.001, error_rate=0.2,
+        )
+        names = [result.name for result in results]
+        assert 'main() loop [3 hw]' in names
+        assert 'send_message' in names
+        for result in results:
+            assert result.durations, f'Нет замеров для {result.name}'
+            assert result.percentile(0.99) >= result.percentile(0.5)
+        accounts = results[-1]
+        assert accounts.memory_per_account > 0
+        report = bench_pipeline.report(results)
+        assert len(report.splitlines()) == len(results) + 1
+
+    def test_json_benchmark_runs(self):
+        results = bench_json.run(homework_sizes=(5,), iterations=3)
+        assert len(results) == 4
+        report = bench_json.report(results)
+        assert 'ускорение' in report.splitlines()[0]
+        assert len(report.splitlines()) == len(results) + 1
+
+    def test_records_benchmark_runs(self):
+        results = dict(bench_records.run(homework_sizes=(200,)))
+        assert results['StatusIndex [200 hw]'] < (
+            results['dict из json [200 hw]']
+        ), 'Индекс статусов должен быть компактнее словарей работ.'
+        report = bench_records.report(list(results.items()))
+        assert len(report.splitlines()) == len(results) + 1
@@ -0,0 +1,155 @@
+import sqlite3
+import time
+
+import pytest
+import requests
+import telegram
+
+import homework
+from homework_bot.accounts import Account
+from homework_bot.breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                                  CircuitOpenError)
+from homework_bot.client import PracticumClient
+from homework_bot.delivery import DeliveryQueue
+from homework_bot.engine import AccountState
+from homework_bot.state import StateStore
+from tests.utils import FakeClock, RecordingBot
+
+
+class DownClient:
+
+    flights = None
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self.requests = 0
+
+    def get_if_changed(self, *args, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError('api')
+        self.requests += 1
+        self.breaker.record_failure()
+        raise requests.ConnectionError('down')
+
+
+class LockedLimiter:
+
+    def acquire(self, key):
+        raise sqlite3.OperationalError('database is locked')
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_probes(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            'api', failure_threshold=2, recovery_timeout=10, clock=clock
+        )
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow(), (
+            'Разомкнутый автомат должен отклонять запросы.'
+        )
+        clock.now = 10
+        assert breaker.allow(), 'После паузы должна пройти проба.'
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow(), 'Проб не должно быть больше probes.'
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.retry_in() == 10
+        clock.now = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.outage == 1, (
+            'Повторное размыкание после пробы - тот же сбой.'
+        )
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker('api', failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED, (
+            'Размыкать автомат должны только сбои подряд.'
+        )
+
+    def test_client_fails_fast_when_open(self):
+        client = PracticumClient(
+            breaker=CircuitBreaker('api', failure_threshold=2)
+        )
+        for _ in range(2):
+            with pytest.raises(requests.ConnectionError):
+                client.get('http://127.0.0.1:1/', timeout=1)
+        with pytest.raises(CircuitOpenError):
+            client.get('http://127.0.0.1:1/', timeout=1)
+        client.close()
+
+
+    def test_limiter_error_keeps_half_open_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            'api', failure_threshold=1, recovery_timeout=10, clock=clock
+        )
+        breaker.record_failure()
+        clock.now = 10
+        client = PracticumClient(breaker=breaker, limiter=LockedLimiter())
+        with pytest.raises(sqlite3.OperationalError):
+            client.get('http://127.0.0.1:1/', timeout=1)
+        assert breaker.allow(), (
+            'Сбой ограничителя не должен тратить пробу автомата.'
+        )
+        client.close()
+
+
+class TestFanOut:
+
+    def test_outage_reported_once_per_account(self):
+        breaker = CircuitBreaker(
+            'api', failure_threshold=2, recovery_timeout=3600
+        )
+        client = DownClient(breaker)
+        store = StateStore()
+        sent = []
+        states = [
+            AccountState(Account(f'a{index}', 't', 'b', str(index)))
+            for index in range(3)
+        ]
+        for _ in range(5):
+            for state in states:
+                homework.poll_account(
+                    state, lambda message: sent.append(message) or True,
+                    client, store,
+                )
+        assert client.requests == 2, (
+            'Разомкнутый автомат не должен пускать запросы к api.'
+        )
+        assert len(sent) == 3, (
+            'О сбое api каждый пользователь узнает один раз за сбой.'
+        )
+
+
+class TestDeliveryBreaker:
+
+    def test_messages_wait_while_telegram_is_down(self):
+        breaker = CircuitBreaker(
+            'telegram', failure_threshold=1, recovery_timeout=0.2
+        )
+        bot = RecordingBot([telegram.error.NetworkError('down')])
+        queue = DeliveryQueue(
+            workers=2, chat_interval=0.01, backoff_start=0.01,
+            breaker=breaker,
+        )
+        queue.start()
+        started = time.monotonic()
+        queue.put(bot, 1, 'first')
+        queue.put(bot, 2, 'second')
+        assert queue.join(5)
+        queue.stop()
+        assert sorted(text for _, text, _ in bot.sent) == ['first', 'second']
+        assert bot.sent[0][2] - started >= 0.2, (
+            'Пока автомат разомкнут, сообщения не должны отправляться.'
+        )
+        assert breaker.state == CLOSED
@@ -0,0 +1,174 @@
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from homework_bot.accounts import Account
+from homework_bot.client import PracticumClient, Validators, fingerprint
+from homework_bot.engine import AccountState
+
+
+class PracticumHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    homeworks = []
+    etag = None
+    dates = itertools.count(1)
+
+    def do_GET(self):
+        if self.etag and self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({
+            'homeworks': self.homeworks,
+            'current_date': next(self.dates),
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.etag:
+            self.send_header('ETag', self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PracticumHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+class TestPracticumClient:
+
+    def test_connections_are_reused(self, server_url):
+        client = PracticumClient(pool_size=2)
+        for _ in range(5):
+            assert client.get(server_url).json()['homeworks'] == []
+        stats = client.stats()
+        client.close()
+        assert stats['requests'] == 5
+        assert stats['new_connections'] == 1, (
+            'Повторные запросы должны использовать keep-alive соединение.'
+        )
+        assert stats['reuses'] == 4
+        assert stats['handshake_time'] >= 0
+
+    def test_default_timeout_is_applied(self, monkeypatch):
+        client = PracticumClient(connect_timeout=1, read_timeout=2)
+        captured = {}
+
+        def fake_get(url, **kwargs):
+            captured.update(kwargs)
+
+        monkeypatch.setattr(client.session, 'get', fake_get)
+        client.get('http://example.invalid/')
+        assert captured['timeout'] == (1, 2), (
+            'Клиент должен передавать таймауты в каждый запрос.'
+        )
+
+    def test_fetch_api_answer_uses_client(self, server_url, monkeypatch,
+                                          homework_module):
+        client = PracticumClient()
+        monkeypatch.setattr(homework_module, 'ENDPOINT', server_url)
+
+        def forbidden_get(*args, **kwargs):
+            raise AssertionError('Запрос должен идти через пул клиента.')
+
+        monkeypatch.setattr(requests, 'get', forbidden_get)
+        answer = homework_module.fetch_api_answer(
+            0, {'Authorization': 'OAuth t'}, client
+        )
+        client.close()
+        assert answer['homeworks'] == []
+
+    def test_failed_connect_is_not_counted_as_connection(self):
+        client = PracticumClient(connect_timeout=1)
+        with pytest.raises(requests.ConnectionError):
+            client.get('http://127.0.0.1:9/')
+        stats = client.stats()
+        client.close()
+        assert stats['new_connections'] == 0
+        assert stats['failed_connections'] >= 1
+        assert stats['reuses'] == 0, (
+            'Неудачное соединение не должно считаться переиспользованием.'
+        )
+
+
+class TestUnchangedAnswers:
+    HOMEWORKS = [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+
+    def poll(self, homework_module, monkeypatch, server_url, notify,
+             times=3):
+        client = PracticumClient()
+        monkeypatch.setattr(homework_module, 'ENDPOINT', server_url)
+        state = AccountState(Account('student', 't', '1:x', '1'))
+        for _ in range(times):
+            homework_module.poll_account(state, notify, client)
+        stats = client.stats()
+        client.close()
+        return stats
+
+    def test_fingerprint_ignores_current_date(self):
+        assert fingerprint(b'{"homeworks": [], "current_date": 1}') == (
+            fingerprint(b'{"homeworks": [], "current_date": 2}')
+        )
+
+    def test_unchanged_body_is_not_parsed(self, server_url, monkeypatch,
+                                          homework_module):
+        monkeypatch.setattr(PracticumHandler, 'homeworks', self.HOMEWORKS)
+        parsed = []
+        schema = homework_module.HOMEWORK_SCHEMA
+        original_parse = schema.parse
+
+        def counting_parse(homeworks):
+            parsed.append(homeworks)
+            return original_parse(homeworks)
+
+        monkeypatch.setattr(schema, 'parse', counting_parse)
+        stats = self.poll(
+            homework_module, monkeypatch, server_url, lambda text: True
+        )
+        assert len(parsed) == 1
+        assert stats['skipped_unchanged'] == 2, (
+            'Неизменившиеся ответы должны пропускаться без разбора.'
+        )
+
+    def test_etag_not_modified(self, server_url, monkeypatch,
+                               homework_module):
+        monkeypatch.setattr(PracticumHandler, 'etag', '"v1"')
+        client = PracticumClient()
+        response, validators, changed = client.get_if_changed(
+            server_url, Validators()
+        )
+        assert changed and validators.etag == '"v1"'
+        response, _, changed = client.get_if_changed(server_url, validators)
+        client.close()
+        assert response.status_code == 304
+        assert not changed
+
+    def test_unsent_answer_is_processed_again(self, server_url, monkeypatch,
+                                              homework_module):
+        monkeypatch.setattr(PracticumHandler, 'homeworks', self.HOMEWORKS)
+        attempts = []
+
+        def notify(text):
+            attempts.append(text)
+            return len(attempts) > 1
+
+        stats = self.poll(homework_module, monkeypatch, server_url, notify)
+        assert len(attempts) == 2, (
+            'Ответ с неотправленным уведомлением нельзя считать '
+            'обработанным.'
+        )
+        assert stats['skipped_unchanged'] == 1
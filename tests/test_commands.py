@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+
+import homework
+from homework_bot.accounts import Account
+from homework_bot.commands import CommandService
+from homework_bot.engine import PollingEngine
+from homework_bot.records import HomeworkStatus
+from homework_bot.state import RECENT_CHANGES, SQLiteStateStore
+
+ACCOUNT = Account('a', 't', '1234:abcdefg', '42', period=3600)
+
+
+class EngineThread:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        self.loop.run_until_complete(self.engine.run())
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.engine._wakes:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *args):
+        self.loop.call_soon_threadsafe(self.engine.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(
+            coroutine, self.loop
+        ).result(5)
+
+
+def make_engine(polls):
+    def poll(state):
+        polls.append(time.time())
+        time.sleep(0.05)
+        return True
+
+    engine = PollingEngine([ACCOUNT], poll)
+    engine.states['a'].next_poll_at = time.time() + 3600
+    return engine
+
+
+class TestCommandService:
+
+    def test_now_polls_once_for_burst(self):
+        polls = []
+        engine = make_engine(polls)
+        with EngineThread(engine) as runner:
+            async def burst():
+                return await asyncio.gather(
+                    *(engine.poll_now('a') for _ in range(10))
+                )
+
+            assert runner.call(burst()) == [True] * 10
+        assert len(polls) == 1, (
+            'Всплеск /now должен давать один опрос api на аккаунт.'
+        )
+
+    def test_fresh_cache_answers_without_api(self):
+        polls = []
+        engine = make_engine(polls)
+        with EngineThread(engine) as runner:
+            service = CommandService(
+                engine, homework.RENDERER, runner.loop, freshness=60
+            )
+            service.answer('now', ACCOUNT.telegram_token, 42)
+            assert len(polls) == 1, 'Устаревший кеш должен обновиться.'
+            threads = [
+                threading.Thread(
+                    target=service.answer,
+                    args=('now', ACCOUNT.telegram_token, 42),
+                )
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+        assert len(polls) == 1, (
+            'Свежий кеш должен отвечать без обращения к api.'
+        )
+
+    def test_status_and_history_from_cache(self):
+        engine = PollingEngine([ACCOUNT], lambda state: True)
+        state = engine.states['a']
+        store = SQLiteStateStore(':memory:')
+        for status in ('reviewing', 'approved'):
+            homework.process_homeworks(state, lambda message: True, [
+                {'id': 1, 'homework_name': 'hw1', 'status': status}
+            ], store)
+        service = CommandService(engine, homework.RENDERER, loop=None)
+        status = service.answer('status', ACCOUNT.telegram_token, '42')
+        assert status == (
+            '"hw1": ' + homework.HOMEWORK_VERDICTS['approved']
+        ), '/status должен показывать последний статус работы.'
+        history = service.answer('history', ACCOUNT.telegram_token, '42')
+        assert len(history.splitlines()) == 2
+        assert service.answer('status', 'other', '42') is None, (
+            'Чужому чату бот не должен отвечать.'
+        )
+        store.close()
+
+    def test_status_lists_works_beyond_history(self):
+        engine = PollingEngine([ACCOUNT], lambda state: True)
+        state = engine.states['a']
+        store = SQLiteStateStore(':memory:')
+        count = RECENT_CHANGES + 5
+        homework.process_homeworks(state, lambda message: True, [
+            {'id': index, 'homework_name': f'hw{index}',
+             'status': 'approved'}
+            for index in range(count)
+        ], store)
+        service = CommandService(engine, homework.RENDERER, loop=None)
+        status = service.answer('status', ACCOUNT.telegram_token, '42')
+        store.close()
+        assert len(status.splitlines()) == count, (
+            '/status должен показывать все работы, а не только '
+            'попавшие в историю изменений.'
+        )
+        assert f'"hw{count - 1}": ' in status and '"hw0": ' in status
+
+    def test_empty_history(self):
+        engine = PollingEngine([ACCOUNT], lambda state: True)
+        service = CommandService(engine, homework.RENDERER, loop=None)
+        assert service.answer('status', ACCOUNT.telegram_token, '42') == (
+            'Изменений статусов работ пока не было'
+        )
+
+
+class TestHistoryStore:
+
+    def test_history_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = SQLiteStateStore(path)
+        for index in range(RECENT_CHANGES + 5):
+            store.add_history('a', str(index), f'hw{index}', 'approved',
+                              float(index))
+        store.close()
+        restored = SQLiteStateStore(path)
+        engine = PollingEngine([ACCOUNT], lambda state: True, store=restored)
+        history = list(engine.states['a'].history)
+        restored.close()
+        assert len(history) == RECENT_CHANGES, (
+            'Хранится только RECENT_CHANGES последних изменений.'
+        )
+        assert history[-1][:3] == (
+            str(RECENT_CHANGES + 4), f'hw{RECENT_CHANGES + 4}',
+            HomeworkStatus.APPROVED,
+        )
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from homework_bot.accounts import ConfigSource, load_config
+from homework_bot.engine import PollingEngine
+from homework_bot.scheduler import PollScheduler
+
+
+def account(name, token='t'):
+    return {
+        'name': name, 'practicum_token': token,
+        'telegram_token': 'b', 'telegram_chat_id': '1',
+    }
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding='utf-8')
+    # Время изменения сдвигается явно, иначе быстрая перезапись
+    # может не отличаться по mtime
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestConfig:
+
+    def test_directory_with_json_and_toml(self, tmp_path):
+        write_json(tmp_path / 'a.json', [account('a')])
+        (tmp_path / 'b.toml').write_text(
+            '[[accounts]]\nname = "b"\npracticum_token = "t"\n'
+            'telegram_token = "b"\ntelegram_chat_id = "1"\nperiod = 300\n',
+            encoding='utf-8',
+        )
+        (tmp_path / 'notes.txt').write_text('не конфигурация')
+        accounts, errors = load_config(str(tmp_path))
+        assert errors == []
+        assert [item.name for item in accounts] == ['a', 'b']
+        assert accounts[1].period == 300
+
+    def test_yaml_file(self, tmp_path):
+        pytest.importorskip('yaml')
+        path = tmp_path / 'accounts.yml'
+        path.write_text(
+            'accounts:\n  - name: c\n    practicum_token: t\n'
+            '    telegram_token: b\n    telegram_chat_id: "1"\n',
+            encoding='utf-8',
+        )
+        accounts, errors = load_config(str(path))
+        assert errors == []
+        assert accounts[0].name == 'c'
+
+    def test_invalid_accounts_reported_others_loaded(self, tmp_path):
+        write_json(tmp_path / 'good.json', [account('a'), {'name': 'b'}])
+        (tmp_path / 'broken.json').write_text('{', encoding='utf-8')
+        accounts, errors = load_config(str(tmp_path))
+        assert [item.name for item in accounts] == ['a'], (
+            'Корректные аккаунты должны загружаться несмотря на ошибки.'
+        )
+        assert any('broken.json' in error for error in errors)
+        assert any('аккаунт #1' in error for error in errors)
+
+    def test_invalid_edit_keeps_previous_version(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        write_json(path, [account('a', token='old')])
+        source = ConfigSource(str(path))
+        source.load()
+        assert source.reload() is None, (
+            'Без изменений файла конфигурация не перечитывается.'
+        )
+        write_json(path, [{**account('a'), 'practicum_token': ''}])
+        accounts, errors = source.reload()
+        assert errors
+        assert accounts[0].practicum_token == 'old', (
+            'Ошибка в аккаунте не должна останавливать его опрос.'
+        )
+
+    def test_engine_applies_additions_and_removals(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        write_json(path, [account('a'), account('b')])
+        source = ConfigSource(str(path))
+        accounts, _ = source.load()
+        polled = []
+
+        def poll(state):
+            polled.append(state.account.name)
+            return True
+
+        def reload():
+            accounts = source.reload()
+            return accounts and accounts[0]
+
+        engine = PollingEngine(
+            accounts, poll, scheduler=PollScheduler(spread=0)
+        )
+
+        async def run_and_reload():
+            task = asyncio.ensure_future(engine.run(reload, 0.01))
+            while 'b' not in polled:
+                await asyncio.sleep(0.01)
+            write_json(path, [account('a', token='new'), account('c')])
+            while 'c' not in polled:
+                await asyncio.sleep(0.01)
+            engine.stop()
+            await task
+
+        asyncio.run(run_and_reload())
+        assert sorted(engine.states) == ['a', 'c']
+        assert engine.states['a'].account.practicum_token == 'new', (
+            'Измененный аккаунт должен получить новые учетные данные.'
+        )
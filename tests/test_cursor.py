@@ -0,0 +1,75 @@
+from homework_bot.accounts import Account
+from homework_bot.engine import AccountState
+from homework_bot.state import SQLiteStateStore, StateStore
+
+
+class TestIncrementalCursor:
+    ANSWERS = [
+        {'homeworks': [{'homework_name': 'hw', 'status': 'reviewing'}],
+         'current_date': 200},
+        {'homeworks': [], 'current_date': 300},
+    ]
+
+    def poll_answers(self, monkeypatch, homework_module, state, store):
+        requested = []
+
+        def fake_fetch(timestamp, headers, client=None):
+            requested.append(timestamp)
+            return self.ANSWERS[len(requested) - 1]
+
+        monkeypatch.setattr(homework_module, 'fetch_api_answer', fake_fetch)
+        for _ in self.ANSWERS:
+            assert homework_module.poll_account(
+                state, lambda message: True, store=store
+            )
+        return requested
+
+    def test_from_date_advances_and_survives_restart(
+            self, tmp_path, monkeypatch, homework_module):
+        path = tmp_path / 'state.db'
+        store = SQLiteStateStore(path)
+        state = AccountState(Account('student', 't', '1:x', '1'),
+                             timestamp=100)
+        requested = self.poll_answers(
+            monkeypatch, homework_module, state, store
+        )
+        store.close()
+        assert requested == [100, 200], (
+            'from_date следующего запроса должен браться из current_date.'
+        )
+        restored = AccountState(Account('student', 't', '1:x', '1'),
+                                timestamp=0)
+        restored.restore(SQLiteStateStore(path).load_all()['student'])
+        assert restored.timestamp == 300, (
+            'После перезапуска опрос должен продолжаться с сохраненного '
+            'курсора.'
+        )
+
+    def test_cursor_is_fixed_without_state_file(self, monkeypatch,
+                                                homework_module):
+        state = AccountState(Account('student', 't', '1:x', '1'),
+                             timestamp=100)
+        requested = self.poll_answers(
+            monkeypatch, homework_module, state, StateStore()
+        )
+        assert requested == [100, 100]
+
+    def test_cursor_does_not_pass_unparsed_homework(
+            self, tmp_path, monkeypatch, homework_module):
+        monkeypatch.setattr(
+            homework_module, 'fetch_api_answer',
+            lambda timestamp, headers, client=None: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'unknown'}],
+                'current_date': 500,
+            }
+        )
+        store = SQLiteStateStore(tmp_path / 'state.db')
+        state = AccountState(Account('student', 't', '1:x', '1'),
+                             timestamp=100)
+        assert not homework_module.poll_account(
+            state, lambda message: True, store=store
+        )
+        assert state.timestamp == 100, (
+            'Курсор не должен сдвигаться за работу, которую не удалось '
+            'разобрать.'
+        )
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import telegram
+
+from homework_bot.accounts import Account
+from homework_bot.delivery import DeliveryQueue
+from homework_bot.engine import AccountState
+from homework_bot.state import SQLiteStateStore
+from tests.utils import RecordingBot
+
+
+class TestDeliveryQueue:
+
+    def test_pending_messages_are_coalesced(self):
+        bot = RecordingBot()
+        queue = DeliveryQueue(workers=1)
+        for index in range(3):
+            queue.put(bot, 1, f'message {index}')
+        queue.start()
+        assert queue.join(5)
+        queue.stop()
+        assert len(bot.sent) == 1, (
+            'Ожидающие сообщения одного чата должны уходить одним.'
+        )
+        assert bot.sent[0][1] == 'message 0\n\nmessage 1\n\nmessage 2'
+        metrics = queue.metrics()
+        assert metrics['depth'] == 0
+        assert metrics['coalesced'] == 2
+
+    def test_transient_error_is_retried(self):
+        bot = RecordingBot([telegram.error.NetworkError('boom')])
+        queue = DeliveryQueue(workers=1, backoff_start=0.01)
+        queue.start()
+        queue.put(bot, 1, 'status')
+        assert queue.join(5), 'Сообщение должно быть доставлено повторно.'
+        queue.stop()
+        assert [text for _, text, _ in bot.sent] == ['status']
+        assert queue.metrics()['retries'] == 1
+
+    def test_done_called_after_delivery_only(self):
+        bot = RecordingBot([telegram.error.NetworkError('boom')] * 100)
+        queue = DeliveryQueue(workers=1, backoff_start=10)
+        done = []
+        queue.put(bot, 1, 'lost', lambda: done.append('lost'))
+        queue.start()
+        queue.stop(0.1)
+        assert done == [], 'Недоставленное сообщение не должно быть отмечено.'
+        bot = RecordingBot([telegram.error.Unauthorized('blocked')])
+        queue = DeliveryQueue(workers=1)
+        queue.put(bot, 1, 'dropped', lambda: done.append('dropped'))
+        queue.put(bot, 2, 'sent', lambda: done.append('sent'))
+        queue.start()
+        assert queue.join(5)
+        queue.stop()
+        assert sorted(done) == ['dropped', 'sent']
+
+    def test_permanent_error_drops_message(self):
+        bot = RecordingBot([telegram.error.Unauthorized('blocked')])
+        queue = DeliveryQueue(workers=1)
+        queue.start()
+        queue.put(bot, 1, 'status')
+        assert queue.join(5)
+        queue.stop()
+        assert bot.sent == []
+        assert queue.metrics()['dropped'] == 1
+
+    def test_chat_interval_is_respected(self):
+        bot = RecordingBot()
+        queue = DeliveryQueue(workers=2, chat_interval=0.2)
+        queue.start()
+        queue.put(bot, 1, 'first')
+        assert queue.join(5)
+        queue.put(bot, 1, 'second')
+        queue.put(bot, 2, 'other chat')
+        assert queue.join(5)
+        queue.stop()
+        times = {text: sent_at for _, text, sent_at in bot.sent}
+        assert times['second'] - times['first'] >= 0.19, (
+            'Между сообщениями одного чата должна быть пауза.'
+        )
+        assert times['other chat'] - times['first'] < 0.19
+
+
+class TestDigest:
+
+    def test_changes_are_batched_within_window(self):
+        bot = RecordingBot()
+        queue = DeliveryQueue(workers=1, digest_window=0.3)
+        queue.start()
+        started = time.monotonic()
+        for index in range(3):
+            queue.put(bot, 1, f'change {index}')
+            time.sleep(0.05)
+        assert queue.join(5)
+        queue.stop()
+        assert len(bot.sent) == 1, 'Изменения окна должны уйти одним.'
+        assert bot.sent[0][2] - started >= 0.29
+
+    def test_digest_size_flushes(self):
+        bot = RecordingBot()
+        queue = DeliveryQueue(workers=1, digest_window=60, digest_size=3)
+        queue.start()
+        for index in range(3):
+            queue.put(bot, 1, f'change {index}')
+        assert queue.join(5), (
+            'Набравший digest_size дайджест должен уйти сразу.'
+        )
+        queue.stop()
+        assert len(bot.sent) == 1
+
+    def test_urgent_message_flushes(self):
+        bot = RecordingBot()
+        queue = DeliveryQueue(
+            workers=1, digest_window=60,
+            urgent=lambda message: message.startswith('urgent'),
+        )
+        queue.start()
+        queue.put(bot, 1, 'reviewing')
+        queue.put(bot, 2, 'other chat')
+        queue.put(bot, 1, 'urgent approved')
+        assert queue.join(0.5) is False, (
+            'Дайджест другого чата не должен уходить досрочно.'
+        )
+        assert [text for _, text, _ in bot.sent] == [
+            'reviewing\n\nurgent approved'
+        ], 'Срочное сообщение должно отправлять дайджест чата сразу.'
+        queue.stop(5)
+        assert len(bot.sent) == 2, 'Остановка должна отправить дайджесты.'
+
+
+class TestOutgoing:
+
+    def test_undelivered_message_is_sent_after_restart(
+            self, tmp_path, homework_module):
+        path = tmp_path / 'state.db'
+        account = Account('student', 't', '1:x', '1')
+        store = SQLiteStateStore(path)
+        queue = DeliveryQueue(workers=1, backoff_start=10)
+        queue.start()
+        homework_module.queue_message(
+            queue, store, RecordingBot([telegram.error.NetworkError('down')]),
+            account, 'status',
+        )
+        queue.stop(0.1)
+        store.close()
+
+        store = SQLiteStateStore(path)
+        bot = RecordingBot()
+        queue = DeliveryQueue(workers=1)
+        homework_module.requeue_outgoing(
+            queue, store, {'student': AccountState(account)},
+            lambda account: bot, ['student'],
+        )
+        queue.start()
+        assert queue.join(5)
+        queue.stop()
+        assert [text for _, text, _ in bot.sent] == ['status'], (
+            'Сообщение, не доставленное до остановки, должно уйти '
+            'после перезапуска.'
+        )
+        assert store.load_outgoing(['student']) == []
+        store.close()
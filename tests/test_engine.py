@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from homework_bot.accounts import Account, load_config
+from homework_bot.engine import AccountState, PollingEngine
+from homework_bot.scheduler import PollScheduler
+
+
+def make_accounts(qty, period=600):
+    return [
+        Account(
+            name=f'student{index}',
+            practicum_token=f'token{index}',
+            telegram_token='1234:abcdefg',
+            telegram_chat_id=str(index),
+            period=period,
+        )
+        for index in range(qty)
+    ]
+
+
+class TestPollingEngine:
+
+    def test_all_accounts_polled_with_bounded_concurrency(self):
+        lock = threading.Lock()
+        active = []
+        peak = []
+        polled = []
+
+        def poll(state):
+            with lock:
+                active.append(state)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(state)
+                polled.append(state.account.name)
+            return True
+
+        engine = PollingEngine(
+            make_accounts(20), poll, concurrency=4,
+            scheduler=PollScheduler(spread=0),
+        )
+
+        async def run_and_stop():
+            task = asyncio.ensure_future(engine.run())
+            while len(polled) < 20:
+                await asyncio.sleep(0.01)
+            engine.stop()
+            await task
+
+        asyncio.run(run_and_stop())
+        assert sorted(set(polled)) == sorted(engine.states), (
+            'Каждый аккаунт должен быть опрошен.'
+        )
+        assert max(peak) <= 4, (
+            'Число одновременных опросов не должно превышать concurrency.'
+        )
+
+    def test_failed_poll_counts_error(self):
+        def poll(state):
+            if state.account.name == 'student0':
+                raise ConnectionError('boom')
+            return False
+
+        engine = PollingEngine(make_accounts(2), poll, concurrency=2)
+
+        async def poll_all():
+            engine._semaphore = asyncio.Semaphore(2)
+            await asyncio.gather(*(
+                engine.poll_once(state) for state in engine.states.values()
+            ))
+
+        asyncio.run(poll_all())
+        for state in engine.states.values():
+            assert state.errors == 1
+            assert state.last_success is None
+
+    def test_load_accounts(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        path.write_text(
+            '[{"name": "a", "practicum_token": "t", '
+            '"telegram_token": "1:x", "telegram_chat_id": "1"}]'
+        )
+        accounts, errors = load_config(str(path))
+        assert errors == []
+        assert accounts[0].headers == {'Authorization': 'OAuth t'}
+        assert accounts[0].period == 600
+
+
+class TestLoadConfig:
+
+    def write(self, tmp_path, text):
+        path = tmp_path / 'accounts.json'
+        path.write_text(text)
+        return path
+
+    def test_duplicate_names_rejected(self, tmp_path):
+        item = ('{"name": "a", "practicum_token": "t", '
+                '"telegram_token": "1:x", "telegram_chat_id": "1"}')
+        path = self.write(tmp_path, f'[{item}, {item}]')
+        accounts, errors = load_config(str(path))
+        assert len(accounts) == 1
+        assert any('повторяется имя a' in error for error in errors)
+
+    def test_all_errors_reported(self, tmp_path):
+        path = self.write(
+            tmp_path,
+            '[{"name": "a", "practicum_token": "", "telegram_token": "1:x", '
+            '"telegram_chat_id": "1", "period": 0}]'
+        )
+        accounts, errors = load_config(str(path))
+        assert accounts == []
+        assert 'practicum_token' in '; '.join(errors)
+        assert 'period' in '; '.join(errors)
+
+    def test_engine_rejects_duplicate_names(self):
+        accounts = make_accounts(1) * 2
+        with pytest.raises(ValueError):
+            PollingEngine(accounts, lambda state: True)
+
+
+class TestPollScheduler:
+
+    def make_state(self, **kwargs):
+        state = AccountState(make_accounts(1)[0])
+        for key, value in kwargs.items():
+            setattr(state, key, value)
+        return state
+
+    def test_default_delay_is_account_period(self):
+        assert PollScheduler().next_delay(self.make_state()) == 600
+
+    def test_fast_polling_after_reviewing(self):
+        state = self.make_state(reviewing_since=1000, last_change=1000)
+        scheduler = PollScheduler(fast_period=60, fast_window=100)
+        assert scheduler.next_delay(state, now=1050) == 60
+        assert scheduler.next_delay(state, now=1200) == 600
+
+    def test_backoff_never_below_period(self):
+        scheduler = PollScheduler(backoff_max=3000, jitter=0.2)
+        delays = [
+            scheduler.next_delay(self.make_state(failures=failures))
+            for failures in (1, 2, 3, 10)
+        ]
+        assert 600 <= delays[0] <= 720, (
+            'При ошибке соединения api нельзя опрашивать чаще периода.'
+        )
+        assert 960 <= delays[1] <= 1440
+        assert 1920 <= delays[2] <= 2880
+        assert 2400 <= delays[3] <= 3600
+
+    def test_idle_clock_starts_at_launch(self):
+        state = self.make_state()
+        scheduler = PollScheduler(idle_after=100, idle_factor=3)
+        assert scheduler.next_delay(state) == 600
+        assert scheduler.next_delay(state, now=state.last_change + 101) == (
+            1800
+        ), 'Аккаунт без изменений должен опрашиваться реже.'
+
+    def test_initial_delays_are_spread(self):
+        scheduler = PollScheduler()
+        delays = {
+            scheduler.initial_delay(AccountState(account))
+            for account in make_accounts(50)
+        }
+        assert len(delays) > 40, (
+            'Первые опросы аккаунтов должны быть разнесены по времени.'
+        )
+        assert all(0 <= delay < 600 for delay in delays)
+        assert PollScheduler(spread=0).initial_delay(
+            AccountState(make_accounts(1)[0])
+        ) == 0
+        assert scheduler.initial_delay(
+            AccountState(make_accounts(1)[0]), alone=True
+        ) == 0, 'Единственный аккаунт должен опрашиваться сразу.'
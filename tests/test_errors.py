@@ -0,0 +1,102 @@
+import itertools
+
+from homework_bot.accounts import Account
+from homework_bot.engine import AccountState
+from homework_bot.errors import ErrorTracker, fingerprint, message_template
+from tests.utils import FakeClock
+
+
+def raise_in_fetch(message):
+    raise ConnectionError(message)
+
+
+def raise_in_parse(message):
+    raise ConnectionError(message)
+
+
+def caught(func, message):
+    try:
+        func(message)
+    except ConnectionError as error:
+        return error
+
+
+class TestFingerprint:
+
+    def test_variable_details_are_normalized(self):
+        first = caught(raise_in_fetch, 'timeout 5.0 https://a/1 id=deadbeef12')
+        second = caught(raise_in_fetch, 'timeout 30 https://b/2 id=0badf00d99')
+        assert fingerprint(first) == fingerprint(second), (
+            'Ошибки, различающиеся только деталями, должны совпадать.'
+        )
+        assert message_template("status 'x' 500") == 'status <str> <n>'
+
+    def test_origin_distinguishes_errors(self):
+        first = fingerprint(caught(raise_in_fetch, 'boom'))
+        second = fingerprint(caught(raise_in_parse, 'boom'))
+        assert first.origin == 'raise_in_fetch'
+        assert first != second
+
+
+class TestErrorTracker:
+
+    def test_alternating_errors_reported_once_per_window(self):
+        clock = FakeClock()
+        tracker = ErrorTracker(window=3600, clock=clock)
+        errors = itertools.cycle([
+            caught(raise_in_fetch, 'a'), caught(raise_in_parse, 'b'),
+        ])
+        reported = [tracker.record(next(errors)) for _ in range(10)]
+        assert reported == [True, True] + [False] * 8, (
+            'Чередующиеся ошибки не должны приходить каждый раз.'
+        )
+        assert tracker.summary() == [], 'Сводка - только по концу окна.'
+        clock.now = 3600
+        summary = dict(
+            (key.origin, count) for key, count in tracker.summary()
+        )
+        assert summary == {'raise_in_fetch': 5, 'raise_in_parse': 5}
+        clock.now = 3600 * 3
+        assert tracker.record(caught(raise_in_fetch, 'a')), (
+            'После тихого окна ошибка сообщается снова.'
+        )
+
+    def test_lru_is_bounded(self):
+        tracker = ErrorTracker(maxsize=2)
+        for index in range(5):
+            error = caught(raise_in_fetch, f'error {"x" * index}')
+            tracker.record(error)
+        assert len(tracker._seen) == 2
+
+
+class TestPollErrors:
+
+    def test_repeated_errors_sent_as_summary(
+            self, homework_module, monkeypatch):
+        details = itertools.count()
+
+        def fetch(timestamp, headers, client=None):
+            raise ConnectionError(f'Сбой соединения, попытка {next(details)}')
+
+        monkeypatch.setattr(homework_module, 'fetch_api_answer', fetch)
+        clock = FakeClock()
+        state = AccountState(Account('student', 't', '1:x', '1'))
+        state.error_tracker = ErrorTracker(window=3600, clock=clock)
+        sent = []
+
+        def notify(message):
+            sent.append(message)
+            return True
+
+        for _ in range(5):
+            homework_module.poll_account(state, notify)
+        assert len(sent) == 1, (
+            'Повтор ошибки с другими деталями не должен отправляться.'
+        )
+        clock.now = 3600
+        homework_module.poll_account(state, notify)
+        assert len(sent) == 2
+        assert sent[-1].startswith('ConnectionError: Сбой соединения'), (
+            sent[-1]
+        )
+        assert 'x6 за последние 60 мин' in sent[-1]
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from homework_bot.accounts import Account
+from homework_bot.engine import PollingEngine
+from homework_bot.lease import LeaseKeeper, LeaseManager
+from homework_bot.scheduler import PollScheduler
+from homework_bot.state import SQLiteStateStore
+
+NAMES = ['a', 'b', 'c']
+
+
+class TestLease:
+
+    def test_each_account_has_one_owner(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        first = LeaseManager(path, owner='first')
+        second = LeaseManager(path, owner='second')
+        assert first.renew(NAMES) == set(NAMES)
+        assert second.renew(NAMES) == set(), (
+            'Аренду живого воркера нельзя забрать.'
+        )
+        assert first.renew(NAMES) == set(NAMES), (
+            'Heartbeat должен продлевать свои аренды.'
+        )
+
+    def test_release_gives_fast_takeover(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        first = LeaseManager(path, owner='first')
+        second = LeaseManager(path, owner='second')
+        first.renew(NAMES)
+        first.close()
+        assert second.renew(NAMES) == set(NAMES), (
+            'Отпущенные аренды должны сразу переходить к другому воркеру.'
+        )
+
+    def test_expired_lease_is_taken_over(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        first = LeaseManager(path, owner='first', ttl=0.2, margin=0.1)
+        second = LeaseManager(path, owner='second', ttl=0.2)
+        first.renew(NAMES)
+        assert first.holds('a')
+        time.sleep(0.25)
+        assert not first.holds('a'), (
+            'Без heartbeat воркер должен перестать считать аренду своей.'
+        )
+        assert second.renew(NAMES) == set(NAMES)
+
+    def test_removed_accounts_are_released(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        first = LeaseManager(path, owner='first')
+        second = LeaseManager(path, owner='second')
+        first.renew(NAMES)
+        first.renew(['a'])
+        assert second.renew(NAMES) == {'b', 'c'}
+
+    def test_state_refreshed_before_lease_is_published(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = SQLiteStateStore(path)
+        account = Account('a', 't', 'b', '1')
+        engine = PollingEngine([account], lambda state: True, store=store)
+        previous_owner = SQLiteStateStore(path)
+        previous_owner.set_status('a', '1', 'approved')
+        previous_owner.close()
+        lease = LeaseManager(path, owner='second')
+        seen = []
+
+        def on_gain(names):
+            seen.append(lease.holds('a'))
+            engine.refresh(names)
+
+        LeaseKeeper(lease, lambda: list(engine.states), on_gain).beat()
+        assert seen == [False], (
+            'Аккаунт не должен опрашиваться до чтения его состояния.'
+        )
+        assert lease.holds('a')
+        assert engine.states['a'].statuses.get('1') == 'approved', (
+            'Новый владелец должен продолжить с состояния прежнего.'
+        )
+
+    def test_engine_polls_only_guarded_accounts(self):
+        polled = []
+        accounts = [Account(name, 't', 'b', '1') for name in NAMES]
+
+        def poll(state):
+            polled.append(state.account.name)
+            engine.stop()
+            return True
+
+        engine = PollingEngine(
+            accounts, poll, guard=lambda name: name == 'b',
+            scheduler=PollScheduler(spread=0), skip_delay=0.01,
+        )
+        asyncio.run(engine.run())
+        assert polled == ['b'], (
+            'Аккаунты без аренды не должны опрашиваться.'
+        )
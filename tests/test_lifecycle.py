@@ -0,0 +1,131 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from homework_bot.accounts import Account
+from homework_bot.engine import AccountState, PollingEngine
+from homework_bot.lifecycle import Shutdown, StopOnSignals
+from homework_bot.scheduler import PollScheduler
+from homework_bot.state import SQLiteStateStore
+
+ACCOUNT = Account('a', 't', 'b', '1')
+
+
+def run_and_stop(engine, started, drain_timeout):
+    async def scenario():
+        task = asyncio.ensure_future(engine.run(drain_timeout=drain_timeout))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        engine.stop()
+        begin = time.monotonic()
+        await task
+        return time.monotonic() - begin
+
+    return asyncio.run(scenario())
+
+
+class TestSchedule:
+
+    def test_initial_delay_resumes_saved_schedule(self):
+        state = AccountState(ACCOUNT, next_poll_at=1100.0)
+        assert PollScheduler().initial_delay(state, now=1000.0) == 100.0, (
+            'После перезапуска опрос должен идти по сохраненному расписанию.'
+        )
+
+    def test_schedule_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = SQLiteStateStore(path)
+        store.set_schedule('a', 1234.5)
+        store.close()
+        restored = SQLiteStateStore(path)
+        engine = PollingEngine([ACCOUNT], lambda state: True, store=restored)
+        assert engine.states['a'].next_poll_at == 1234.5
+        restored.close()
+
+
+class TestEngineShutdown:
+
+    def test_poll_in_flight_is_drained(self):
+        started = threading.Event()
+        finished = []
+
+        def poll(state):
+            started.set()
+            time.sleep(0.2)
+            finished.append(state.account.name)
+            return True
+
+        engine = PollingEngine(
+            [ACCOUNT], poll, scheduler=PollScheduler(spread=0)
+        )
+        run_and_stop(engine, started, drain_timeout=2)
+        assert finished == ['a'], (
+            'Идущий опрос должен завершиться до остановки движка.'
+        )
+        assert engine.states['a'].next_poll_at is not None
+
+    def test_stuck_poll_does_not_block_shutdown(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def poll(state):
+            started.set()
+            release.wait(2)
+            return True
+
+        engine = PollingEngine(
+            [ACCOUNT], poll, scheduler=PollScheduler(spread=0)
+        )
+        elapsed = run_and_stop(engine, started, drain_timeout=0.1)
+        release.set()
+        assert elapsed < 1, (
+            'Зависший опрос не должен задерживать остановку дольше срока.'
+        )
+
+
+class TestSignals:
+
+    def test_requested_stop_skips_sleep(self):
+        shutdown = Shutdown()
+        shutdown._handle()
+        with pytest.raises(SystemExit):
+            with shutdown.interruptible():
+                time.sleep(5)
+
+    def test_sigterm_interrupts_sleep(self):
+        previous = signal.getsignal(signal.SIGTERM)
+        shutdown = Shutdown()
+        shutdown.install()
+        timer = threading.Timer(
+            0.1, os.kill, (os.getpid(), signal.SIGTERM)
+        )
+        begin = time.monotonic()
+        try:
+            timer.start()
+            with pytest.raises(SystemExit):
+                with shutdown.interruptible():
+                    time.sleep(5)
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+        assert time.monotonic() - begin < 2, (
+            'SIGTERM должен прерывать паузу между опросами сразу.'
+        )
+
+    def test_stop_on_signals_tracks_deadline(self):
+        stopped = []
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            with StopOnSignals(loop, lambda: stopped.append(True)) as signals:
+                assert signals.remaining(10) == 10
+                os.kill(os.getpid(), signal.SIGTERM)
+                await asyncio.sleep(0.05)
+            return signals.remaining(10)
+
+        remaining = asyncio.run(scenario())
+        assert stopped == [True]
+        assert remaining < 10
@@ -0,0 +1,101 @@
+import io
+import logging
+import threading
+
+from homework_bot.logs import QueueLogging, RateLimitFilter, shift_level
+
+
+def make_logger(name):
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    return logger, handler, stream
+
+
+class TestLogs:
+
+    def test_repeated_template_is_rate_limited(self):
+        logger, handler, stream = make_logger('test_logs.rate')
+        rate_filter = RateLimitFilter(interval=60, burst=2)
+        handler.addFilter(rate_filter)
+        for index in range(5):
+            logger.info('Опрос аккаунта %s', index)
+        logger.error('Сбой %s', 1)
+        lines = stream.getvalue().splitlines()
+        assert lines == [
+            'INFO Опрос аккаунта 0', 'INFO Опрос аккаунта 1', 'ERROR Сбой 1',
+        ], 'Сообщения одного шаблона сверх лимита должны отбрасываться.'
+        assert rate_filter.suppressed == 3
+
+    def test_suppressed_count_reported_in_next_window(self):
+        logger, handler, stream = make_logger('test_logs.window')
+        rate_filter = RateLimitFilter(interval=0.05, burst=1)
+        handler.addFilter(rate_filter)
+        logger.info('Опрос %s', 1)
+        logger.info('Опрос %s', 2)
+        threading.Event().wait(0.06)
+        logger.info('Опрос %s', 3)
+        assert stream.getvalue().splitlines()[-1] == (
+            'INFO Опрос 3 (похожих пропущено: 1)'
+        ), 'Число пропущенных сообщений должно попадать в следующее.'
+
+    def test_queue_logging_formats_in_background(self):
+        logger, handler, stream = make_logger('test_logs.queue')
+        formatted = []
+
+        class Args:
+            def __str__(self):
+                formatted.append(threading.current_thread().name)
+                return 'args'
+
+        log_queue = QueueLogging(logger)
+        log_queue.start()
+        logger.info('Значение %s', Args())
+        log_queue.stop()
+        assert stream.getvalue() == 'INFO Значение args\n'
+        assert formatted and formatted[0] != threading.current_thread().name, (
+            'Подстановка аргументов должна выполняться в фоновом потоке.'
+        )
+        assert logger.handlers == [handler], (
+            'После остановки очереди обработчики должны вернуться.'
+        )
+
+    def test_level_shift_at_runtime(self):
+        logger, _, _ = make_logger('test_logs.level')
+        logger.setLevel(logging.INFO)
+        assert shift_level([logger], -1) == logging.DEBUG
+        assert shift_level([logger], -1) == logging.DEBUG
+        assert shift_level([logger], 2) == logging.WARNING
+        assert not logger.isEnabledFor(logging.INFO)
+
+    def test_package_loggers_go_through_queue(self, homework_module,
+                                              monkeypatch):
+        root = logging.getLogger()
+        monkeypatch.setattr(root, 'handlers', [])
+        root_level = root.level
+        root.setLevel(logging.WARNING)
+        stream = io.StringIO()
+        try:
+            homework_module.configure_logging(stream, logging.INFO)
+            log_queue = QueueLogging(root)
+            log_queue.start()
+            logging.getLogger('homework_bot.delivery').info('из пакета')
+            logging.getLogger('urllib3.pool').info('сторонний')
+            log_queue.stop()
+        finally:
+            root.setLevel(root_level)
+            bot_logger, package_logger = homework_module.BOT_LOGGERS
+            bot_logger.setLevel(logging.DEBUG)
+            package_logger.setLevel(logging.NOTSET)
+        output = stream.getvalue()
+        assert 'из пакета' in output, (
+            'Логи модулей homework_bot должны идти через общий обработчик.'
+        )
+        assert 'сторонний' not in output, (
+            'Уровень бота не должен открывать INFO сторонних библиотек.'
+        )
@@ -0,0 +1,81 @@
+import urllib.request
+
+from homework_bot.metrics import (Counter, Gauge, Histogram, MetricsServer,
+                                  Registry, SnapshotWriter)
+
+
+def make_registry():
+    registry = Registry()
+    counter = registry.register(Counter(
+        'test_responses_total', 'Ответы', labels=('status',)
+    ))
+    histogram = registry.register(Histogram(
+        'test_seconds', 'Длительность', buckets=(0.1, 1)
+    ))
+    registry.register(Gauge(
+        'test_depth', 'Глубина', lambda: {('a',): 3}, labels=('queue',)
+    ))
+    return registry, counter, histogram
+
+
+class TestMetrics:
+
+    def test_render_prometheus_text(self):
+        registry, counter, histogram = make_registry()
+        counter.inc('200')
+        counter.inc('200')
+        counter.inc('500')
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(5)
+        text = registry.render()
+        assert '# TYPE test_responses_total counter' in text
+        assert 'test_responses_total{status="200"} 2' in text
+        assert 'test_responses_total{status="500"} 1' in text
+        assert 'test_depth{queue="a"} 3' in text
+        assert 'test_seconds_bucket{le="0.1"} 2' in text, (
+            'Корзины гистограммы должны быть кумулятивными '
+            'и включать верхнюю границу.'
+        )
+        assert 'test_seconds_bucket{le="1"} 2' in text
+        assert 'test_seconds_bucket{le="+Inf"} 3' in text
+        assert 'test_seconds_count 3' in text
+
+    def test_failing_gauge_does_not_break_render(self):
+        registry = Registry()
+        registry.register(Gauge('test_broken', 'Сбой', lambda: 1 / 0))
+        registry.register(Gauge('test_ok', 'Число', lambda: 7))
+        text = registry.render()
+        assert 'test_ok 7' in text, (
+            'Ошибка одной метрики не должна ломать вывод остальных.'
+        )
+
+    def test_timer_observes_duration(self):
+        histogram = Histogram('test_timer_seconds', 'Таймер')
+        with histogram.time():
+            pass
+        assert histogram.count == 1
+
+    def test_server_exposes_metrics(self):
+        registry, counter, _ = make_registry()
+        counter.inc('200')
+        server = MetricsServer(0, registry=registry)
+        server.start()
+        try:
+            url = f'http://127.0.0.1:{server.port}/metrics'
+            with urllib.request.urlopen(url, timeout=5) as response:
+                body = response.read().decode('utf-8')
+        finally:
+            server.stop()
+        assert 'test_responses_total{status="200"} 1' in body
+
+    def test_snapshot_written_on_stop(self, tmp_path):
+        registry, counter, _ = make_registry()
+        counter.inc('404')
+        path = tmp_path / 'metrics.prom'
+        writer = SnapshotWriter(str(path), interval=60, registry=registry)
+        writer.start()
+        writer.stop()
+        assert 'test_responses_total{status="404"} 1' in path.read_text(
+            encoding='utf-8'
+        )
@@ -0,0 +1,110 @@
+import multiprocessing
+import time
+
+from homework_bot.delivery import DeliveryQueue
+from homework_bot.metrics import RATE_LIMIT_WAITS
+from homework_bot.ratelimit import (Rate, RateLimiter, SQLiteBuckets,
+                                    telegram_keys)
+from tests.utils import FakeClock, RecordingBot
+
+CHAT = ('chat', '1')
+
+
+def acquire_many(path, count):
+    limiter = RateLimiter({'endpoint': Rate(20)}, SQLiteBuckets(path))
+    for _ in range(count):
+        limiter.acquire(('endpoint', 'api'))
+    limiter.close()
+
+
+class TestRateLimiter:
+
+    def test_burst_then_steady_rate(self):
+        clock = FakeClock(1000.0)
+        limiter = RateLimiter({'bot': Rate(10, burst=3)}, clock=clock)
+        waits = [limiter.try_acquire(('bot', 'b')) for _ in range(4)]
+        assert waits[:3] == [0, 0, 0], 'Всплеск burst должен проходить сразу.'
+        assert abs(waits[3] - 0.1) < 1e-9
+        clock.now += 0.1
+        assert limiter.try_acquire(('bot', 'b')) == 0, (
+            'Через интервал должно освободиться место.'
+        )
+
+    def test_try_acquire_does_not_consume_when_waiting(self):
+        clock = FakeClock(1000.0)
+        limiter = RateLimiter({'chat': Rate(1)}, clock=clock)
+        assert limiter.try_acquire(CHAT) == 0
+        for _ in range(5):
+            assert limiter.try_acquire(CHAT) == 1.0, (
+                'Отказ не должен отодвигать очередь.'
+            )
+
+    def test_acquire_reserves_in_order(self):
+        clock = FakeClock(1000.0)
+        slept = []
+        limiter = RateLimiter(
+            {'chat': Rate(2)}, clock=clock, sleep=slept.append
+        )
+        for _ in range(3):
+            limiter.acquire(CHAT)
+        assert slept == [0.5, 1.0], (
+            'Накопившиеся запросы должны уходить с максимальной скоростью.'
+        )
+
+    def test_all_buckets_must_have_room(self):
+        clock = FakeClock(1000.0)
+        limiter = RateLimiter(
+            {'chat': Rate(1), 'bot': Rate(30, burst=30)}, clock=clock
+        )
+        before = RATE_LIMIT_WAITS.value('chat')
+        assert limiter.try_acquire(('chat', 'a'), ('bot', 'b')) == 0
+        assert limiter.try_acquire(('chat', 'a'), ('bot', 'b')) == 1.0
+        assert limiter.try_acquire(('chat', 'c'), ('bot', 'b')) == 0
+        assert limiter.try_acquire(('unknown', 'x')) == 0
+        assert RATE_LIMIT_WAITS.value('chat') == before + 1, (
+            'Ожидание должно учитываться по ограничившей корзине.'
+        )
+
+    def test_buckets_shared_between_processes(self, tmp_path):
+        path = str(tmp_path / 'buckets.db')
+        SQLiteBuckets(path).close()
+        started = time.monotonic()
+        workers = [
+            multiprocessing.Process(target=acquire_many, args=(path, 5))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(10)
+        assert all(worker.exitcode == 0 for worker in workers)
+        assert time.monotonic() - started >= 9 / 20, (
+            'Процессы машины должны делить одну корзину.'
+        )
+
+
+class TestDeliveryLimiter:
+
+    def test_queues_share_chat_bucket(self, tmp_path):
+        path = str(tmp_path / 'buckets.db')
+        bot = RecordingBot()
+        queues = [
+            DeliveryQueue(
+                workers=1, chat_interval=0,
+                limiter=RateLimiter({'chat': Rate(5)}, SQLiteBuckets(path)),
+            )
+            for _ in range(2)
+        ]
+        for index, queue in enumerate(queues):
+            queue.put(bot, 1, f'message {index}')
+            queue.start()
+        for queue in queues:
+            assert queue.join(5)
+            queue.stop()
+            queue.limiter.close()
+        first, second = sorted(sent for _, _, sent in bot.sent)
+        assert second - first >= 0.15, (
+            'Сообщения в один чат из разных очередей должны идти '
+            'не чаще ограничения чата.'
+        )
+        assert telegram_keys(bot, 1)[0][0] == 'chat'
@@ -0,0 +1,96 @@
+from homework_bot.accounts import Account
+from homework_bot.engine import AccountState
+from homework_bot.records import HomeworkStatus
+from homework_bot.render import ENGLISH, MessageRenderer, MessageTemplates
+
+VERDICTS = {
+    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+    'reviewing': 'Работа взята на проверку ревьюером.',
+    'rejected': 'Работа проверена: у ревьюера есть замечания.'
+}
+
+
+def make_renderer(maxsize=4096):
+    return MessageRenderer({
+        'ru': MessageTemplates(
+            changed='Изменился статус проверки работы "{name}". {verdict}',
+            verdicts=VERDICTS,
+            no_changes='Статус не изменился',
+            failure='Сбой в работе программы: {error}',
+        ),
+        'en': ENGLISH,
+    }, maxsize=maxsize)
+
+
+class TestMessageRenderer:
+
+    def test_matches_parse_status(self, homework_module):
+        renderer = make_renderer()
+        for status in VERDICTS:
+            homework = {'homework_name': 'hw {x}', 'status': status}
+            assert renderer.status_message('hw {x}', status) == (
+                homework_module.parse_status(homework)
+            ), 'Текст уведомления должен совпадать с parse_status.'
+
+    def test_templates_per_language(self):
+        renderer = make_renderer()
+        assert renderer.status_message(
+            'hw', HomeworkStatus.APPROVED, 'en'
+        ) == (
+            'Review status of "hw" has changed. '
+            'Reviewed: the reviewer liked everything. Hooray!'
+        )
+        assert renderer.no_changes('en') == 'Status has not changed'
+        assert renderer.failure('boom', 'de') == (
+            'Сбой в работе программы: boom'
+        ), 'Неизвестный язык должен заменяться языком по умолчанию.'
+
+    def test_cache_is_bounded_lru(self):
+        renderer = make_renderer(maxsize=2)
+        renderer.status_message('a', 'approved')
+        renderer.status_message('a', HomeworkStatus.APPROVED)
+        renderer.status_message('b', 'approved')
+        renderer.status_message('c', 'approved')
+        info = renderer.cache_info()
+        assert info.hits == 1, (
+            'Статус-член enum и строка api должны попадать в одну запись.'
+        )
+        assert info.currsize == 2
+
+    def test_poll_uses_account_language(self, monkeypatch, homework_module):
+        answer = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'rejected'},
+            ],
+            'current_date': 100,
+        }
+        monkeypatch.setattr(
+            homework_module, 'fetch_api_answer',
+            lambda timestamp, headers, client=None: answer
+        )
+        state = AccountState(
+            Account('student', 't', '1:x', '1', language='en')
+        )
+        sent = []
+
+        def notify(message):
+            sent.append(message)
+            return True
+
+        homework_module.poll_account(state, notify)
+        homework_module.poll_account(state, notify)
+        assert sent == [
+            'Review status of "hw1" has changed. '
+            'Reviewed: the reviewer has some remarks.',
+            'Status has not changed',
+        ], 'Сообщения должны рендериться на языке чата аккаунта.'
+
+    def test_status_of_message(self):
+        renderer = make_renderer()
+        for language in ('ru', 'en'):
+            for status in VERDICTS:
+                message = renderer.status_message('hw "x"', status, language)
+                assert renderer.status_of(message) == status, (
+                    'По тексту уведомления должен определяться статус.'
+                )
+        assert renderer.status_of('Статус не изменился') is None
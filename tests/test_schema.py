@@ -0,0 +1,73 @@
+import pytest
+
+from homework_bot import fastjson
+from homework_bot.records import HomeworkRecord, HomeworkStatus
+from homework_bot.schema import HomeworkSchema
+from homework_bot.status_index import StatusIndex
+
+VERDICTS = {
+    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+    'reviewing': 'Работа взята на проверку ревьюером.',
+    'rejected': 'Работа проверена: у ревьюера есть замечания.'
+}
+
+
+class TestHomeworkSchema:
+
+    def test_records_keyed_by_id_or_name(self):
+        homeworks = [
+            {'id': 7, 'homework_name': 'hw7', 'status': 'approved'},
+            {'homework_name': 'hw8', 'status': 'reviewing'},
+        ]
+        records = HomeworkSchema(VERDICTS).parse(homeworks)
+        assert records == [
+            ('7', 'hw7', 'approved'), ('hw8', 'hw8', 'reviewing'),
+        ]
+
+    @pytest.mark.parametrize('homework, error', [
+        ({'status': 'approved'}, KeyError),
+        ({'homework_name': '', 'status': 'approved'}, KeyError),
+        ({'homework_name': 'hw'}, KeyError),
+        ({'homework_name': 'hw', 'status': 'unknown'}, ValueError),
+        ('hw', TypeError),
+    ])
+    def test_invalid_homework_rejected(self, homework, error):
+        schema = HomeworkSchema(VERDICTS)
+        with pytest.raises(error):
+            schema.parse([{'homework_name': 'ok', 'status': 'approved'},
+                          homework])
+
+    def test_fastjson_decodes_bytes(self):
+        assert fastjson.loads(b'{"homeworks": [], "current_date": 1}') == {
+            'homeworks': [], 'current_date': 1,
+        }
+        with pytest.raises(ValueError):
+            fastjson.loads(b'{')
+
+
+class TestHomeworkRecord:
+
+    def test_records_hold_interned_statuses(self):
+        homeworks = [
+            {'id': index, 'homework_name': f'hw{index}', 'status': 'approved',
+             'reviewer_comment': 'x' * 100}
+            for index in range(3)
+        ]
+        records = HomeworkSchema(VERDICTS).parse(homeworks)
+        assert all(type(record) is HomeworkRecord for record in records)
+        assert all(
+            record.status is HomeworkStatus.APPROVED for record in records
+        ), 'Статусы должны быть общими членами HomeworkStatus.'
+        assert not hasattr(records[0], '__dict__')
+
+    def test_status_formats_as_api_string(self):
+        status = HomeworkStatus.REVIEWING
+        assert status == 'reviewing'
+        assert f'{status}' == str(status) == 'reviewing'
+
+    def test_restored_statuses_are_interned(self):
+        index = StatusIndex({'1': ''.join(['appr', 'oved']), '2': 'new'})
+        assert index.get('1') is HomeworkStatus.APPROVED
+        assert index.get('2') == 'new'
+        record = HomeworkRecord('1', 'hw', HomeworkStatus.APPROVED)
+        assert index.changed_records([record]) == []
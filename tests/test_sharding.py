@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+import homework
+from homework_bot.accounts import Account
+from homework_bot.sharding import (WorkerPool, parse_shard, select_accounts,
+                                   shard_of)
+
+NAMES = [f'student{index}' for index in range(2000)]
+
+
+def record_run(directory, name):
+    path = os.path.join(directory, name)
+    first_run = not os.path.exists(path)
+    with open(path, 'a') as file:
+        file.write('run\n')
+    if name == 'flaky' and first_run:
+        raise SystemExit(1)
+
+
+class TestSharding:
+
+    def test_parse_shard(self):
+        assert parse_shard('3/16') == (3, 16)
+        for value in ('16/16', '-1/4', '1/0', 'три'):
+            with pytest.raises(ValueError):
+                parse_shard(value)
+
+    def test_shards_are_balanced(self):
+        sizes = [0] * 8
+        for name in NAMES:
+            sizes[shard_of(name, 8)] += 1
+        assert min(sizes) > len(NAMES) / 8 * 0.8, (
+            'Аккаунты должны распределяться по шардам равномерно.'
+        )
+
+    def test_rebalancing_is_minimal(self):
+        before = {name: shard_of(name, 4) for name in NAMES}
+        after = {name: shard_of(name, 5) for name in NAMES}
+        moved = [name for name in NAMES if before[name] != after[name]]
+        assert len(moved) < len(NAMES) * 0.3, (
+            'При добавлении шарда должна переезжать только его доля.'
+        )
+        assert all(after[name] == 4 for name in moved), (
+            'Аккаунты должны переезжать только на новый шард.'
+        )
+
+    def test_workers_cover_machine_shards_exactly(self):
+        accounts = [Account(name, 't', '1:x', '1') for name in NAMES]
+        # Разное число воркеров на машинах, как при --workers 0
+        machines = {(0, 2): 4, (1, 2): 2}
+        polled = []
+        for shard, workers in machines.items():
+            machine = select_accounts(accounts, shard)
+            sizes = []
+            for worker in range(workers):
+                share = select_accounts(accounts, shard, (worker, workers))
+                assert set(share) <= set(machine), (
+                    'Воркер должен опрашивать только аккаунты своей машины.'
+                )
+                sizes.append(len(share))
+                polled.extend(account.name for account in share)
+            assert min(sizes) > len(machine) / workers * 0.8, (
+                'Воркеры должны делить шард машины равномерно.'
+            )
+        assert sorted(polled) == sorted(NAMES), (
+            'Каждый аккаунт должен опрашиваться ровно одним воркером.'
+        )
+
+    @pytest.mark.parametrize('argv', [
+        ['--workers', '2'], ['--workers', '0'], ['--shard', '1/4'],
+        ['--worker-shard', '0/2'],
+    ])
+    def test_commands_need_single_process(self, argv, capsys):
+        with pytest.raises(SystemExit) as error:
+            homework.cli(['--commands', *argv])
+        assert error.value.code == 2, (
+            'Команды в пуле воркеров дали бы 409 Conflict в Telegram.'
+        )
+        assert '--commands' in capsys.readouterr().err
+
+    def test_pool_restarts_failed_worker(self, tmp_path):
+        pool = WorkerPool(
+            record_run,
+            [(str(tmp_path), 'stable'), (str(tmp_path), 'flaky')],
+            restart_delay=0,
+        )
+        pool.run()
+        assert (tmp_path / 'stable').read_text() == 'run\n'
+        assert (tmp_path / 'flaky').read_text() == 'run\nrun\n', (
+            'Упавший воркер должен перезапускаться.'
+        )
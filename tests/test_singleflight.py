@@ -0,0 +1,132 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import homework
+from homework_bot.accounts import Account
+from homework_bot.client import Validators
+from homework_bot.engine import AccountState
+from homework_bot.metrics import COALESCED_CALLS
+from homework_bot.singleflight import SingleFlight
+from tests.utils import FakeClock
+
+
+def run_together(func, count):
+    barrier = threading.Barrier(count)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(func())
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+class SlowClient:
+
+    def __init__(self):
+        self.flights = SingleFlight()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def get_if_changed(self, url, validators, **kwargs):
+        with self.lock:
+            self.requests += 1
+        time.sleep(0.1)
+        return (
+            SimpleNamespace(status_code=200),
+            Validators(fingerprint='new'),
+            True,
+        )
+
+    def decode(self, response):
+        return {'homeworks': [], 'current_date': 1}
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one(self):
+        flights = SingleFlight(ttl=0)
+        calls = []
+
+        def func():
+            calls.append(1)
+            time.sleep(0.1)
+            return object()
+
+        shared = COALESCED_CALLS.value('shared')
+        results = run_together(lambda: flights.do('key', func), 5)
+        assert len(calls) == 1, 'Одновременные вызовы должны делить один.'
+        assert len({id(result) for result in results}) == 1
+        assert COALESCED_CALLS.value('shared') == shared + 4
+
+    def test_error_is_shared_but_not_cached(self):
+        flights = SingleFlight()
+        calls = []
+
+        def fail():
+            calls.append(1)
+            raise ConnectionError('down')
+
+        with pytest.raises(ConnectionError):
+            flights.do('key', fail)
+        with pytest.raises(ConnectionError):
+            flights.do('key', fail)
+        assert len(calls) == 2, 'Ошибка не должна попадать в кеш.'
+
+    def test_result_cached_for_ttl(self):
+        clock = FakeClock()
+        flights = SingleFlight(ttl=5, clock=clock)
+        calls = []
+
+        def func():
+            calls.append(1)
+            return len(calls)
+
+        assert flights.do('key', func) == 1
+        clock.now = 4
+        assert flights.do('key', func) == 1, 'Результат должен браться из кеша.'
+        clock.now = 5
+        assert flights.do('key', func) == 2, 'Кеш должен устаревать по ttl.'
+
+    def test_cache_is_bounded(self):
+        flights = SingleFlight(ttl=60, maxsize=3)
+        for index in range(10):
+            flights.do(index, lambda: index)
+        assert len(flights._cache) == 3
+
+
+class TestFetchCoalescing:
+
+    def test_accounts_with_same_token_share_request(self):
+        client = SlowClient()
+        states = [
+            AccountState(Account(f'a{index}', 'token', 'b', str(index)),
+                         timestamp=0)
+            for index in range(4)
+        ]
+        lock = threading.Lock()
+        queue = list(states)
+
+        def fetch():
+            with lock:
+                state = queue.pop()
+            return homework.fetch_account_answer(state, client)
+
+        answers = run_together(fetch, len(states))
+        assert client.requests == 1, (
+            'Опросы одного токена и from_date должны делить запрос к api.'
+        )
+        assert all(answer is answers[0] for answer in answers), (
+            'Разобранный ответ должен быть общим.'
+        )
+        assert all(
+            state.pending_validators.fingerprint == 'new' for state in states
+        )
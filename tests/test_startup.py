@@ -0,0 +1,146 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import telegram
+
+import homework
+from benchmarks.mock_servers import MockPracticumServer
+from homework_bot.accounts import Account
+from homework_bot.lazy import LazyModule
+from homework_bot.state import message_hash, open_state_store
+from homework_bot.validators import Validators
+from tests.utils import RecordingBot
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Бюджет холодного импорта homework, мс; с telegram.ext было около 650
+IMPORT_BUDGET_MS = 300
+# Модули, которые не должны импортироваться вместе с homework
+HEAVY_MODULES = ('telegram', 'telegram.ext', 'requests', 'urllib3')
+
+
+def run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT_DIR, capture_output=True,
+        text=True, timeout=60,
+    )
+
+
+def import_times(module):
+    """Накопленное время импорта модулей по python -X importtime, мкс."""
+    result = run_python('-X', 'importtime', '-c', f'import {module}')
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class ChangedClient:
+
+    breaker = None
+    flights = None
+
+    def __init__(self, error=None):
+        self.error = error
+
+    def get_if_changed(self, url, validators, **kwargs):
+        if self.error is not None:
+            raise self.error
+        return (
+            SimpleNamespace(status_code=200),
+            Validators(fingerprint='new'),
+            True,
+        )
+
+    def decode(self, response):
+        return {
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 1,
+        }
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class TestImportTime:
+
+    def test_heavy_modules_are_deferred(self):
+        times = import_times('homework')
+        loaded = [module for module in HEAVY_MODULES if module in times]
+        assert loaded == [], (
+            f'Импорт homework не должен загружать {", ".join(loaded)}.'
+        )
+
+    def test_import_within_budget(self):
+        # Лучший из трех замеров, чтобы не зависеть от шумных соседей
+        best = min(
+            import_times('homework')['homework'] for _ in range(3)
+        ) / 1000
+        assert best < IMPORT_BUDGET_MS, (
+            f'Импорт homework занимает {best:.0f} мс, '
+            f'бюджет {IMPORT_BUDGET_MS} мс.'
+        )
+
+
+class TestLazyModule:
+
+    def test_attributes_follow_monkeypatch(self, monkeypatch):
+        module = LazyModule('telegram')
+        monkeypatch.setattr(telegram, 'Bot', RecordingBot)
+        assert module.Bot is RecordingBot, (
+            'Заместитель должен читать атрибуты из настоящего модуля.'
+        )
+
+
+class TestCheckOnce:
+
+    def test_nothing_to_send_skips_telegram(self, tmp_path):
+        # Сообщение об отсутствии изменений уже отправлено прошлым запуском
+        state_file = str(tmp_path / 'state.db')
+        store = open_state_store(state_file)
+        store.remember_message(
+            'default', message_hash(homework.NO_CHANGES_MESSAGE)
+        )
+        store.close()
+        with MockPracticumServer(homeworks=0) as server:
+            result = run_python('-c', (
+                'import sys, homework; '
+                'homework.ENDPOINT = sys.argv[1]; '
+                "homework.cli(['--once', '--state-file', sys.argv[2]]); "
+                "print('telegram' in sys.modules)"
+            ), server.url, state_file)
+            assert server.requests == 1
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.splitlines()[-1] == 'False', (
+            'Без уведомлений --once не должен загружать Telegram.'
+        )
+
+    def test_changes_are_sent_and_failures_reported(self, monkeypatch):
+        bots = []
+
+        def make_bot(token):
+            bots.append(RecordingBot())
+            return bots[-1]
+
+        monkeypatch.setattr(telegram, 'Bot', make_bot)
+        accounts = [
+            Account(f'a{index}', 'token', 'bot', str(index))
+            for index in range(2)
+        ]
+        assert homework.check_once(
+            accounts, ChangedClient(), open_state_store()
+        )
+        assert len(bots) == 1, 'Боты одного токена должны быть общими.'
+        assert sorted(chat for chat, _, _ in bots[0].sent) == ['0', '1']
+        assert not homework.check_once(
+            accounts, ChangedClient(ConnectionError('down')),
+            open_state_store(),
+        ), 'Сбой опроса должен давать False.'
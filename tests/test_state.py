@@ -0,0 +1,135 @@
+import sqlite3
+
+from homework_bot.accounts import Account
+from homework_bot.engine import AccountState
+from homework_bot.state import AccountSnapshot, SQLiteStateStore
+
+
+class TestStateStore:
+
+    def test_sqlite_state_survives_restart(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = SQLiteStateStore(path, batch_size=1000, flush_interval=60)
+        store.set_cursor('student', 100)
+        store.set_cursor('student', 200)
+        store.set_status('student', '1', 'reviewing')
+        store.set_status('student', '1', 'approved', 'hw1')
+        store.set_activity('student', 50.0, 40.0)
+        store.remember_message('student', 'hash1')
+        store.remember_message('student', 'hash2')
+        assert store.load_all()['student'].cursor == 200
+        store.close()
+
+        snapshot = SQLiteStateStore(path).load_all()['student']
+        assert snapshot.cursor == 200, 'Курсор должен пережить перезапуск.'
+        assert snapshot.statuses == {'1': 'approved'}
+        assert snapshot.names == {'1': 'hw1'}, (
+            'Название работы нужно /status после перезапуска.'
+        )
+        assert snapshot.sent_hashes == ['hash1', 'hash2']
+        assert (snapshot.last_change, snapshot.reviewing_since) == (50, 40), (
+            'Время последнего изменения нужно планировщику после рестарта.'
+        )
+
+    def test_old_database_gets_names_column(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE statuses (account TEXT NOT NULL, '
+            'homework TEXT NOT NULL, status TEXT, '
+            'PRIMARY KEY (account, homework))'
+        )
+        connection.execute(
+            "INSERT INTO statuses VALUES ('a', '1', 'approved')"
+        )
+        connection.commit()
+        connection.close()
+        store = SQLiteStateStore(path)
+        store.set_status('a', '2', 'reviewing', 'hw2')
+        snapshot = store.load_all()['a']
+        store.close()
+        assert snapshot.statuses == {'1': 'approved', '2': 'reviewing'}, (
+            'Статусы базы прошлой версии должны сохраниться.'
+        )
+        assert snapshot.names == {'2': 'hw2'}
+
+    def test_writes_are_batched(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = SQLiteStateStore(path, batch_size=3, flush_interval=60)
+        store.set_cursor('a', 1)
+        store.set_cursor('b', 1)
+        assert SQLiteStateStore(path).load_all() == {}, (
+            'До заполнения пачки записи не должны попадать в базу.'
+        )
+        store.set_cursor('c', 1)
+        assert set(SQLiteStateStore(path).load_all()) == {'a', 'b', 'c'}
+
+    def test_restart_does_not_resend(self, tmp_path, monkeypatch,
+                                     homework_module):
+        answer = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+            ],
+            'current_date': 100,
+        }
+        monkeypatch.setattr(
+            homework_module, 'fetch_api_answer',
+            lambda timestamp, headers, client=None: answer
+        )
+        path = tmp_path / 'state.db'
+        account = Account('student', 't', '1:x', '1')
+        sent = []
+
+        def notify(message):
+            sent.append(message)
+            return True
+
+        for _ in range(3):
+            store = SQLiteStateStore(path)
+            state = AccountState(account, timestamp=0)
+            state.restore(
+                store.load_all().get('student', AccountSnapshot())
+            )
+            homework_module.poll_account(state, notify, store=store)
+            store.close()
+        assert len(sent) == 2, (
+            'После перезапуска статус и "Статус не изменился" '
+            'не должны отправляться повторно.'
+        )
+        assert sent[1] == homework_module.NO_CHANGES_MESSAGE
+
+    def test_failed_flush_keeps_batch(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = SQLiteStateStore(path, batch_size=1000, flush_interval=60)
+        store.set_cursor('a', 1)
+        store.set_cursor('b', None)
+        assert not store.try_flush(), 'Ошибка записи должна логироваться.'
+        assert SQLiteStateStore(path).load_all() == {}
+        # Исправляем ошибочную запись: остальная пачка не потеряна
+        store._pending.pop()
+        store.set_cursor('b', 2)
+        store.flush()
+        assert {
+            name: snapshot.cursor
+            for name, snapshot in SQLiteStateStore(path).load_all().items()
+        } == {'a': 1, 'b': 2}
+
+    def test_auto_flush_error_does_not_reach_poll(self, tmp_path):
+        store = SQLiteStateStore(
+            tmp_path / 'state.db', batch_size=1, flush_interval=60
+        )
+        store.set_cursor('a', None)
+        assert len(store._pending) == 1
+
+    def test_outgoing_survives_restart(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = SQLiteStateStore(path, batch_size=1000, flush_interval=60)
+        first = store.add_outgoing('student', 1, 'first')
+        store.add_outgoing('student', 1, 'second')
+        store.add_outgoing('other', 2, 'third')
+        store.remove_outgoing(first)
+        store.close()
+        outgoing = SQLiteStateStore(path).load_outgoing(['student'])
+        assert [row[1:] for row in outgoing] == [
+            ('student', '1', 'second')
+        ], 'Недоставленные сообщения должны пережить перезапуск.'
@@ -0,0 +1,73 @@
+from homework_bot.accounts import Account
+from homework_bot.engine import AccountState
+from homework_bot.records import HomeworkRecord, HomeworkStatus
+from homework_bot.status_index import StatusIndex
+
+
+class TestStatusIndex:
+
+    def test_only_transitions_are_changed(self):
+        index = StatusIndex()
+        first = HomeworkRecord('1', 'hw1', HomeworkStatus.REVIEWING)
+        second = HomeworkRecord('2', 'hw2', HomeworkStatus.REVIEWING)
+        assert index.changed_records([first, second]) == [first, second]
+        for record in (first, second):
+            index.set(record.key, record.status)
+        approved = first._replace(status=HomeworkStatus.APPROVED)
+        assert index.changed_records([approved, second]) == [approved], (
+            'Изменившейся должна считаться только работа с новым статусом.'
+        )
+
+    def test_poll_account_notifies_every_changed_homework(self, monkeypatch,
+                                                           homework_module):
+        answer = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+                {'id': 2, 'homework_name': 'hw2', 'status': 'rejected'},
+            ],
+            'current_date': 100,
+        }
+        monkeypatch.setattr(
+            homework_module, 'fetch_api_answer',
+            lambda timestamp, headers, client=None: answer
+        )
+        state = AccountState(Account('student', 't', '1:x', '1'))
+        sent = []
+
+        def notify(message):
+            sent.append(message)
+            return True
+
+        homework_module.poll_account(state, notify)
+        assert len(sent) == 2, (
+            'Уведомление должно уйти по каждой работе из ответа api.'
+        )
+        assert '"hw1"' in sent[0] and '"hw2"' in sent[1]
+        homework_module.poll_account(state, notify)
+        assert sent[2:] == [homework_module.NO_CHANGES_MESSAGE]
+
+    def test_failed_send_is_retried(self, monkeypatch, homework_module):
+        answer = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            ],
+            'current_date': 100,
+        }
+        monkeypatch.setattr(
+            homework_module, 'fetch_api_answer',
+            lambda timestamp, headers, client=None: answer
+        )
+        state = AccountState(Account('student', 't', '1:x', '1'))
+        attempts = []
+
+        def notify(message):
+            attempts.append(message)
+            return len(attempts) > 1
+
+        homework_module.poll_account(state, notify)
+        homework_module.poll_account(state, notify)
+        assert attempts[0] == attempts[1], (
+            'Не отправленное уведомление должно повторяться при '
+            'следующем опросе.'
+        )
+        assert state.statuses.get('1') == 'approved'
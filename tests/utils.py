@@ -1,4 +1,6 @@
 import logging
+import threading
+import time
 from collections import namedtuple
 from contextlib import contextmanager
 from http import HTTPStatus
@@ -101,5 +103,30 @@ class MockTelegramBot:
         self.text = text
 
 
+class RecordingBot:
+    """Бот, запоминающий отправки; failures - ошибки первых отправок."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        with self.lock:
+            if self.failures:
+                raise self.failures.pop(0)
+            self.sent.append((chat_id, text, time.monotonic()))
+
+
+class FakeClock:
+    """Часы, которые идут только при изменении now."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
 class BreakInfiniteLoop(Exception):
     pass